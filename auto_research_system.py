@@ -6,18 +6,27 @@ Claude Code コマンド、MCP、効率化ツールの自動発見
 """
 
 import subprocess
-import requests
 import json
 import re
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
+from discovery_crawler import DiscoveryCrawler
+from discovery_store import DiscoveryStore
 
 class AutoResearchSystem:
-    def __init__(self):
+    def __init__(self, crawler=None):
         self.repo_path = "/mnt/c/Claude Code/tool"
         self.research_db = "auto_research_discoveries.json"
         
+        # 追記型ストア (初回は旧 JSON から移行)
+        self.discovery_store = DiscoveryStore("auto_research_discoveries.jsonl", legacy_path=self.research_db)
+        
+        # 共通クローラ (条件付きGETキャッシュ + ホスト別並列取得 + サイクル内の結果共有)
+        self.crawler = crawler or DiscoveryCrawler.shared()
+        self.http_cache = self.crawler.http_cache
+        
     def research_claude_code_commands(self):
         """Claude Code コマンドの自動発見"""
         print("🔍 Claude Code コマンド自動リサーチ開始")
@@ -124,16 +133,20 @@ class AutoResearchSystem:
             "awesome-ai-tools"
         ]
         
+        # GitHub search API (まとめて並列取得、他ツールと同じ検索は共有)
+        urls = {repo: self.crawler.github_search_url(repo) for repo in awesome_repos}
+        responses = self.crawler.fetch_many(urls.values(), timeout=10)
+        
         for repo in awesome_repos:
             try:
-                # GitHub search API
-                url = f"https://api.github.com/search/repositories?q={repo}&sort=updated&per_page=5"
-                response = requests.get(url, timeout=10)
+                response = responses[urls[repo]]
+                if isinstance(response, Exception):
+                    raise response
                 
                 if response.status_code == 200:
                     data = response.json()
                     
-                    for item in data.get("items", []):
+                    for item in data.get("items", [])[:5]:
                         discoveries.append({
                             "type": "awesome_github_repo",
                             "name": item.get("name", ""),
@@ -144,7 +157,7 @@ class AutoResearchSystem:
                             "discovered_at": datetime.now().isoformat()
                         })
                 
-                print(f"  ✅ {repo} 関連リポジトリ発見")
+                print(f"  ✅ {repo} 関連リポジトリ発見{self._cache_mark(response)}")
                 
             except Exception as e:
                 print(f"  ⚠️ GitHub検索エラー {repo}: {e}")
@@ -163,15 +176,19 @@ class AutoResearchSystem:
             "model-context-protocol"
         ]
         
+        urls = {term: self.crawler.npm_search_url(term) for term in search_terms}
+        responses = self.crawler.fetch_many(urls.values(), timeout=10)
+        
         for term in search_terms:
             try:
-                url = f"https://registry.npmjs.org/-/v1/search?text={term}&size=10"
-                response = requests.get(url, timeout=10)
+                response = responses[urls[term]]
+                if isinstance(response, Exception):
+                    raise response
                 
                 if response.status_code == 200:
                     data = response.json()
                     
-                    for obj in data.get("objects", []):
+                    for obj in data.get("objects", [])[:10]:
                         package = obj.get("package", {})
                         
                         discoveries.append({
@@ -185,7 +202,7 @@ class AutoResearchSystem:
                             "discovered_at": datetime.now().isoformat()
                         })
                 
-                print(f"  ✅ {term} 関連NPMパッケージ発見")
+                print(f"  ✅ {term} 関連NPMパッケージ発見{self._cache_mark(response)}")
                 
             except Exception as e:
                 print(f"  ⚠️ NPM検索エラー {term}: {e}")
@@ -203,9 +220,13 @@ class AutoResearchSystem:
             "https://modelcontextprotocol.io/docs"
         ]
         
+        responses = self.crawler.fetch_many(doc_urls, timeout=15)
+        
         for url in doc_urls:
             try:
-                response = requests.get(url, timeout=15)
+                response = responses[url]
+                if isinstance(response, Exception):
+                    raise response
                 
                 if response.status_code == 200:
                     content = response.text
@@ -230,53 +251,37 @@ class AutoResearchSystem:
                             "discovered_at": datetime.now().isoformat()
                         })
                 
-                print(f"  ✅ {url} から情報発見")
+                print(f"  ✅ {url} から情報発見{self._cache_mark(response)}")
                 
             except Exception as e:
                 print(f"  ⚠️ ドキュメント取得エラー {url}: {e}")
         
         return discoveries
     
+    @staticmethod
+    def _cache_mark(response):
+        return " (キャッシュ)" if getattr(response, "from_cache", False) else ""
+    
     def save_discoveries(self, all_discoveries):
-        """発見した情報の保存"""
+        """発見した情報の保存 (未登録・内容が変わったものだけ追記)"""
         try:
-            # 既存の発見情報を読み込み
-            existing_discoveries = []
-            if os.path.exists(self.research_db):
-                with open(self.research_db, 'r') as f:
-                    existing_discoveries = json.load(f)
-            
-            # 新しい発見を追加
-            combined_discoveries = existing_discoveries + all_discoveries
+            new, updated = self.discovery_store.add_many(all_discoveries)
             
-            # 重複除去（簡易版）
-            unique_discoveries = []
-            seen = set()
+            print(f"📊 総発見数: {len(self.discovery_store)} (新規: {len(new)}, 更新: {len(updated)})")
             
-            for discovery in combined_discoveries:
-                key = f"{discovery.get('type', '')}_{discovery.get('command', '')}_{discovery.get('name', '')}"
-                if key not in seen:
-                    seen.add(key)
-                    unique_discoveries.append(discovery)
-            
-            # 保存
-            with open(self.research_db, 'w') as f:
-                json.dump(unique_discoveries, f, indent=2)
-            
-            print(f"📊 総発見数: {len(unique_discoveries)} (新規: {len(all_discoveries)})")
-            
-            return unique_discoveries
+            return new + updated
             
         except Exception as e:
             print(f"❌ 発見情報保存エラー: {e}")
             return all_discoveries
     
     def generate_research_report(self, discoveries):
-        """リサーチレポートの生成"""
+        """リサーチレポートの生成 (discoveries: 前回レポート以降の新規・更新分)"""
         report = f"""# 自動リサーチレポート - {datetime.now().strftime('%Y-%m-%d %H:%M')}
 
 ## 📊 発見サマリー
-- **総発見数**: {len(discoveries)}
+- **新規・更新**: {len(discoveries)}
+- **総発見数**: {len(self.discovery_store)}
 
 """
         
@@ -343,23 +348,35 @@ $content | Out-File -FilePath "$obsidianPath\\$filename" -Encoding UTF8
             self.research_claude_docs
         ]
         
-        for module in research_modules:
+        # モジュール同士は独立しているので並列実行 (結果はモジュール順に結合)
+        with ThreadPoolExecutor(max_workers=len(research_modules)) as executor:
+            futures = [executor.submit(module) for module in research_modules]
+        
+        for future in futures:
             try:
-                discoveries = module()
-                all_discoveries.extend(discoveries)
+                all_discoveries.extend(future.result())
             except Exception as e:
                 print(f"⚠️ リサーチモジュールエラー: {e}")
         
+        stats = self.http_cache.stats
+        print(f"🌐 HTTP: 取得 {stats['network']} / 未更新(304) {stats['not_modified']} / キャッシュ {stats['fresh'] + stats['stale']}"
+              f" / 共有 {self.crawler.stats['shared']}")
+        
         # 発見情報の保存
-        unique_discoveries = self.save_discoveries(all_discoveries)
+        self.save_discoveries(all_discoveries)
         
-        # レポート生成
-        report = self.generate_research_report(unique_discoveries)
+        # レポート生成 (前回レポート以降に追記された分のみ)
+        new_discoveries = self.discovery_store.since_last_report()
+        if new_discoveries:
+            self.generate_research_report(new_discoveries)
+        else:
+            print("🆕 前回以降の新しい発見はありません")
+        self.discovery_store.mark_reported()
         
         print("\n🎉 自動リサーチ完了！")
-        print(f"📊 総発見数: {len(unique_discoveries)}")
+        print(f"📊 総発見数: {len(self.discovery_store)} (新規・更新: {len(new_discoveries)})")
         
-        return unique_discoveries
+        return new_discoveries
 
 def main():
     """メイン実行"""
@@ -380,6 +397,8 @@ def main():
             researcher.research_npm_mcp_packages()
         elif cmd == "docs":
             researcher.research_claude_docs()
+        elif cmd == "compact":
+            researcher.discovery_store.compact()
         else:
             print("使用方法:")
             print("  python3 auto_research_system.py              # 完全自動リサーチ")
@@ -388,6 +407,7 @@ def main():
             print("  python3 auto_research_system.py github           # GitHub発見")
             print("  python3 auto_research_system.py npm              # NPM発見")
             print("  python3 auto_research_system.py docs             # 公式ドキュメント発見")
+            print("  python3 auto_research_system.py compact          # 発見情報ストアの整理")
     else:
         # デフォルト: 完全自動リサーチ
         researcher.full_auto_research()
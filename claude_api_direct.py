@@ -9,9 +9,27 @@ GitHub Actions環境でClaude Code CLIの代替として使用
 import os
 import sys
 import json
-import requests
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from http_client import HTTPClient
 from instant_research_ai import InstantResearchAI
+from prompt_budget import PromptTemplate, fit_to_budget
+from research_scheduler import Deferred
+
+# 分析の指示は固定のシステムプロンプトにし、ユーザーメッセージはクエリと検索結果だけにする
+ANALYSIS_PROMPT = PromptTemplate("""
+    Perplexity検索結果を分析し、構造化された洞察を提供してください：
+
+    **分析内容**:
+    1. 主要なポイント（3-5個）
+    2. 技術的考察
+    3. 実用的な示唆
+    4. 今後のアクション提案
+
+    マークダウン形式で構造化して回答してください。
+""")
 
 class ClaudeAPIGitHubActions:
     """GitHub Actions環境でのClaude Max統合"""
@@ -19,8 +37,17 @@ class ClaudeAPIGitHubActions:
     def __init__(self):
         self.anthropic_api_key = os.getenv("ANTHROPIC_API_KEY")
         self.perplexity_api_key = os.getenv("PERPLEXITY_API_KEY")
+        # anthropic SDK と同じ環境変数で接続先を上書きできる
+        self.anthropic_api_base = os.getenv("ANTHROPIC_BASE_URL", "https://api.anthropic.com").rstrip("/")
         self.research_ai = InstantResearchAI()
         
+        # 共有HTTPクライアント (InstantResearchAI と同じ接続プール)
+        self.http = HTTPClient.shared()
+        # 429/5xx の再試行回数 (None はクライアント既定、バッチモードで引き上げる)
+        self.max_retries = None
+        # 分析に渡す検索結果の上限トークン数 (0 で無制限)
+        self.analysis_token_budget = int(os.getenv("ANALYSIS_TOKEN_BUDGET", "3000"))
+        
         if not self.anthropic_api_key:
             print("⚠️ ANTHROPIC_API_KEY not found. Claude features disabled.")
         if not self.perplexity_api_key:
@@ -38,36 +65,26 @@ class ClaudeAPIGitHubActions:
                 "anthropic-version": "2023-06-01"
             }
             
-            analysis_prompt = f"""
-以下のPerplexity検索結果を分析し、構造化された洞察を提供してください：
-
-**検索クエリ**: {query}
-
-**検索結果**:
-{research_data}
-
-**分析内容**:
-1. 主要なポイント（3-5個）
-2. 技術的考察
-3. 実用的な示唆
-4. 今後のアクション提案
-
-マークダウン形式で構造化して回答してください。
-"""
+            # 検索結果は予算内に縮めてから送る (見出しと各段落の冒頭を優先して残す)
+            research_data, saved_tokens = fit_to_budget(str(research_data), self.analysis_token_budget)
+            if saved_tokens:
+                print(f"✂️ 分析入力を圧縮: -{saved_tokens} トークン")
             
             payload = {
                 "model": "claude-3-sonnet-20240229",
                 "max_tokens": 2000,
+                "system": ANALYSIS_PROMPT.text,
                 "messages": [
                     {
                         "role": "user",
-                        "content": analysis_prompt
+                        "content": f"**検索クエリ**: {query}\n\n**検索結果**:\n{research_data}"
                     }
                 ]
             }
             
-            response = requests.post(
-                "https://api.anthropic.com/v1/messages",
+            response = self.http.post(
+                f"{self.anthropic_api_base}/v1/messages",
+                max_retries=self.max_retries,
                 headers=headers,
                 json=payload,
                 timeout=30
@@ -76,6 +93,7 @@ class ClaudeAPIGitHubActions:
             if response.status_code == 200:
                 result = response.json()
                 analysis = result["content"][0]["text"]
+                self._record_savings(saved_tokens)
                 
                 return {
                     "analysis": analysis,
@@ -92,26 +110,40 @@ class ClaudeAPIGitHubActions:
         except Exception as e:
             return {"error": f"Claude analysis failed: {str(e)}"}
     
+    def _record_savings(self, saved_tokens):
+        """節約トークン数を Perplexity と同じ使用量台帳 (usage_tracking) に記録"""
+        try:
+            self.research_ai.ledger.record_savings(saved_tokens)
+        except Exception as e:
+            print(f"⚠️ 節約トークン記録エラー: {e}")
+    
     def integrated_research_workflow(self, query, research_type="instant"):
         """統合リサーチワークフロー: Perplexity + Claude分析"""
         print(f"🚀 統合リサーチ開始: {research_type} - {query}")
         
         # Phase 1: Perplexity検索
-        if research_type == "instant":
-            research_result = self.research_ai.instant_search(query)
-        elif research_type == "deep":
-            research_result = self.research_ai.deep_research(query)
-        elif research_type == "session":
-            research_result = self.research_ai.research_session(query)
-        else:
-            research_result = self.research_ai.instant_search(query)
+        research_result = self._run_research(query, research_type)
         
         if not research_result:
             return {"error": "Perplexity research failed"}
         
+        # Phase 2-3: Claude分析 + 統合レポート生成
+        return self._analyze_and_report(query, research_type, research_result)
+    
+    def _run_research(self, query, research_type, priority="interactive"):
+        """Perplexity検索フェーズ"""
+        if research_type == "deep":
+            return self.research_ai.deep_research(query, priority=priority)
+        elif research_type == "session":
+            return self.research_ai.research_session(query, priority=priority)
+        else:
+            return self.research_ai.instant_search(query, priority=priority)
+    
+    def _analyze_and_report(self, query, research_type, research_result):
+        """Claude分析フェーズ + 統合レポート生成"""
         research_content = research_result.get("content", "")
         
-        # Phase 2: Claude分析（API利用可能な場合）
+        # Claude分析（API利用可能な場合）
         claude_analysis = None
         if self.anthropic_api_key:
             print("🧠 Claude分析実行中...")
@@ -119,7 +151,7 @@ class ClaudeAPIGitHubActions:
             if "error" not in claude_result:
                 claude_analysis = claude_result
         
-        # Phase 3: 統合レポート生成
+        # 統合レポート生成
         integrated_report = self._create_integrated_report(
             query, research_type, research_result, claude_analysis
         )
@@ -133,6 +165,117 @@ class ClaudeAPIGitHubActions:
             "timestamp": datetime.now().isoformat()
         }
     
+    def batch_research_workflow(self, queries_file, output_file, research_workers=4,
+                                analysis_workers=2, max_retries=3):
+        """バッチリサーチ: JSONLのクエリを検索→分析のパイプラインで並列処理
+        
+        検索が終わったものから分析プールへ渡すため、検索と分析が重なって進む。
+        結果は完了順に output_file (JSONL) へ1行ずつ追記する。
+        検索は batch 優先度で実行し、無料枠の取り分・ペースを超えたクエリは失敗ではなく
+        deferred (retry_at 付き) として書き出す。
+        戻り値: {"total", "succeeded", "failed", "deferred", "elapsed", "output_file"}
+        """
+        jobs = self._load_batch_queries(queries_file)
+        print(f"📦 バッチリサーチ開始: {len(jobs)}件 (検索 {research_workers}並列 / 分析 {analysis_workers}並列)")
+        
+        self.max_retries = max_retries
+        self.research_ai.max_retries = max_retries
+        
+        output_dir = os.path.dirname(output_file)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        
+        write_lock = threading.Lock()
+        counts = {"succeeded": 0, "failed": 0, "deferred": 0}
+        started = time.time()
+        
+        def write_result(index, record):
+            record["batch_index"] = index
+            with write_lock:
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                if "deferred_until" in record:
+                    status, mark = "deferred", "⏸️"
+                elif "error" in record:
+                    status, mark = "failed", "❌"
+                else:
+                    status, mark = "succeeded", "✅"
+                counts[status] += 1
+                done = sum(counts.values())
+                print(f"{mark} [{done}/{len(jobs)}] {record.get('query', '')}")
+        
+        def analysis_stage(index, query, research_type, research_result):
+            try:
+                record = self._analyze_and_report(query, research_type, research_result)
+            except Exception as e:
+                record = {"query": query, "research_type": research_type, "error": f"analysis failed: {e}"}
+            write_result(index, record)
+        
+        def research_stage(index, query, research_type):
+            try:
+                research_result = self._run_research(query, research_type, priority="batch")
+            except Deferred as e:
+                write_result(index, {"query": query, "research_type": research_type,
+                                     "deferred_until": datetime.fromtimestamp(e.retry_at).isoformat(),
+                                     "reason": e.reason})
+                return
+            except Exception as e:
+                research_result = None
+                print(f"⚠️ 検索エラー ({query}): {e}")
+            
+            if not research_result:
+                write_result(index, {"query": query, "research_type": research_type,
+                                     "error": "Perplexity research failed"})
+                return
+            
+            analysis_pool.submit(analysis_stage, index, query, research_type, research_result)
+        
+        with open(output_file, "a", encoding="utf-8") as out:
+            with ThreadPoolExecutor(max_workers=analysis_workers) as analysis_pool:
+                with ThreadPoolExecutor(max_workers=research_workers) as research_pool:
+                    for index, (query, research_type) in enumerate(jobs):
+                        research_pool.submit(research_stage, index, query, research_type)
+                # 検索プール終了後、分析プールの残りを待つ
+        
+        elapsed = time.time() - started
+        print(f"📦 バッチ完了: 成功 {counts['succeeded']} / 失敗 {counts['failed']} / "
+              f"後回し {counts['deferred']} ({elapsed:.1f}秒)")
+        print(f"📁 結果: {output_file}")
+        
+        return {
+            "total": len(jobs),
+            "succeeded": counts["succeeded"],
+            "failed": counts["failed"],
+            "deferred": counts["deferred"],
+            "elapsed": elapsed,
+            "output_file": output_file
+        }
+    
+    @staticmethod
+    def _load_batch_queries(queries_file):
+        """JSONL読み込み: 各行 {"query": ..., "type": "instant|deep|session"} または文字列"""
+        jobs = []
+        with open(queries_file, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    item = json.loads(line)
+                except json.JSONDecodeError as e:
+                    print(f"⚠️ {queries_file}:{line_no} を読み飛ばします: {e}")
+                    continue
+                
+                if isinstance(item, str):
+                    query, research_type = item, "instant"
+                else:
+                    query = item.get("query", "")
+                    research_type = item.get("type") or item.get("research_type") or "instant"
+                
+                if query:
+                    jobs.append((query, research_type))
+        return jobs
+    
     def _create_integrated_report(self, query, research_type, research_result, claude_analysis):
         """統合レポート作成"""
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
@@ -218,6 +361,8 @@ def main():
         print("  python3 claude_api_direct.py <research_type> <query>")
         print("  research_type: instant, deep, session")
         print("  query: 検索クエリ")
+        print("  python3 claude_api_direct.py batch <queries.jsonl> [output.jsonl]")
+        print("  queries.jsonl: 1行1件 {\"query\": \"...\", \"type\": \"instant\"}")
         return
     
     research_type = sys.argv[1]
@@ -230,6 +375,10 @@ def main():
         print(f"📂 Workspace: {os.getenv('GITHUB_WORKSPACE', 'N/A')}")
         print(f"🏃‍♂️ Runner: {os.getenv('RUNNER_NAME', 'N/A')}")
     
+    if research_type == "batch":
+        run_batch(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None, is_github_actions)
+        return
+    
     # 統合リサーチ実行
     integration = ClaudeAPIGitHubActions()
     result = integration.integrated_research_workflow(query, research_type)
@@ -281,5 +430,30 @@ def main():
     
     print("\n✅ 処理完了")
 
+def run_batch(queries_file, output_file, is_github_actions):
+    """バッチモード実行"""
+    if not output_file:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_file = f"github_artifacts/batch_results_{timestamp}.jsonl"
+    
+    integration = ClaudeAPIGitHubActions()
+    summary = integration.batch_research_workflow(
+        queries_file,
+        output_file,
+        research_workers=int(os.getenv("BATCH_RESEARCH_WORKERS", "4")),
+        analysis_workers=int(os.getenv("BATCH_ANALYSIS_WORKERS", "2")),
+        max_retries=int(os.getenv("BATCH_MAX_RETRIES", "3"))
+    )
+    
+    if is_github_actions:
+        print(f"::set-output name=batch_file::{output_file}")
+        print(f"::set-output name=research_success::{str(summary['failed'] == 0).lower()}")
+    
+    # 後回し (deferred) だけなら失敗扱いにしない
+    if summary["failed"] and summary["succeeded"] == 0:
+        sys.exit(1)
+    
+    print("\n✅ 処理完了")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Discovery Crawler - npm / GitHub 検索の共通クローラ
+=================================================
+MCPAutoManager・AutoResearchSystem・MCPAutoDaemon が同じクローラを使い、
+同じURLへの問い合わせは1サイクルにつき1回だけ行う (結果を共有)。
+ホストごとの同時接続数を制限し、X-RateLimit-* / Retry-After を見て待機する。
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from http_cache import HTTPCache
+
+
+class RateLimited(Exception):
+    """レート制限中でキャッシュもない"""
+
+
+class DiscoveryCrawler:
+    """ホスト別スケジューラ + サイクル内結果共有つきの検索クローラ"""
+
+    DEFAULT_HOST_LIMIT = 4
+    HOST_LIMITS = {
+        "api.github.com": 2,        # 未認証の検索APIは 10回/分
+        "registry.npmjs.org": 6
+    }
+
+    NPM_SEARCH_SIZE = 20
+    GITHUB_PER_PAGE = 10
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        """プロセス内で共有するクローラ"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def __init__(self, http_cache=None, max_workers=8, max_rate_limit_wait=60):
+        self.http_cache = http_cache or HTTPCache(".http_cache/discovery")
+        self.max_workers = max_workers
+        self.max_rate_limit_wait = max_rate_limit_wait
+
+        self._lock = threading.Lock()
+        self._results = {}        # url -> Future (現在のサイクル内で共有)
+        self._host_slots = {}     # host -> Semaphore
+        self._blocked_until = {}  # host -> epoch秒
+        self.stats = {"requests": 0, "shared": 0, "rate_limited": 0}
+
+    def new_cycle(self):
+        """サイクル内の共有結果を破棄 (デーモンの定期チェックごとに呼ぶ)"""
+        with self._lock:
+            self._results.clear()
+            self.stats = {"requests": 0, "shared": 0, "rate_limited": 0}
+
+    # ------------------------------------------------------------------ URL
+
+    def npm_search_url(self, term):
+        return f"https://registry.npmjs.org/-/v1/search?text={term}&size={self.NPM_SEARCH_SIZE}"
+
+    def github_search_url(self, query):
+        return f"https://api.github.com/search/repositories?q={query}&sort=updated&per_page={self.GITHUB_PER_PAGE}"
+
+    # ------------------------------------------------------------------ 取得
+
+    def fetch(self, url, timeout=10):
+        """URLを取得 (同じサイクル内の2回目以降は最初の結果を共有)"""
+        with self._lock:
+            future = self._results.get(url)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._results[url] = future
+                self.stats["requests"] += 1
+            else:
+                self.stats["shared"] += 1
+
+        if leader:
+            try:
+                future.set_result(self._fetch_scheduled(url, timeout))
+            except Exception as e:
+                future.set_exception(e)
+
+        return future.result()
+
+    def fetch_many(self, urls, timeout=10):
+        """複数URLを並列取得 -> {url: レスポンス または Exception}"""
+        def fetch(url):
+            try:
+                return self.fetch(url, timeout)
+            except Exception as e:
+                return e
+
+        unique_urls = list(dict.fromkeys(urls))
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, max(len(unique_urls), 1))) as executor:
+            return dict(zip(unique_urls, executor.map(fetch, unique_urls)))
+
+    def prefetch(self, npm_terms=(), github_queries=()):
+        """検索語をまとめて並列取得しておく (以降の npm_search / github_search は共有結果を使う)"""
+        urls = [self.npm_search_url(t) for t in npm_terms] + [self.github_search_url(q) for q in github_queries]
+        return self.fetch_many(urls)
+
+    def npm_search(self, term):
+        """npm検索 -> package dict のリスト"""
+        response = self.fetch(self.npm_search_url(term))
+        if response.status_code != 200:
+            raise RuntimeError(f"npm search HTTP {response.status_code}")
+        return [obj.get("package", {}) for obj in response.json().get("objects", [])]
+
+    def github_search(self, query):
+        """GitHubリポジトリ検索 -> item dict のリスト"""
+        response = self.fetch(self.github_search_url(query))
+        if response.status_code != 200:
+            raise RuntimeError(f"GitHub search HTTP {response.status_code}")
+        return response.json().get("items", [])
+
+    # ------------------------------------------------------------------ スケジューリング
+
+    def _slot(self, host):
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = threading.Semaphore(self.HOST_LIMITS.get(host, self.DEFAULT_HOST_LIMIT))
+                self._host_slots[host] = slot
+            return slot
+
+    def _fetch_scheduled(self, url, timeout):
+        host = urlparse(url).netloc
+
+        for attempt in range(2):
+            wait = self._blocked_until.get(host, 0) - time.time()
+            if wait > 0:
+                if wait > self.max_rate_limit_wait:
+                    # 解除まで待てない: 保存済みの内容で代用する
+                    with self._lock:
+                        self.stats["rate_limited"] += 1
+                    cached = self.http_cache.cached(url)
+                    if cached:
+                        return cached
+                    raise RateLimited(f"{host} rate limited for {wait:.0f}s")
+                time.sleep(wait)
+
+            with self._slot(host):
+                response = self.http_cache.get(url, timeout=timeout)
+
+            self._observe_rate_limit(host, response)
+            # 制限に掛かった場合は解除を待って1回だけやり直す
+            if response.status_code in (403, 429) and not attempt and self._blocked_until.get(host, 0) > time.time():
+                continue
+            return response
+
+    def _observe_rate_limit(self, host, response):
+        """X-RateLimit-Remaining / X-RateLimit-Reset / Retry-After からホストの待機時刻を決める"""
+        headers = {k.lower(): v for k, v in response.headers.items()}
+        blocked_until = None
+
+        try:
+            if response.status_code in (403, 429) and "retry-after" in headers:
+                blocked_until = time.time() + float(headers["retry-after"])
+            elif headers.get("x-ratelimit-remaining") == "0" and "x-ratelimit-reset" in headers:
+                blocked_until = float(headers["x-ratelimit-reset"])
+        except ValueError:
+            return
+
+        if blocked_until:
+            with self._lock:
+                self._blocked_until[host] = max(self._blocked_until.get(host, 0), blocked_until)
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Discovery Store - 自動リサーチ発見情報の追記型ストア
+==================================================
+発見情報を JSONL に追記し、安定した識別キー (パッケージ名 / リポジトリURL /
+ドキュメントURL+コマンド) ごとの索引を別ファイルに持つ。
+「既出か?」の判定は索引 (メモリ上の dict) で O(1)、レポートは前回以降の追記分だけを読む。
+同じキーの更新は追記で表し、古い版は compact() で取り除く。
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+
+def discovery_key(discovery):
+    """発見情報の安定した識別キー"""
+    kind = discovery.get("type", "unknown")
+
+    if kind == "npm_mcp_package":
+        return f"npm:{discovery.get('name', '')}"
+    if kind == "awesome_github_repo":
+        return f"github:{discovery.get('url') or discovery.get('name', '')}"
+    if kind in ("official_command", "official_mcp_tool"):
+        return f"doc:{discovery.get('source', '')}#{discovery.get('command') or discovery.get('tool_name', '')}"
+    if kind in ("claude_command", "hidden_mcp_command"):
+        return f"cmd:{discovery.get('command', '')}"
+    if kind == "claude_desktop_mcp":
+        return f"desktop:{discovery.get('server_name', '')}:{discovery.get('command', '')}"
+
+    # 未知の種類: 発見時刻以外の内容で識別
+    body = {k: v for k, v in discovery.items() if k != "discovered_at"}
+    return f"{kind}:" + hashlib.sha1(json.dumps(body, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+# 項目の内容ではなく、どこで・いつ見つけたかを表す (または実行ごとに変わる) フィールド
+VOLATILE_FIELDS = ("discovered_at", "source", "stars")
+
+
+def content_hash(discovery):
+    """内容の変化検出用 (発見時刻・発見元・スター数は除く)"""
+    body = {k: v for k, v in discovery.items() if k not in VOLATILE_FIELDS}
+    return hashlib.sha1(json.dumps(body, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+
+class DiscoveryStore:
+    """追記型の発見情報ストア
+
+    ファイル構成 (path = xxx.jsonl):
+      xxx.jsonl       - 発見情報 (1行1件、追記のみ)
+      xxx.jsonl.idx   - 索引 (キー \\t 行のオフセット \\t 内容ハッシュ、追記のみ)
+      xxx.jsonl.state - 前回レポート時点のオフセット
+    """
+
+    def __init__(self, path="auto_research_discoveries.jsonl", legacy_path=None, compact_ratio=2.0):
+        self.path = path
+        self.index_path = path + ".idx"
+        self.state_path = path + ".state"
+        self.compact_ratio = compact_ratio  # 総行数 / 有効件数 がこれを超えたら compact
+
+        self._lock = threading.Lock()
+        self._index = {}  # key -> (offset, hash)
+        self._records = 0  # データファイルの総行数 (古い版を含む)
+
+        if legacy_path and not os.path.exists(self.path) and os.path.exists(legacy_path):
+            self._migrate(legacy_path)
+        else:
+            self._load_index()
+
+    def __len__(self):
+        return len(self._index)
+
+    def seen(self, discovery):
+        """同じ識別キーの発見情報が登録済みか"""
+        return discovery_key(discovery) in self._index
+
+    # ------------------------------------------------------------------ 索引
+
+    def _load_index(self):
+        """索引を読み込み、索引より後ろに追記されたデータがあれば取り込む"""
+        indexed_until = 0
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding="utf-8") as f:
+                for line in f:
+                    parts = line.rstrip("\n").split("\t")
+                    if len(parts) != 3:
+                        continue  # 書きかけの行
+                    key, offset, digest = parts
+                    self._index[key] = (int(offset), digest)
+                    self._records += 1
+                    indexed_until = max(indexed_until, int(offset) + 1)
+
+        if os.path.exists(self.path) and os.path.getsize(self.path) > indexed_until:
+            self._reindex_from(indexed_until)
+
+    def _reindex_from(self, start):
+        """start 以降のデータ行を索引に追加 (索引の書き込み前に中断した場合の復旧)"""
+        entries = []
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            # start が行の途中なら次の行頭まで進める
+            if start:
+                f.seek(start - 1)
+                if f.read(1) != b"\n":
+                    f.readline()
+            while True:
+                offset = f.tell()
+                line = f.readline()
+                if not line:
+                    break
+                if not line.endswith(b"\n"):
+                    break  # 書きかけの最終行
+                try:
+                    discovery = json.loads(line)
+                except ValueError:
+                    continue
+                entries.append((discovery_key(discovery), offset, content_hash(discovery)))
+
+        self._append_index(entries)
+
+    def _append_index(self, entries):
+        if not entries:
+            return
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            for key, offset, digest in entries:
+                f.write(f"{key}\t{offset}\t{digest}\n")
+                self._index[key] = (offset, digest)
+                self._records += 1
+
+    # ------------------------------------------------------------------ 追加
+
+    def add_many(self, discoveries):
+        """未登録または内容が変わった発見情報だけを追記する
+
+        戻り値: (新規のリスト, 更新されたリスト)
+        """
+        # 同じ回の中で同じキーが複数回見つかった場合 (複数の検索に同じリポジトリが出た等) は1件にまとめる
+        batch = {}
+        for discovery in discoveries:
+            key = discovery_key(discovery)
+            batch[key] = {**batch[key], **discovery} if key in batch else discovery
+
+        new, updated = [], []
+        with self._lock:
+            for key, discovery in batch.items():
+                known = self._index.get(key)
+                if known is None:
+                    new.append(discovery)
+                elif not self._same_content(key, known, content_hash(discovery)):
+                    updated.append(discovery)
+
+            if not new and not updated:
+                return new, updated
+
+            entries = []
+            with open(self.path, "ab") as f:
+                for discovery in new + updated:
+                    offset = f.tell()
+                    f.write(json.dumps(discovery, ensure_ascii=False).encode("utf-8") + b"\n")
+                    entries.append((discovery_key(discovery), offset, content_hash(discovery)))
+            self._append_index(entries)
+
+        return new, updated
+
+    def _same_content(self, key, known, digest):
+        """登録済みの版と内容が同じか"""
+        offset, known_digest = known
+        if known_digest == digest:
+            return True
+        # 索引のハッシュが旧方式 (発見元・スター数を含む) で計算されている場合は登録済みの版から計算し直す
+        try:
+            with open(self.path, "rb") as f:
+                stored_digest = content_hash(self._read_at(f, offset))
+        except (OSError, ValueError):
+            return False
+        if stored_digest != digest:
+            return False
+        self._index[key] = (offset, stored_digest)  # 次の compact で索引ファイルにも反映される
+        return True
+
+    # ------------------------------------------------------------------ 読み込み
+
+    def _read_at(self, f, offset):
+        f.seek(offset)
+        return json.loads(f.readline())
+
+    def all(self):
+        """全発見情報 (キーごとに最新版)"""
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, "rb") as f:
+            offsets = sorted(offset for offset, _ in self._index.values())
+            return [self._read_at(f, offset) for offset in offsets]
+
+    def since_last_report(self):
+        """前回 mark_reported() 以降に追記された発見情報 (キーごとに最新版)"""
+        start = self._read_state().get("reported_offset", 0)
+        if not os.path.exists(self.path) or os.path.getsize(self.path) <= start:
+            return []
+
+        latest = {}
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            for line in f:
+                try:
+                    discovery = json.loads(line)
+                except ValueError:
+                    continue
+                latest[discovery_key(discovery)] = discovery
+        return list(latest.values())
+
+    def mark_reported(self):
+        """ここまでをレポート済みにする (必要なら compact してから)"""
+        with self._lock:
+            if self._index and self._records > len(self._index) * self.compact_ratio:
+                self._compact_locked()
+            size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+            self._write_state({"reported_offset": size})
+
+    def _read_state(self):
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_state(self, state):
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    # ------------------------------------------------------------------ 保守
+
+    def compact(self):
+        """古い版を取り除いてデータと索引を書き直す"""
+        with self._lock:
+            self._compact_locked()
+
+    def _compact_locked(self):
+        if not os.path.exists(self.path):
+            return
+        before = self._records
+        reported = self._read_state().get("reported_offset", 0)
+        new_reported = None
+
+        entries = []
+        tmp_data = self.path + ".tmp"
+        with open(self.path, "rb") as src, open(tmp_data, "wb") as dst:
+            for key, (offset, digest) in sorted(self._index.items(), key=lambda item: item[1][0]):
+                # 未レポート分の開始位置を書き直し後のオフセットに付け替える
+                if new_reported is None and offset >= reported:
+                    new_reported = dst.tell()
+                src.seek(offset)
+                entries.append((key, dst.tell(), digest))
+                dst.write(src.readline())
+            if new_reported is None:
+                new_reported = dst.tell()
+
+        tmp_index = self.index_path + ".tmp"
+        with open(tmp_index, "w", encoding="utf-8") as f:
+            for key, offset, digest in entries:
+                f.write(f"{key}\t{offset}\t{digest}\n")
+
+        os.replace(tmp_data, self.path)
+        os.replace(tmp_index, self.index_path)
+        self._write_state({"reported_offset": new_reported})
+        self._index = {key: (offset, digest) for key, offset, digest in entries}
+        self._records = len(entries)
+        print(f"🧹 発見情報ストアを整理: {before} → {self._records} 行")
+
+    def _migrate(self, legacy_path):
+        """旧形式 (JSON配列の全体書き換え) からの移行。既存分はレポート済みとして扱う"""
+        try:
+            with open(legacy_path, encoding="utf-8") as f:
+                legacy = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 旧発見情報の読み込みエラー: {e}")
+            legacy = []
+
+        new, updated = self.add_many(legacy)
+        self.mark_reported()
+        print(f"📦 {legacy_path} から {len(new) + len(updated)} 件を移行")
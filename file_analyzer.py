@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+File Analyzer - ファイル構造解析 (内容ハッシュでメモ化)
+=====================================================
+Python は ast で関数・クラス (async / 入れ子 / メソッドを含む)・循環的複雑度・import を、
+Markdown は行単位のトークナイザで見出し・wikilink・リンク・コードブロック・タグを数える。
+
+結果は「解析器のバージョン + 内容の SHA-256」をキーにディスクへ保存するので、
+内容が変わっていないファイルは再解析しない (別名・別ディレクトリのコピーでも共有される)。
+同じプロセス内ではパス・サイズ・mtime が同じならファイルを読み直しもしない。
+"""
+
+import ast
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+
+ANALYZER_VERSION = 1  # 解析結果の形を変えたら上げる (古いキャッシュは使われなくなる)
+DEFAULT_CACHE_DIR = os.getenv(
+    "FILE_ANALYZER_CACHE",
+    os.path.join(os.getenv("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "file_analyzer")
+)
+MAX_FILE_SIZE = 5 * 1024 * 1024  # これより大きいファイルは解析しない
+
+LANGUAGES = {".py": "Python", ".md": "Markdown", ".markdown": "Markdown"}
+
+
+# ---------------------------------------------------------------------- Python
+
+# 分岐を1つ増やす構文 (BoolOp と内包表記は個別に数える)
+_BRANCH_NODES = (ast.If, ast.For, ast.AsyncFor, ast.While, ast.IfExp, ast.ExceptHandler,
+                 ast.Assert) + ((ast.match_case,) if hasattr(ast, "match_case") else ())
+
+
+def _complexity(node):
+    """関数1つの循環的複雑度 (入れ子の関数・クラスの中身は含めない)"""
+    score = 1
+    stack = list(ast.iter_child_nodes(node))
+    while stack:
+        child = stack.pop()
+        if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)):
+            continue
+        if isinstance(child, _BRANCH_NODES):
+            score += 1
+        elif isinstance(child, ast.BoolOp):
+            score += len(child.values) - 1
+        elif isinstance(child, ast.comprehension):
+            score += 1 + len(child.ifs)
+        stack.extend(ast.iter_child_nodes(child))
+    return score
+
+
+def analyze_python(source):
+    """Python ソースの解析結果 (構文エラーなら行数と error だけ)"""
+    lines = source.count("\n") + (1 if source and not source.endswith("\n") else 0)
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError) as e:
+        return {"lines": lines, "error": f"SyntaxError: {e}"}
+
+    symbols = []
+    modules = set()
+    import_count = 0
+
+    def visit(node, scope, in_class):
+        nonlocal import_count
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                kind = "method" if in_class else "function"
+                if isinstance(child, ast.AsyncFunctionDef):
+                    kind = "async_" + kind
+                name = scope + child.name
+                symbols.append({
+                    "name": name,
+                    "kind": kind,
+                    "line": child.lineno,
+                    "end_line": getattr(child, "end_lineno", child.lineno),
+                    "complexity": _complexity(child)
+                })
+                visit(child, name + ".", False)
+            elif isinstance(child, ast.ClassDef):
+                name = scope + child.name
+                symbols.append({
+                    "name": name,
+                    "kind": "class",
+                    "line": child.lineno,
+                    "end_line": getattr(child, "end_lineno", child.lineno)
+                })
+                visit(child, name + ".", True)
+            else:
+                if isinstance(child, ast.Import):
+                    import_count += 1
+                    modules.update(alias.name for alias in child.names)
+                elif isinstance(child, ast.ImportFrom):
+                    import_count += 1
+                    modules.add("." * child.level + (child.module or ""))
+                visit(child, scope, in_class)
+
+    visit(tree, "", False)
+
+    functions = [s for s in symbols if s["kind"] != "class"]
+    complexities = [s["complexity"] for s in functions]
+    return {
+        "lines": lines,
+        "functions": len(functions),
+        "classes": len(symbols) - len(functions),
+        "imports": import_count,
+        "modules": sorted(modules),
+        "complexity": {
+            "total": sum(complexities),
+            "max": max(complexities, default=0),
+            "average": round(sum(complexities) / len(complexities), 2) if complexities else 0
+        },
+        "symbols": symbols
+    }
+
+
+# ---------------------------------------------------------------------- Markdown
+
+_FENCE = re.compile(r"^ {0,3}(`{3,}|~{3,})\s*([^`\s]*)")
+_ATX_HEADING = re.compile(r"^ {0,3}(#{1,6})(?:[ \t]+(.*?))?[ \t]*#*[ \t]*$")
+_SETEXT = re.compile(r"^ {0,3}(=+|-+)[ \t]*$")
+_INLINE_CODE = re.compile(r"(`+)(?:(?!\1).)+?\1")
+_WIKILINK = re.compile(r"(!?)\[\[([^\]\|#\n]*)(#[^\]\|\n]*)?(?:\|[^\]\n]*)?\]\]")
+_MD_LINK = re.compile(r"(?<!!)\[[^\]\n]*\]\(([^)\s]+)(?:\s+\"[^\"]*\")?\)")
+_IMAGE = re.compile(r"!\[[^\]\n]*\]\([^)\n]+\)")
+# Obsidian のタグ: 空白の直後の #、数字だけのものは除く
+_TAG = re.compile(r"(?:^|(?<=\s))#([\w/\-]*[^\W\d][\w/\-]*)")
+
+
+def analyze_markdown(text):
+    """Markdown の解析結果 (コードブロック・インラインコード内は見出し・リンクとして数えない)"""
+    lines = text.splitlines()
+    headings = []
+    code_blocks = []
+    wikilinks = []
+    embeds = 0
+    links = 0
+    images = 0
+    tags = set()
+
+    start = 0
+    if lines and lines[0].strip() == "---":
+        # YAML フロントマター (閉じの --- を見出しの下線と誤認しないよう飛ばす)
+        for index in range(1, len(lines)):
+            if lines[index].strip() in ("---", "..."):
+                start = index + 1
+                break
+
+    fence = None  # 開いているコードブロックのフェンス文字列
+    previous = ""
+    for number, line in enumerate(lines[start:], start + 1):
+        match = _FENCE.match(line)
+        if fence is not None:
+            if match and match.group(1)[0] == fence[0] and len(match.group(1)) >= len(fence) \
+                    and not line.strip()[len(match.group(1)):].strip():
+                fence = None
+            else:
+                code_blocks[-1]["lines"] += 1
+            previous = ""
+            continue
+        if match:
+            fence = match.group(1)
+            code_blocks.append({"language": match.group(2) or None, "line": number, "lines": 0})
+            previous = ""
+            continue
+
+        heading = _ATX_HEADING.match(line)
+        if heading:
+            headings.append({"level": len(heading.group(1)), "text": (heading.group(2) or "").strip(),
+                             "line": number})
+        elif previous.strip() and _SETEXT.match(line) and not _ATX_HEADING.match(previous):
+            headings.append({"level": 1 if line.strip()[0] == "=" else 2, "text": previous.strip(),
+                             "line": number - 1})
+            previous = ""
+            continue
+
+        prose = _INLINE_CODE.sub("", line)
+        for link in _WIKILINK.finditer(prose):
+            if link.group(1):
+                embeds += 1
+            else:
+                wikilinks.append(link.group(2).strip() or (link.group(3) or "").strip())
+        prose = _WIKILINK.sub("", prose)
+        images += len(_IMAGE.findall(prose))
+        links += len(_MD_LINK.findall(prose))
+        if not heading:
+            tags.update(_TAG.findall(prose))
+        previous = line
+
+    return {
+        "lines": len(lines),
+        "headings": len(headings),
+        "outline": headings,
+        "code_blocks": len(code_blocks),
+        "code_languages": sorted({block["language"] for block in code_blocks if block["language"]}),
+        "links": links,
+        "wikilinks": sorted(set(wikilinks)),
+        "wikilink_count": len(wikilinks),
+        "embeds": embeds,
+        "images": images,
+        "tags": sorted(tags)
+    }
+
+
+ANALYZERS = {"Python": analyze_python, "Markdown": analyze_markdown}
+
+
+# ---------------------------------------------------------------------- メモ化
+
+class FileAnalyzer:
+    """内容ハッシュでメモ化する解析器 (ディスクキャッシュ + プロセス内キャッシュ)"""
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        """プロセス内で共有する解析器"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.stats = {"memory": 0, "disk": 0, "analyzed": 0}
+        self._memory = {}  # abspath -> ((size, mtime_ns), result)
+        self._lock = threading.Lock()
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        except OSError as e:
+            # MCPサーバーの stdout はプロトコル用なので警告は stderr へ
+            print(f"⚠️ 解析キャッシュを作成できません ({e})。キャッシュなしで解析します", file=sys.stderr)
+            self.cache_dir = None
+
+    @staticmethod
+    def language(path):
+        return LANGUAGES.get(os.path.splitext(path)[1].lower())
+
+    def analyze(self, path):
+        """ファイルを解析 -> dict (未対応の拡張子なら None)"""
+        language = self.language(path)
+        if language is None:
+            return None
+
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        signature = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            cached = self._memory.get(path)
+            if cached and cached[0] == signature:
+                self.stats["memory"] += 1
+                return cached[1]
+
+        if stat.st_size > MAX_FILE_SIZE:
+            return {"lines": None, "error": f"File too large to analyze ({stat.st_size} bytes)"}
+
+        with open(path, "rb") as f:
+            data = f.read()
+        result = self.analyze_bytes(data, language)
+        with self._lock:
+            self._memory[path] = (signature, result)
+        return result
+
+    def analyze_bytes(self, data, language):
+        """内容を解析 (同じ内容の解析結果がディスクにあればそれを返す)"""
+        digest = hashlib.sha256(f"{ANALYZER_VERSION}:{language}:".encode("utf-8") + data).hexdigest()
+        result = self._load(digest)
+        if result is not None:
+            with self._lock:
+                self.stats["disk"] += 1
+            return result
+
+        result = ANALYZERS[language](data.decode("utf-8", errors="replace"))
+        with self._lock:
+            self.stats["analyzed"] += 1
+        self._store(digest, result)
+        return result
+
+    def _path(self, digest):
+        return os.path.join(self.cache_dir, digest[:2], digest + ".json")
+
+    def _load(self, digest):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(digest), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, digest, result):
+        if not self.cache_dir:
+            return
+        path = self._path(digest)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 並列解析中に書きかけを読まないよう一時ファイルから置き換える
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(result, f, ensure_ascii=False)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        except OSError as e:
+            print(f"⚠️ 解析キャッシュ保存エラー: {e}", file=sys.stderr)
@@ -1,40 +1,147 @@
 #!/usr/bin/env python3
 """
 Claude API Report Generation Script
+
+output/research_results.jsonl (research.py が1クエリ1行で追記) を先頭から読み、
+クエリごとのセクションを Markdown / PDF に1つずつ書き出す。
+Claude が生成したセクションは入力内容のハッシュでキャッシュするため、
+クエリを1件追加して再生成した場合は新しいセクションだけが Claude を呼ぶ。
+フィードは追記のみなので、生成前に同じクエリの古い結果と上限を超えた古い行を詰める。
 """
 
-import os
+import hashlib
 import json
+import os
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from xml.sax.saxutils import escape
+
 from anthropic import Anthropic
-import markdown2
 from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Frame, PageTemplate
 from reportlab.lib.styles import getSampleStyleSheet
 
-def generate_report_with_claude():
-    """Claude APIを使用してレポートを生成"""
-    api_key = os.environ.get('ANTHROPIC_API_KEY')
-    if not api_key:
-        raise ValueError("ANTHROPIC_API_KEY environment variable not set")
-    
-    # リサーチ結果を読み込み
-    with open('output/research_results.json', 'r', encoding='utf-8') as f:
-        research_data = json.load(f)
-    
-    client = Anthropic(api_key=api_key)
-    
-    # Claudeでレポート生成
+RESULTS_FEED = "output/research_results.jsonl"
+LEGACY_RESULTS = "output/research_results.json"
+SECTION_CACHE_DIR = "output/.report_sections"
+# フィードに残す最大件数 (超えた分は古い順に捨てる)
+MAX_FEED_RECORDS = int(os.getenv("REPORT_FEED_MAX_RECORDS", "500"))
+
+MODEL = "claude-3-sonnet-20240229"
+PROMPT_VERSION = 1  # プロンプトを変えたら上げる (キャッシュ無効化)
+
+
+def iter_research_results(feed=RESULTS_FEED, legacy=LEGACY_RESULTS):
+    """リサーチ結果を1件ずつ読む (JSONL がなければ旧形式の単一 JSON)"""
+    if os.path.exists(feed):
+        with open(feed, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif os.path.exists(legacy):
+        with open(legacy, 'r', encoding='utf-8') as f:
+            yield json.load(f)
+
+
+def compact_feed(feed=RESULTS_FEED, max_records=MAX_FEED_RECORDS):
+    """フィードを詰める: 同じクエリは最新の結果だけ、全体は新しい max_records 件まで
+
+    詰める必要がなければ書き換えない。読み込み後に research.py が追記していたら
+    その行を失わないよう今回は書き換えを見送る。戻り値は捨てた行数。
+    """
+    try:
+        size = os.path.getsize(feed)
+        with open(feed, 'r', encoding='utf-8') as f:
+            lines = [line for line in f if line.strip()]
+    except OSError:
+        return 0
+
+    latest = {}
+    for index, line in enumerate(lines):
+        try:
+            query = json.loads(line).get("query", "")
+        except ValueError:
+            continue  # 壊れた行は捨てる
+        latest[" ".join(str(query).split()).lower()] = index
+    kept = sorted(latest.values())
+    if max_records:
+        kept = kept[-max_records:]
+    if len(kept) == len(lines):
+        return 0
+
+    tmp_path = feed + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for index in kept:
+            f.write(lines[index].rstrip("\n") + "\n")
+    if os.path.getsize(feed) != size:
+        os.remove(tmp_path)
+        return 0
+    os.replace(tmp_path, feed)
+    return len(lines) - len(kept)
+
+
+def section_key(record):
+    """セクションのキャッシュキー (入力とプロンプト・モデルが同じなら同じ出力とみなす)"""
+    source = json.dumps({
+        "model": MODEL,
+        "prompt_version": PROMPT_VERSION,
+        "query": record.get("query", ""),
+        "results": record.get("results", "")
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+class SectionCache:
+    """生成済みセクションのディスクキャッシュ"""
+
+    def __init__(self, cache_dir=SECTION_CACHE_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.md")
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, key, content):
+        tmp_path = self._path(key) + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, self._path(key))
+
+    def prune(self, keep):
+        """keep (キーの集合) に含まれないセクションを削除 (フィードから消えたクエリの分)"""
+        removed = 0
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".md") and name[:-len(".md")] not in keep:
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
+
+
+def render_section(client, record):
+    """Claudeで1クエリ分のレポートセクションを生成"""
     message = client.messages.create(
-        model="claude-3-sonnet-20240229",
+        model=MODEL,
         max_tokens=4000,
         temperature=0,
         messages=[
             {
                 "role": "user",
                 "content": f"""Based on the following research results, create a comprehensive report in Markdown format.
-                
-Research Query: {research_data['query']}
-Research Results: {research_data['results']}
+
+Research Query: {record['query']}
+Research Results: {record['results']}
 
 Please structure the report with:
 1. Executive Summary
@@ -47,44 +154,192 @@ Make it professional and well-formatted."""
             }
         ]
     )
-    
-    report_content = message.content[0].text
-    
-    # Markdownファイルとして保存
-    with open('output/research_report.md', 'w', encoding='utf-8') as f:
-        f.write(f"# Research Report: {research_data['query']}\n\n")
-        f.write(f"Generated on: {research_data['timestamp']}\n\n")
-        f.write(report_content)
-    
-    # PDFとして保存
-    create_pdf_report(research_data['query'], report_content)
-    
+    return message.content[0].text
+
+
+def iter_sections(records, cache, lookahead=3):
+    """(record, content, cached) を入力順に1件ずつ返す
+
+    キャッシュにないセクションは最大 lookahead 件先まで並行して Claude に依頼しておく。
+    """
+    client = None
+
+    def get_client():
+        nonlocal client
+        if client is None:
+            api_key = os.environ.get('ANTHROPIC_API_KEY')
+            if not api_key:
+                raise ValueError("ANTHROPIC_API_KEY environment variable not set")
+            client = Anthropic(api_key=api_key)
+        return client
+
+    def produce(record, key):
+        content = cache.get(key)
+        if content is not None:
+            return content, True
+        content = render_section(get_client(), record)
+        cache.put(key, content)
+        return content, False
+
+    with ThreadPoolExecutor(max_workers=lookahead) as executor:
+        window = deque()
+        for record in records:
+            window.append((record, executor.submit(produce, record, section_key(record))))
+            if len(window) >= lookahead:
+                record, future = window.popleft()
+                yield (record,) + future.result()
+        while window:
+            record, future = window.popleft()
+            yield (record,) + future.result()
+
+
+def demote_headings(content):
+    """セクション本文の見出しを2段下げる (文書タイトル # ・クエリ見出し ## の下に入れるため)"""
+    return re.sub(r'^(#{1,4}) ', r'##\1 ', content, flags=re.MULTILINE)
+
+
+class MarkdownReportWriter:
+    """Markdownレポートをセクション単位で追記"""
+
+    def __init__(self, path, title):
+        self.path = path
+        self.tmp_path = path + ".tmp"
+        self.f = open(self.tmp_path, 'w', encoding='utf-8')
+        self.f.write(f"# {title}\n\n")
+        self.f.write(f"Generated on: {datetime.now().isoformat()}\n\n")
+
+    def add_section(self, record, content):
+        self.f.write(f"## {record['query']}\n\n")
+        self.f.write(f"Researched on: {record.get('timestamp', '')}\n\n")
+        self.f.write(demote_headings(content).rstrip() + "\n\n")
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+        os.replace(self.tmp_path, self.path)
+
+
+class PDFReportWriter:
+    """reportlab のページ組版をフロウアブル1つずつ進める
+
+    SimpleDocTemplate.build() は全フロウアブルのリストを受け取るが、内部は
+    _startBuild → handle_flowable の繰り返し → _endBuild なので、それを直接呼んで
+    セクションが届くたびにページへ流し込む。
+    これらは reportlab の非公開 API なので、使えない版ではフロウアブルをためておき、
+    close() で公開の build() にまとめて渡す。
+    """
+
+    INCREMENTAL_API = ('_startBuild', '_endBuild', 'handle_flowable', 'clean_hanging')
+
+    def __init__(self, path, title):
+        self.styles = getSampleStyleSheet()
+        self.doc = SimpleDocTemplate(path, pagesize=letter)
+        self._flowables = None  # build() で組版する場合にためるフロウアブル
+        try:
+            self._start_incremental()
+        except (AttributeError, TypeError) as e:
+            print(f"⚠️ reportlab incremental layout unavailable ({e}); building the PDF at the end")
+            self.doc = SimpleDocTemplate(path, pagesize=letter)
+            self._flowables = []
+
+        self._emit(Paragraph(escape(title), self.styles['Title']))
+        self._emit(Spacer(1, 12))
+
+    def _start_incremental(self):
+        missing = [name for name in self.INCREMENTAL_API if not hasattr(self.doc, name)]
+        if missing:
+            raise AttributeError(f"SimpleDocTemplate has no {', '.join(missing)}")
+        frame = Frame(self.doc.leftMargin, self.doc.bottomMargin, self.doc.width, self.doc.height, id='normal')
+        self.doc.addPageTemplates([
+            PageTemplate(id='First', frames=frame, pagesize=self.doc.pagesize),
+            PageTemplate(id='Later', frames=frame, pagesize=self.doc.pagesize)
+        ])
+        self.doc._startBuild()
+        self.doc.canv._doctemplate = self.doc
+
+    def _emit(self, flowable):
+        if self._flowables is not None:
+            self._flowables.append(flowable)
+            return
+        # handle_flowable はページをまたぐ場合に残りをリスト先頭へ戻すので、空になるまで回す
+        pending = [flowable]
+        while pending:
+            self.doc.clean_hanging()
+            self.doc.handle_flowable(pending)
+
+    def add_section(self, record, content):
+        self._emit(Paragraph(escape(record['query']), self.styles['Heading1']))
+        self._emit(Spacer(1, 6))
+        for flowable in self._markdown_flowables(demote_headings(content)):
+            self._emit(flowable)
+
+    def _markdown_flowables(self, content):
+        """Markdownを1行ずつフロウアブルに変換 (見出し・箇条書き・太字のみ対応)"""
+        for line in content.split('\n'):
+            if not line.strip():
+                continue
+
+            heading = re.match(r'^(#{1,6}) (.*)', line)
+            if heading:
+                # クエリ見出しが Heading1 なので、本文の ### から Heading2 に対応させる
+                level = min(max(len(heading.group(1)) - 1, 1), 3)
+                text, style = heading.group(2), self.styles[f'Heading{level}']
+            else:
+                text, style = line, self.styles['Normal']
+
+            html = re.sub(r'\*\*(.+?)\*\*', r'<b>\1</b>', escape(text))
+            bullet = re.match(r'^\s*[-*] (.*)', html)
+            if bullet and not heading:
+                yield Paragraph(bullet.group(1), style, bulletText='•')
+            else:
+                yield Paragraph(html, style)
+            yield Spacer(1, 6)
+
+    def close(self):
+        if self._flowables is not None:
+            self.doc.build(self._flowables)
+            return
+        del self.doc.canv._doctemplate
+        self.doc._endBuild()
+
+
+def generate_report_with_claude(feed=RESULTS_FEED, output_dir="output"):
+    """Claude APIを使用してレポートを生成 (セクション単位のストリーミング)"""
+    os.makedirs(output_dir, exist_ok=True)
+    md_path = os.path.join(output_dir, "research_report.md")
+    pdf_path = os.path.join(output_dir, "research_report.pdf")
+
+    dropped = compact_feed(feed)
+    if dropped:
+        print(f"🧹 Compacted feed: dropped {dropped} superseded records")
+
+    cache = SectionCache()
+    markdown_writer = MarkdownReportWriter(md_path, "Research Report")
+    pdf_writer = PDFReportWriter(pdf_path, "Research Report")
+
+    rendered = reused = 0
+    used_keys = set()
+    for record, content, cached in iter_sections(iter_research_results(feed), cache):
+        used_keys.add(section_key(record))
+        markdown_writer.add_section(record, content)
+        pdf_writer.add_section(record, content)
+        if cached:
+            reused += 1
+        else:
+            rendered += 1
+        print(f"{'♻️' if cached else '🧠'} {record['query']}")
+
+    markdown_writer.close()
+    pdf_writer.close()
+    # フィードから消えたクエリのセクションはもう使わない
+    cache.prune(used_keys)
+
     print("✅ Report generated successfully!")
+    print(f"📊 Sections: {rendered} generated, {reused} cached")
     print("📄 Files created:")
-    print("   - output/research_report.md")
-    print("   - output/research_report.pdf")
-
-def create_pdf_report(query, content):
-    """PDFレポートを作成"""
-    doc = SimpleDocTemplate("output/research_report.pdf", pagesize=letter)
-    styles = getSampleStyleSheet()
-    story = []
-    
-    # タイトル
-    title = Paragraph(f"Research Report: {query}", styles['Title'])
-    story.append(title)
-    story.append(Spacer(1, 12))
-    
-    # コンテンツをHTMLに変換してPDFに追加
-    html_content = markdown2.markdown(content)
-    # 簡単な実装のため、プレーンテキストとして追加
-    for line in content.split('\n'):
-        if line.strip():
-            para = Paragraph(line, styles['Normal'])
-            story.append(para)
-            story.append(Spacer(1, 6))
-    
-    doc.build(story)
+    print(f"   - {md_path}")
+    print(f"   - {pdf_path}")
+
 
 if __name__ == "__main__":
     generate_report_with_claude()
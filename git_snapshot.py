@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Git Snapshot - リポジトリ状態のプロセス内キャッシュ
+=================================================
+ブランチ・作業ツリーの状態・コミット件名・ファイルごとの直近履歴を1つのスナップショットに
+まとめ、問い合わせのたびに git を起動しない。
+.git/HEAD・現在のブランチの ref ファイル・packed-refs の mtime が変わったら作り直す。
+
+- ブランチは .git/HEAD を直接読む (git を起動しない)
+- コミット履歴は git log --name-only を1回だけ実行し、ファイル別の索引も同時に作る
+- 作業ツリーと index の変更はスタンプに含めないため、status だけは STATUS_TTL 秒で取り直す
+"""
+
+import os
+import subprocess
+import threading
+import time
+
+LOG_WINDOW = int(os.getenv("GIT_SNAPSHOT_LOG_WINDOW", "500"))  # 一括取得するコミット数
+STATUS_TTL = float(os.getenv("GIT_SNAPSHOT_STATUS_TTL", "2"))  # 秒
+FILE_LOG_LIMIT = 5
+
+
+class GitSnapshot:
+    """1リポジトリ分のキャッシュ (GitSnapshot.for_repo(path) で共有)"""
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def for_repo(cls, repo_path):
+        """リポジトリごとに共有するスナップショット"""
+        key = os.path.abspath(repo_path)
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(key)
+            return cls._instances[key]
+
+    def __init__(self, repo_path):
+        self.repo_path = repo_path
+        self.git_runs = 0  # 実行した git プロセス数 (確認用)
+        self._lock = threading.RLock()
+        self._stamp = None
+        self._layout = None
+        self._reset()
+
+    # ------------------------------------------------------------------ 公開API
+
+    @property
+    def available(self):
+        return self._resolve_layout() is not None
+
+    def branch(self):
+        """現在のブランチ名 (detached HEAD なら空文字、git リポジトリでなければ "unknown")"""
+        with self._lock:
+            self._refresh()
+            return self._branch
+
+    def status(self):
+        """git status --porcelain の行リスト"""
+        with self._lock:
+            self._refresh()
+            if self._status is None or time.time() - self._status_at > STATUS_TTL:
+                output = self._git("--no-optional-locks", "status", "--porcelain")
+                self._status = output.splitlines() if output else []
+                self._status_at = time.time()
+            return list(self._status)
+
+    def uncommitted_count(self):
+        return len(self.status())
+
+    def recent_commits(self, count):
+        """直近 count 件の "短縮ハッシュ 件名" (git log --oneline と同じ形)"""
+        with self._lock:
+            self._refresh()
+            commits = self._load_log()
+            if count > len(commits) and self._log_truncated:
+                output = self._git("log", "--oneline", f"-{count}")
+                return output.splitlines() if output else []
+            return [f"{c['hash']} {c['subject']}" for c in commits[:count]]
+
+    def subjects_since(self, days, merges=False):
+        """days 日以内のコミット件名 (新しい順)"""
+        cutoff = time.time() - days * 86400
+        with self._lock:
+            self._refresh()
+            commits = self._load_log()
+            if self._log_truncated and (not commits or commits[-1]["time"] >= cutoff):
+                # 取得範囲より古いコミットが対象に入る: その期間だけ git に聞く (結果は保持)
+                key = ("since", days, merges)
+                if key not in self._extra:
+                    args = ["log", f"--since={days} days ago", "--pretty=format:%s"]
+                    if not merges:
+                        args.append("--no-merges")
+                    output = self._git(*args)
+                    self._extra[key] = output.splitlines() if output else []
+                return list(self._extra[key])
+            return [c["subject"] for c in commits
+                    if c["time"] >= cutoff and (merges or not c["merge"])]
+
+    def file_log(self, file_path, limit=FILE_LOG_LIMIT):
+        """ファイルの直近履歴 "短縮ハッシュ 件名" (git log --oneline -N -- file と同じ形)"""
+        path = self._repo_relative(file_path)
+        with self._lock:
+            self._refresh()
+            self._load_log()
+            entries = self._file_index.get(path, [])
+            if len(entries) >= limit or not self._log_truncated:
+                return entries[:limit]
+
+            # 取得範囲内に limit 件なかった: このファイルだけ git に聞く (結果は保持)
+            key = ("file", path, limit)
+            if key not in self._extra:
+                output = self._git("log", "--oneline", f"-{limit}", "--", file_path)
+                self._extra[key] = output.splitlines() if output else []
+            return list(self._extra[key])
+
+    def invalidate(self):
+        with self._lock:
+            self._stamp = None
+            self._reset()
+
+    # ------------------------------------------------------------------ 内部
+
+    def _reset(self):
+        self._branch = "unknown"
+        self._status = None
+        self._status_at = 0.0
+        self._commits = None
+        self._file_index = {}
+        self._log_truncated = False
+        self._extra = {}
+
+    def _git(self, *args):
+        """git を実行して stdout を返す (失敗したら空文字)"""
+        self.git_runs += 1
+        try:
+            result = subprocess.run(
+                ["git", "-c", "core.quotepath=off"] + list(args),
+                capture_output=True, text=True, encoding="utf-8", errors="replace",
+                cwd=self.repo_path
+            )
+        except (OSError, ValueError):
+            return ""
+        return result.stdout.strip() if result.returncode == 0 else ""
+
+    def _resolve_layout(self):
+        """(git_dir, common_dir, prefix) を1度だけ求める。git リポジトリでなければ None"""
+        if self._layout is None:
+            output = self._git("rev-parse", "--absolute-git-dir", "--git-common-dir", "--show-prefix")
+            lines = output.split("\n")
+            if len(lines) < 2:
+                self._layout = False
+            else:
+                git_dir = lines[0]
+                common_dir = os.path.normpath(os.path.join(self.repo_path, lines[1]))
+                prefix = lines[2] if len(lines) > 2 else ""
+                self._layout = (git_dir, common_dir, prefix)
+        return self._layout or None
+
+    def _repo_relative(self, file_path):
+        """repo_path 基準のパス -> リポジトリルート基準のパス (git log --name-only の形)"""
+        layout = self._resolve_layout()
+        prefix = layout[2] if layout else ""
+        return os.path.normpath(os.path.join(prefix, file_path)).replace(os.sep, "/")
+
+    def _current_stamp(self, layout):
+        """HEAD・現在のブランチの ref・packed-refs の mtime (他のブランチやタグの更新では作り直さない)"""
+        git_dir, common_dir, _ = layout
+        branch = self._read_branch(git_dir)
+        paths = [os.path.join(git_dir, "HEAD"), os.path.join(common_dir, "packed-refs")]
+        if branch and branch != "unknown":
+            # コミットで書き換わるのはチェックアウト中のブランチの ref ファイルだけ
+            paths.append(os.path.join(common_dir, "refs", "heads", *branch.split("/")))
+        stamp = [branch]
+        for path in paths:
+            try:
+                stamp.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def _refresh(self):
+        layout = self._resolve_layout()
+        if layout is None:
+            return
+        stamp = self._current_stamp(layout)
+        if stamp == self._stamp:
+            return
+        self._reset()
+        self._stamp = stamp
+        self._branch = stamp[0]
+
+    def _read_branch(self, git_dir):
+        try:
+            with open(os.path.join(git_dir, "HEAD"), "r", encoding="utf-8") as f:
+                head = f.read().strip()
+        except OSError:
+            return "unknown"
+        if head.startswith("ref: refs/heads/"):
+            return head[len("ref: refs/heads/"):]
+        return ""
+
+    def _load_log(self):
+        """直近 LOG_WINDOW 件のコミットとファイル別の索引を1回の git log で作る"""
+        if self._commits is not None:
+            return self._commits
+
+        output = self._git("log", f"-{LOG_WINDOW}", "--name-only",
+                           "--pretty=format:%x1e%h%x1f%ct%x1f%P%x1f%s")
+        commits = []
+        file_index = {}
+        for record in output.split("\x1e"):
+            if not record.strip():
+                continue
+            header, _, names = record.partition("\n")
+            fields = header.split("\x1f")
+            if len(fields) < 4:
+                continue
+            short_hash, timestamp, parents, subject = fields[0], fields[1], fields[2], "\x1f".join(fields[3:])
+            commit = {
+                "hash": short_hash,
+                "time": int(timestamp or 0),
+                "merge": len(parents.split()) > 1,
+                "subject": subject
+            }
+            commits.append(commit)
+            line = f"{short_hash} {subject}"
+            for name in names.splitlines():
+                name = name.strip()
+                if name:
+                    file_index.setdefault(name, []).append(line)
+
+        self._commits = commits
+        self._file_index = file_index
+        self._log_truncated = len(commits) >= LOG_WINDOW
+        return commits
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+HTTP Cache - ETag / Last-Modified による条件付きGETキャッシュ
+===========================================================
+レスポンス本文と検証子 (ETag, Last-Modified) をディスクに保存し、次回は
+If-None-Match / If-Modified-Since 付きで問い合わせる。304 が返れば保存済みの本文を使う。
+GitHub API では 304 はレート制限にカウントされない。
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+class CachedResponse:
+    """requests.Response 互換の最小限のレスポンス"""
+
+    def __init__(self, url, status_code, text, headers=None, from_cache=False):
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+        self.from_cache = from_cache
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class HTTPCache:
+    """条件付きリクエスト対応のディスクキャッシュ (共有Session + 並列取得)"""
+
+    # 再検証に使う / 呼び出し側が参照するヘッダだけ保存する
+    STORED_HEADERS = ("ETag", "Last-Modified", "Content-Type")
+
+    def __init__(self, cache_dir=".http_cache", fresh_for=0, max_workers=8, session=None):
+        self.cache_dir = cache_dir
+        self.fresh_for = fresh_for  # この秒数以内に取得済みなら問い合わせずに返す
+        self.max_workers = max_workers
+        self.session = session or requests.Session()
+        self.stats = {"network": 0, "not_modified": 0, "fresh": 0, "stale": 0}
+        self._stats_lock = threading.Lock()
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+    def _load(self, url):
+        try:
+            with open(self._path(url), encoding="utf-8") as f:
+                entry = json.load(f)
+            return entry if entry.get("url") == url else None
+        except (OSError, ValueError):
+            return None
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def _store(self, url, response):
+        self._write({
+            "url": url,
+            "fetched_at": time.time(),
+            "headers": {k: response.headers[k] for k in self.STORED_HEADERS if k in response.headers},
+            "body": response.text
+        })
+
+    def _write(self, entry):
+        # 並列取得中に書きかけを読まないよう一時ファイルから置き換える
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(entry["url"]))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get(self, url, timeout=10, headers=None):
+        """条件付きGET。戻り値は CachedResponse (304 は 200 + from_cache=True として返す)"""
+        entry = self._load(url)
+
+        if entry and self.fresh_for and time.time() - entry["fetched_at"] < self.fresh_for:
+            self._count("fresh")
+            return CachedResponse(url, 200, entry["body"], entry["headers"], from_cache=True)
+
+        request_headers = dict(headers or {})
+        if entry:
+            if "ETag" in entry["headers"]:
+                request_headers["If-None-Match"] = entry["headers"]["ETag"]
+            if "Last-Modified" in entry["headers"]:
+                request_headers["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+
+        try:
+            response = self.session.get(url, headers=request_headers, timeout=timeout)
+        except requests.exceptions.RequestException:
+            if entry:
+                # ネットワーク障害時は保存済みの内容で継続する
+                self._count("stale")
+                return CachedResponse(url, 200, entry["body"], entry["headers"], from_cache=True)
+            raise
+
+        if response.status_code == 304 and entry:
+            self._count("not_modified")
+            entry["fetched_at"] = time.time()
+            try:
+                self._write(entry)
+            except OSError as e:
+                print(f"⚠️ HTTPキャッシュ保存エラー: {e}")
+            # レート制限ヘッダなどは304の実レスポンスのものを返す
+            headers = dict(entry["headers"])
+            headers.update(response.headers)
+            return CachedResponse(url, 200, entry["body"], headers, from_cache=True)
+
+        self._count("network")
+        if response.status_code == 200:
+            try:
+                self._store(url, response)
+            except OSError as e:
+                print(f"⚠️ HTTPキャッシュ保存エラー: {e}")
+        return CachedResponse(url, response.status_code, response.text, response.headers)
+
+    def cached(self, url):
+        """保存済みの内容をネットワークに問い合わせずに返す (なければ None)"""
+        entry = self._load(url)
+        if entry is None:
+            return None
+        self._count("stale")
+        return CachedResponse(url, 200, entry["body"], entry["headers"], from_cache=True)
+
+    def get_many(self, urls, timeout=10, headers=None):
+        """複数URLを並列に取得 -> {url: CachedResponse または Exception}"""
+        def fetch(url):
+            try:
+                return self.get(url, timeout=timeout, headers=headers)
+            except Exception as e:
+                return e
+
+        unique_urls = list(dict.fromkeys(urls))
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, max(len(unique_urls), 1))) as executor:
+            return dict(zip(unique_urls, executor.map(fetch, unique_urls)))
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+HTTP Client - API呼び出しの共有クライアント
+==========================================
+プロセス内で1つのクライアントを共有し、Keep-Alive の接続プールを使い回す。
+httpx + h2 が入っていれば HTTP/2 で多重化する (なければ requests の HTTP/1.1)。
+429 / 5xx と接続エラーはジッタ付き指数バックオフで再試行し (Retry-After 優先)、
+失敗が続くホストはサーキットブレーカーで一定時間すぐに失敗させる。
+"""
+
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+    import h2  # noqa: F401  (httpx の HTTP/2 サポートに必要)
+except ImportError:
+    httpx = None
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# 読み込みタイムアウト後に再送してよいメソッド (POST はサーバー側で処理・課金済みのことがある)
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """サーキットが開いている (ホストへの呼び出しを一時停止中)"""
+
+
+def parse_retry_after(value):
+    """Retry-After (秒数 または HTTP日付) -> 秒。解釈できなければ None"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, base=0.5, cap=30.0, retry_after=None):
+    """attempt 回目 (0始まり) の待ち時間 [秒]
+
+    Retry-After があればそれに従い、なければ full jitter (0〜base*2^attempt の一様乱数)。
+    """
+    server_delay = parse_retry_after(retry_after)
+    if server_delay is not None:
+        return min(server_delay, cap)
+    return random.uniform(0, min(base * (2 ** attempt), cap))
+
+
+class CircuitBreaker:
+    """ホスト単位のサーキットブレーカー (closed → open → half-open)"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        """呼び出してよいか (half-open では試行を1件だけ通し、その場合は "trial" を返す)"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_running:
+                self._trial_running = True
+                return "trial"
+            return False
+
+    def end_trial(self):
+        """試行の結果を記録せずに終えた場合 (想定外の例外など) に次の試行を許可する"""
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+
+
+class _HTTPXResponse:
+    """httpx.Response を呼び出し側が使う requests.Response の範囲で包む"""
+
+    def __init__(self, response):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = str(response.url)
+
+    @property
+    def text(self):
+        self._response.read()
+        return self._response.text
+
+    def json(self):
+        self._response.read()
+        return self._response.json()
+
+    def iter_lines(self, decode_unicode=False):
+        for line in self._response.iter_lines():
+            yield line if decode_unicode else line.encode("utf-8")
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+    def close(self):
+        self._response.close()
+
+
+class HTTPClient:
+    """接続プール + 再試行 + サーキットブレーカー"""
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        """プロセス内で共有するクライアント"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def __init__(self, pool_maxsize=20, max_retries=2, backoff=0.5, http2=None,
+                 failure_threshold=5, reset_timeout=30.0):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        if http2 is None:
+            http2 = os.getenv("RESEARCH_HTTP2", "1") != "0"
+        self.h2 = None
+        if http2 and httpx is not None:
+            self.h2 = httpx.Client(
+                http2=True,
+                limits=httpx.Limits(max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize)
+            )
+
+        self._breakers = {}
+        self._breakers_lock = threading.Lock()
+
+    @property
+    def protocol(self):
+        return "HTTP/2" if self.h2 is not None else "HTTP/1.1"
+
+    def breaker(self, url):
+        host = urlparse(url).netloc
+        with self._breakers_lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+                self._breakers[host] = breaker
+            return breaker
+
+    def post(self, url, max_retries=None, **kwargs):
+        """POST (再試行・サーキットブレーカー付き)
+
+        kwargs は requests.post と同じ (headers, json, timeout, stream)。
+        再試行し尽くした場合は最後のレスポンスを返す (接続エラーは送出)。
+        """
+        return self.request("POST", url, max_retries=max_retries, **kwargs)
+
+    def get(self, url, max_retries=None, **kwargs):
+        return self.request("GET", url, max_retries=max_retries, **kwargs)
+
+    def request(self, method, url, max_retries=None, retry_timeouts=None, **kwargs):
+        """retry_timeouts: 読み込みタイムアウトを再試行するか (既定は冪等なメソッドのみ)。
+        接続タイムアウト (リクエスト未送信) は常に再試行する。
+        """
+        if max_retries is None:
+            max_retries = self.max_retries
+        if retry_timeouts is None:
+            retry_timeouts = method.upper() in IDEMPOTENT_METHODS
+        breaker = self.breaker(url)
+
+        for attempt in range(max_retries + 1):
+            allowed = breaker.allow()
+            if not allowed:
+                raise CircuitOpenError(f"{urlparse(url).netloc}: circuit open (連続失敗のため一時停止中)")
+
+            try:
+                response = self._send(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                breaker.record_failure()
+                read_timeout = (isinstance(e, requests.exceptions.Timeout)
+                                and not isinstance(e, requests.exceptions.ConnectTimeout))
+                if attempt >= max_retries or (read_timeout and not retry_timeouts):
+                    raise
+                delay = backoff_delay(attempt, self.backoff)
+                print(f"🔁 接続エラー、再試行 {attempt + 1}/{max_retries} ({delay:.1f}秒後): {e}")
+                time.sleep(delay)
+                continue
+            except BaseException:
+                # 上の2種類以外の例外 (ChunkedEncodingError, InvalidURL など) でも
+                # half-open の試行中フラグを残さない (残るとサーキットが開きっぱなしになる)
+                if allowed == "trial":
+                    breaker.end_trial()
+                raise
+
+            if response.status_code not in RETRY_STATUSES:
+                breaker.record_success()
+                return response
+
+            # 429 はサーバーが生きているのでブレーカーの失敗には数えない
+            if response.status_code == 429:
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+
+            if attempt >= max_retries:
+                return response
+
+            delay = backoff_delay(attempt, self.backoff, retry_after=response.headers.get("Retry-After"))
+            print(f"🔁 HTTP {response.status_code}、再試行 {attempt + 1}/{max_retries} ({delay:.1f}秒後)")
+            response.close()
+            time.sleep(delay)
+
+    def _send(self, method, url, headers=None, json=None, data=None, timeout=None, stream=False):
+        if self.h2 is None:
+            return self.session.request(method, url, headers=headers, json=json, data=data,
+                                        timeout=timeout, stream=stream)
+
+        try:
+            request = self.h2.build_request(method, url, headers=headers, json=json, data=data, timeout=timeout)
+            response = self.h2.send(request, stream=stream)
+        except httpx.ConnectTimeout as e:
+            raise requests.exceptions.ConnectTimeout(str(e)) from e
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e)) from e
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(str(e)) from e
+        return _HTTPXResponse(response)
@@ -5,14 +5,89 @@ Instant Research AI - Perplexity MCP × Claude 瞬間リサーチシステム
 Simple First: 外部1コマンド、内部高機能
 """
 
+import contextvars
 import os
 import sys
 import json
-import requests
-import sqlite3
-import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
 from pathlib import Path
+from http_client import HTTPClient
+from prompt_budget import PromptTemplate
+from research_cache import ResearchCache
+from research_index import ResearchIndex
+from research_scheduler import Deferred, ResearchScheduler
+from research_storage import ResearchStorage
+from research_tracing import Tracer, traced
+from request_coalescer import SingleFlight
+from usage_ledger import UsageLedger
+from vault_writer import create_vault_writer
+
+# 固定のシステムプロンプト (毎回同じ先頭部分として送る)
+RESEARCHER_PROMPT = PromptTemplate("""
+    あなたは日本語で回答する専門的なリサーチャーです。正確で構造化された情報を提供してください。
+""")
+
+# 深層リサーチのユーザーメッセージ (毎回変わるのはテーマだけ)
+DEEP_RESEARCH_QUERY = "「{topic}」について深層リサーチの報告書を作成してください。"
+
+# 以前の deep_research が毎回ユーザーメッセージに入れて送っていた定型文 (節約量の比較用。
+# テーマは今も以前も同じだけ送るので除いてある)
+_PREVIOUS_DEEP_RESEARCH_QUERY = """
+        「」について、以下の観点で包括的にリサーチして、構造化された報告書を作成してください：
+
+        ## 1. 基本概要
+        - 定義と重要性
+        - 現在の状況
+
+        ## 2. 最新動向
+        - 最近の発展
+        - 注目すべき変化
+
+        ## 3. 技術的詳細
+        - 主要な技術要素
+        - 実装方法
+
+        ## 4. 市場・業界動向
+        - 市場規模と成長
+        - 主要プレイヤー
+
+        ## 5. 将来展望
+        - 予想される発展
+        - 課題と機会
+
+        各セクションは具体的で実用的な情報を含めてください。
+        """
+
+DEEP_RESEARCH_PROMPT = PromptTemplate("""
+    あなたは日本語で回答する専門的なリサーチャーです。正確で構造化された情報を提供してください。
+    指定されたテーマについて、以下の観点で包括的にリサーチして、構造化された報告書を作成してください：
+
+    ## 1. 基本概要
+    - 定義と重要性
+    - 現在の状況
+
+    ## 2. 最新動向
+    - 最近の発展
+    - 注目すべき変化
+
+    ## 3. 技術的詳細
+    - 主要な技術要素
+    - 実装方法
+
+    ## 4. 市場・業界動向
+    - 市場規模と成長
+    - 主要プレイヤー
+
+    ## 5. 将来展望
+    - 予想される発展
+    - 課題と機会
+
+    各セクションは具体的で実用的な情報を含めてください。
+""",
+    previous=RESEARCHER_PROMPT.text + _PREVIOUS_DEEP_RESEARCH_QUERY,
+    query=DEEP_RESEARCH_QUERY.format(topic=""))
 
 class InstantResearchAI:
     """瞬間リサーチAI - Simple First設計"""
@@ -22,60 +97,222 @@ class InstantResearchAI:
         self.obsidian_vault = "G:\\マイドライブ\\Obsidian Vault"
         self.research_db = "research_history.db"
         self.api_key = os.getenv("PERPLEXITY_API_KEY", "")
+        # ベンチマーク用のモックサーバーなどに向ける場合は PERPLEXITY_BASE_URL で上書き
+        self.api_base = os.getenv("PERPLEXITY_BASE_URL", "https://api.perplexity.ai").rstrip("/")
+        
+        # Obsidian保存 (マウント済みなら直接書き込み、なければ PowerShell。非同期でまとめて保存)
+        self.vault_writer = create_vault_writer(self.obsidian_vault)
+        
+        # 共有HTTPクライアント (接続プール / HTTP/2 / 再試行 / サーキットブレーカー)
+        self.http = HTTPClient.shared()
+        # 429/5xx の再試行回数 (None はクライアント既定、バッチ処理で引き上げる)
+        self.max_retries = None
         
-        # SQLite初期化
+        # SQLite初期化 (プロセス内で共有する長寿命接続)
+        self.storage = ResearchStorage.shared(self.research_db)
         self._init_database()
+        
+        # ステージ別レイテンシ (stage_latency テーブル、`stats --latency` で集計)
+        self.tracer = Tracer(self.storage)
+        self.vault_writer.on_batch = self._trace_vault_batch
+        # atexit は登録の逆順に動くため、Obsidian保存の計測・履歴更新が閉じたDBに積まれないよう
+        # DB を閉じる前に必ず保存の完了を待つ
+        self.storage.add_close_hook(self.vault_writer.flush)
+        
+        # 同一リクエストの同時実行を1回にまとめる
+        self.single_flight = SingleFlight()
+        
+        # 履歴の全文検索インデックス
+        self.index = ResearchIndex(self.storage)
+        
+        # 無料枠の使用量台帳 (並列・複数プロセスでも予約制で正しく数える)
+        self.ledger = UsageLedger(self.storage)
+        
+        # 優先度つき実行キュー (interactive > mcp > batch、無料枠の一部を interactive 用に確保)
+        self.scheduler = ResearchScheduler(self.ledger)
+        
+        # 応答キャッシュ (同一/近似クエリは無料枠を消費せず即答)
+        self.cache = ResearchCache(
+            self.storage,
+            near_duplicate=os.getenv("RESEARCH_CACHE_NEAR_DUPLICATE", "") == "1"
+        )
     
     def _init_database(self):
         """研究履歴データベース初期化"""
         try:
-            conn = sqlite3.connect(self.research_db)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS research_history (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
-                    query TEXT NOT NULL,
-                    type TEXT NOT NULL,
-                    result_summary TEXT,
-                    obsidian_path TEXT,
-                    tags TEXT
-                )
-            """)
-            
-            # 使用量追跡テーブル追加
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS usage_tracking (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    date TEXT NOT NULL,
-                    total_tokens INTEGER DEFAULT 0,
-                    daily_requests INTEGER DEFAULT 0,
-                    monthly_tokens INTEGER DEFAULT 0,
-                    monthly_requests INTEGER DEFAULT 0,
-                    UNIQUE(date)
-                )
-            """)
-            
-            conn.commit()
-            conn.close()
+            with self.storage.transaction() as cursor:
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS research_history (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        timestamp TEXT NOT NULL,
+                        query TEXT NOT NULL,
+                        type TEXT NOT NULL,
+                        result_summary TEXT,
+                        obsidian_path TEXT,
+                        tags TEXT
+                    )
+                """)
+                
+                # 使用量追跡テーブル追加
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS usage_tracking (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        date TEXT NOT NULL,
+                        total_tokens INTEGER DEFAULT 0,
+                        daily_requests INTEGER DEFAULT 0,
+                        monthly_tokens INTEGER DEFAULT 0,
+                        monthly_requests INTEGER DEFAULT 0,
+                        tokens_saved INTEGER DEFAULT 0,
+                        UNIQUE(date)
+                    )
+                """)
             
         except Exception as e:
             print(f"⚠️ データベース初期化エラー: {e}")
     
-    def perplexity_search(self, query, model="llama-3.1-sonar-large-128k-online"):
-        """Perplexity APIで検索実行 (無料枠管理付き)"""
+    def perplexity_search(self, query, model="llama-3.1-sonar-large-128k-online", timeout=30,
+                          recency="month", use_cache=True, on_chunk=None, system_prompt=None,
+                          priority="interactive"):
+        """Perplexity APIで検索実行 (無料枠管理・応答キャッシュ付き)
+        
+        on_chunk を渡すとストリーミング (SSE) で受信し、本文の差分を届いた順に
+        on_chunk(text) で通知する。戻り値は非ストリーミング時と同じ形式。
+        system_prompt (PromptTemplate) を省略すると RESEARCHER_PROMPT を使う。
+        priority (interactive / mcp / batch) はキャッシュミス時の実行順と無料枠の取り分を決める。
+        取り分を超えた mcp / batch は research_scheduler.Deferred を送出する。
+        """
+        with self.tracer.span("search", detail=model) as span:
+            result = self._search(span, query, model, timeout, recency, use_cache, on_chunk, system_prompt,
+                                  priority)
+            if not result and span.status == "ok":
+                span.status = "failed"
+            return result
+    
+    def _search(self, span, query, model, timeout, recency, use_cache, on_chunk, system_prompt, priority):
+        # 同じクエリでもシステムプロンプトが違えば別の応答 (キャッシュ・共有のキーに含める)
+        system_prompt = system_prompt or RESEARCHER_PROMPT
+        if use_cache:
+            with self.tracer.span("search.cache_lookup") as lookup:
+                cached = self.cache.get(query, model, recency, system_prompt.text)
+                lookup.status = "hit" if cached else "miss"
+            if cached:
+                span.status = "cache_hit"
+                print(f"⚡ キャッシュヒット: {query}")
+                if on_chunk:
+                    on_chunk(cached["content"])
+                return cached
+        
         if not self.api_key:
+            span.status = "no_api_key"
             print("❌ PERPLEXITY_API_KEY が設定されていません")
             print("設定方法: export PERPLEXITY_API_KEY=your_api_key")
             return None
         
-        # 無料枠チェック
-        if not self._check_free_tier_limits():
+        try:
+            if not use_cache:
+                return self._reserved_request(query, model, timeout, recency, on_chunk, system_prompt,
+                                              priority, use_cache=False)
+            
+            # 同時に来た同一リクエストは1回の上流呼び出しを共有する
+            # (実行枠・無料枠の取り分を使うのは実際に呼び出すリーダーだけ)
+            cache_key = self.cache.make_key(query, model, recency, system_prompt.text)
+            while True:
+                try:
+                    result, shared = self.single_flight.do(
+                        cache_key,
+                        lambda: self._leased_request(cache_key, query, model, timeout, recency, on_chunk,
+                                                     system_prompt, priority)
+                    )
+                    break
+                except Deferred as e:
+                    # 後回しにされたのが別の優先度のリーダーなら、自分の優先度で実行し直す
+                    if e.priority == priority:
+                        raise
+        except Deferred:
+            span.status = "deferred"
+            raise
+        
+        if shared and result:
+            span.status = "shared"
+            print(f"🔗 実行中の同一リクエストの結果を共有: {query}")
+            if on_chunk:
+                on_chunk(result["content"])
+        return result
+    
+    def _leased_request(self, cache_key, query, model, timeout, recency, on_chunk, system_prompt=None,
+                        priority="interactive"):
+        """別プロセスが同じリクエストを実行中なら、その結果がキャッシュに入るのを待つ"""
+        if not self.cache.acquire_lease(cache_key, ttl=timeout + 5):
+            print(f"⏳ 別プロセスで実行中の同一リクエストを待機: {query}")
+            with self.tracer.span("search.lease_wait"):
+                deadline = time.time() + timeout
+                while time.time() < deadline and self.cache.lease_active(cache_key):
+                    time.sleep(0.25)
+            
+            cached = self.cache.get(query, model, recency, system_prompt.text)
+            if cached:
+                if on_chunk:
+                    on_chunk(cached["content"])
+                return cached
+            # 相手が失敗した/期限切れ: 自分で実行する
+            self.cache.acquire_lease(cache_key, ttl=timeout + 5)
+        
+        try:
+            return self._reserved_request(query, model, timeout, recency, on_chunk, system_prompt, priority)
+        finally:
+            self.cache.release_lease(cache_key)
+    
+    def _reserved_request(self, query, model, timeout, recency, on_chunk, system_prompt=None,
+                          priority="interactive", use_cache=True):
+        """実行枠と無料枠を確保してAPIを呼び出す"""
+        # キャッシュにないものだけ実行キューに並ぶ (キャッシュヒットは待たずに返す)
+        with self.tracer.span("search.schedule", detail=priority) as schedule:
+            try:
+                paced = self.scheduler.acquire(priority)
+            except Deferred:
+                schedule.status = "deferred"
+                raise
+        
+        result = None
+        try:
+            result = self._call_with_reservation(query, model, timeout, recency, on_chunk, system_prompt,
+                                                 use_cache)
+            return result
+        finally:
+            # 台帳に拒否された・失敗して予約を取り消した場合は無料枠を使っていないので、
+            # batch のペース配分の枠も返す
+            self.scheduler.release(refund=None if result else paced)
+    
+    def _call_with_reservation(self, query, model, timeout, recency, on_chunk, system_prompt, use_cache):
+        """無料枠を予約してAPIを呼び出す"""
+        # 無料枠チェック (通過した時点で1リクエスト分を予約)
+        with self.tracer.span("search.quota") as quota:
+            reservation = self._check_free_tier_limits()
+            if not reservation:
+                quota.status = "rejected"
+        if not reservation:
             return None
         
         print(f"🔍 Perplexity検索中: {query}")
         
+        result = None
+        try:
+            with self.tracer.span("search.http", detail="stream" if on_chunk else None) as http:
+                result = self._perplexity_request(query, model, timeout, recency, on_chunk, system_prompt)
+                if not result:
+                    http.status = "failed"
+            if result and use_cache:
+                with self.tracer.span("search.cache_store"):
+                    self.cache.put(query, model, recency, result, system_prompt.text)
+            return result
+        finally:
+            # 失敗したリクエストは予約を取り消す (成功時はトークンを _record_usage で記録済み)
+            if not result and reservation.get("reserved"):
+                self._release_reservation()
+    
+    def _perplexity_request(self, query, model, timeout, recency, on_chunk=None, system_prompt=None):
+        """Perplexity API呼び出し本体"""
+        system_prompt = system_prompt or RESEARCHER_PROMPT
         try:
             headers = {
                 "Authorization": f"Bearer {self.api_key}",
@@ -87,7 +324,7 @@ class InstantResearchAI:
                 "messages": [
                     {
                         "role": "system",
-                        "content": "あなたは日本語で回答する専門的なリサーチャーです。正確で構造化された情報を提供してください。"
+                        "content": system_prompt.text
                     },
                     {
                         "role": "user", 
@@ -100,29 +337,35 @@ class InstantResearchAI:
                 "search_domain_filter": ["perplexity.ai"],
                 "return_images": False,
                 "return_related_questions": True,
-                "search_recency_filter": "month",
+                "search_recency_filter": recency,
                 "top_k": 0,
-                "stream": False,
+                "stream": on_chunk is not None,
                 "presence_penalty": 0,
                 "frequency_penalty": 1
             }
             
-            response = requests.post(
-                "https://api.perplexity.ai/chat/completions",
+            response = self.http.post(
+                f"{self.api_base}/chat/completions",
+                max_retries=self.max_retries,
                 headers=headers,
                 json=data,
-                timeout=30
+                timeout=timeout,
+                stream=on_chunk is not None
             )
             
             if response.status_code == 200:
-                result = response.json()
+                if on_chunk:
+                    result = self._consume_stream(response, on_chunk)
+                else:
+                    result = response.json()
                 content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
                 
                 if content:
                     usage = result.get("usage", {})
                     # 使用量記録
-                    self._record_usage(usage)
-                    print("✅ 検索完了")
+                    self._record_usage(usage, saved_tokens=system_prompt.saved_tokens)
+                    # ストリーミング時は本文の行末に続けて出力されるため改行してから表示
+                    print("\n✅ 検索完了" if on_chunk else "✅ 検索完了")
                     return {
                         "content": content,
                         "usage": usage,
@@ -140,19 +383,83 @@ class InstantResearchAI:
             print(f"❌ 検索エラー: {e}")
             return None
     
-    def instant_search(self, query):
+    def _consume_stream(self, response, on_chunk):
+        """SSEストリームを読み切り、非ストリーミング応答と同じ形に組み立てる"""
+        parts = []
+        usage = {}
+        
+        try:
+            # charset のない text/event-stream を requests は ISO-8859-1 として復号するため、
+            # バイト列のまま受け取って SSE の仕様どおり UTF-8 で復号する
+            for raw in response.iter_lines():
+                line = raw.decode("utf-8") if isinstance(raw, bytes) else raw
+                if not line or not line.startswith("data:"):
+                    continue
+                
+                payload = line[len("data:"):].strip()
+                if payload == "[DONE]":
+                    break
+                
+                chunk = json.loads(payload)
+                delta = chunk.get("choices", [{}])[0].get("delta", {}).get("content") or ""
+                if delta:
+                    parts.append(delta)
+                    on_chunk(delta)
+                
+                # usage は最終チャンク付近にのみ含まれる
+                if chunk.get("usage"):
+                    usage = chunk["usage"]
+        finally:
+            # 接続をプールへ返す
+            response.close()
+        
+        return {
+            "choices": [{"message": {"content": "".join(parts)}}],
+            "usage": usage
+        }
+    
+    def _search_and_show(self, query, model, title, width, stream=False, on_chunk=None, system_prompt=None,
+                         priority="interactive"):
+        """検索して結果を表示 (stream=True なら受信しながら表示)"""
+        if not stream:
+            result = self.perplexity_search(query, model, on_chunk=on_chunk, system_prompt=system_prompt,
+                                            priority=priority)
+            if result:
+                print(f"\n{title}")
+                print("=" * width)
+                print(result["content"])
+                print("=" * width)
+            return result
+        
+        started = []
+        
+        def print_chunk(text):
+            if not started:
+                # 最初のチャンク到着時に見出しを出す
+                started.append(True)
+                print(f"\n{title}")
+                print("=" * width)
+            print(text, end="", flush=True)
+            if on_chunk:
+                on_chunk(text)
+        
+        result = self.perplexity_search(query, model, on_chunk=print_chunk, system_prompt=system_prompt,
+                                        priority=priority)
+        if started:
+            print("=" * width)
+        return result
+    
+    @traced("instant")
+    def instant_search(self, query, stream=False, on_chunk=None, priority="interactive"):
         """瞬間検索 - 最速回答"""
         print("⚡ 瞬間検索モード")
         
-        result = self.perplexity_search(query, "llama-3.1-sonar-small-128k-online")
+        result = self._search_and_show(
+            query, "llama-3.1-sonar-small-128k-online", "📊 検索結果:", 60, stream, on_chunk,
+            priority=priority
+        )
         
         if result:
-            # 結果表示
-            print(f"\n📊 検索結果:")
-            print("=" * 60)
-            print(result["content"])
-            print("=" * 60)
-            
             # 履歴保存
             self._save_to_history(query, "instant", result["content"])
             
@@ -161,59 +468,38 @@ class InstantResearchAI:
             print("❌ 検索に失敗しました")
             return None
     
-    def deep_research(self, topic):
+    @traced("deep")
+    def deep_research(self, topic, stream=False, on_chunk=None, priority="interactive"):
         """深層リサーチ - 構造化された詳細分析"""
         print("🔬 深層リサーチモード")
         
-        # 拡張プロンプト作成
-        enhanced_query = f"""
-        「{topic}」について、以下の観点で包括的にリサーチして、構造化された報告書を作成してください：
-
-        ## 1. 基本概要
-        - 定義と重要性
-        - 現在の状況
-
-        ## 2. 最新動向
-        - 最近の発展
-        - 注目すべき変化
-
-        ## 3. 技術的詳細
-        - 主要な技術要素
-        - 実装方法
-
-        ## 4. 市場・業界動向
-        - 市場規模と成長
-        - 主要プレイヤー
-
-        ## 5. 将来展望
-        - 予想される発展
-        - 課題と機会
-
-        各セクションは具体的で実用的な情報を含めてください。
-        """
+        # 観点のテンプレートは固定のシステムプロンプト側に置き、毎回変わるのはテーマだけにする
+        enhanced_query = DEEP_RESEARCH_QUERY.format(topic=topic)
         
-        result = self.perplexity_search(enhanced_query, "llama-3.1-sonar-large-128k-online")
+        result = self._search_and_show(
+            enhanced_query, "llama-3.1-sonar-large-128k-online", f"📋 深層リサーチ結果: {topic}", 80,
+            stream, on_chunk, system_prompt=DEEP_RESEARCH_PROMPT, priority=priority
+        )
         
         if result:
-            # 結果表示
-            print(f"\n📋 深層リサーチ結果: {topic}")
-            print("=" * 80)
-            print(result["content"])
-            print("=" * 80)
+            # 履歴保存 (Obsidianの保存先は書き込みが成功した後に記録する)
+            history_key = self._save_to_history(topic, "deep_research", result["content"])
             
             # Obsidianに保存
-            obsidian_path = self._save_to_obsidian(topic, result["content"], "deep_research")
-            
-            # 履歴保存
-            self._save_to_history(topic, "deep_research", result["content"], obsidian_path)
+            self._save_to_obsidian(topic, result["content"], "deep_research", history_key)
             
             return result
         else:
             print("❌ 深層リサーチに失敗しました")
             return None
     
-    def research_session(self, theme):
-        """包括的リサーチセッション - 5つの観点で並列調査"""
+    @traced("session")
+    def research_session(self, theme, max_workers=5, deadline=45, priority="interactive"):
+        """包括的リサーチセッション - 5つの観点で並列調査
+        
+        各観点は最大 max_workers 本のスレッドで同時に検索し、
+        deadline 秒以内に返ってきた観点だけで統合レポートを作成する。
+        """
         print(f"🎯 包括的リサーチセッション: {theme}")
         
         perspectives = [
@@ -224,38 +510,71 @@ class InstantResearchAI:
             f"{theme} の将来展望と課題"
         ]
         
-        results = []
-        
         for i, perspective in enumerate(perspectives, 1):
-            print(f"\n📖 観点 {i}/5: {perspective}")
-            
-            result = self.perplexity_search(perspective)
+            print(f"\n📖 観点 {i}/{len(perspectives)}: {perspective}")
+        
+        executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(perspectives))))
+        # 各観点の検索も同じ trace_id で記録されるようコンテキストを引き継ぐ
+        futures = {
+            executor.submit(contextvars.copy_context().run, self.perplexity_search, perspective,
+                            timeout=deadline, priority=priority): i
+            for i, perspective in enumerate(perspectives)
+        }
+        done, not_done = wait(futures, timeout=deadline)
+        # 期限切れの観点は待たずに戻る (実行中のリクエストは背景で完了させる)
+        executor.shutdown(wait=False, cancel_futures=True)
+        
+        collected = {}
+        deferred = []
+        for future in done:
+            i = futures[future]
+            try:
+                result = future.result()
+            except Deferred as e:
+                # 取り分・ペースの都合で後回し (失敗ではないので別に数える)
+                deferred.append(i)
+                print(f"⏸️ 観点 {i + 1} 後回し: {e}")
+                continue
+            except Exception as e:
+                print(f"❌ 観点 {i + 1} 失敗: {e}")
+                continue
             
             if result:
-                results.append({
-                    "perspective": perspective,
+                collected[i] = {
+                    "perspective": perspectives[i],
                     "content": result["content"],
                     "timestamp": result["timestamp"]
-                })
-                
-                print(f"✅ 観点 {i} 完了")
+                }
+                print(f"✅ 観点 {i + 1} 完了")
             else:
-                print(f"❌ 観点 {i} 失敗")
+                print(f"❌ 観点 {i + 1} 失敗")
+        
+        for future in not_done:
+            print(f"⏱️ 観点 {futures[future] + 1} タイムアウト ({deadline}秒)")
+        
+        # 観点の順序を保って部分結果を組み立てる
+        results = [collected[i] for i in sorted(collected)]
         
         if results:
             # 統合レポート作成
             integrated_report = self._create_integrated_report(theme, results)
             
-            # Obsidianに保存
-            obsidian_path = self._save_to_obsidian(theme, integrated_report, "research_session")
+            # 履歴保存 (Obsidianの保存先は書き込みが成功した後に記録する)
+            history_key = self._save_to_history(theme, "research_session", f"{len(results)}個の観点で調査完了",
+                                                full_content=integrated_report)
             
-            # 履歴保存
-            self._save_to_history(theme, "research_session", f"{len(results)}個の観点で調査完了", obsidian_path)
+            # Obsidianに保存
+            obsidian_path = self._save_to_obsidian(theme, integrated_report, "research_session", history_key)
             
-            print(f"\n🎉 包括的リサーチ完了: {len(results)}個の観点")
-            print(f"📝 保存先: {obsidian_path}")
+            print(f"\n🎉 包括的リサーチ完了: {len(results)}/{len(perspectives)}個の観点")
+            if deferred:
+                print(f"⏸️ 後回しにした観点: {len(deferred)}個 (無料枠の取り分が回復してから再実行してください)")
+            print(f"📝 保存予定: {obsidian_path}")
             
             return results
+        elif deferred:
+            print(f"⏸️ 包括的リサーチを後回しにしました ({len(deferred)}/{len(perspectives)}個の観点が取り分・ペース待ち)")
+            return None
         else:
             print("❌ 包括的リサーチに失敗しました")
             return None
@@ -301,60 +620,45 @@ class InstantResearchAI:
         
         return report
     
-    def _save_to_obsidian(self, topic, content, research_type):
-        """Obsidianに保存"""
+    def _save_to_obsidian(self, topic, content, research_type, history_key=None):
+        """Obsidianに保存 (書き込みはバックグラウンドで行い、Vault 内の相対パスをすぐ返す)
+        
+        history_key (_save_to_history の戻り値) を渡すと、書き込みに成功した後で
+        実際に保存したパスを履歴の obsidian_path に記録する。
+        """
         try:
             # ファイル名生成（安全な文字のみ）
             safe_topic = "".join(c for c in topic if c.isalnum() or c in (' ', '-', '_')).strip()
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = f"{safe_topic}_{research_type}_{timestamp}.md"
             
-            # 保存パス
-            research_dir = f"{self.obsidian_vault}\\Research\\AI_Generated"
-            
-            # PowerShellで保存（文字エンコーディング改善）
-            # 特殊文字を安全にエスケープ
-            safe_content = content.replace("'", "''").replace("`", "``")
-            
-            ps_command = f"""
-$obsidianPath = "{research_dir}"
-New-Item -ItemType Directory -Force -Path $obsidianPath | Out-Null
-$content = @'
-{safe_content}
-'@
-$filename = "{filename}"
-[System.IO.File]::WriteAllText("$obsidianPath\\$filename", $content, [System.Text.Encoding]::UTF8)
-Write-Host "Saved: $filename"
-"""
-            
-            result = subprocess.run([
-                "powershell.exe", "-Command", ps_command
-            ], capture_output=True, text=True, timeout=15)
+            on_saved = None
+            if history_key:
+                on_saved = lambda path: self._record_obsidian_path(history_key, path)
+            with self.tracer.span("obsidian.submit"):
+                self.vault_writer.submit(f"Research/AI_Generated/{filename}", content, on_saved)
             
-            if result.returncode == 0:
-                obsidian_path = f"Research\\AI_Generated\\{filename}"
-                print(f"📝 Obsidianに保存: {obsidian_path}")
-                return obsidian_path
-            else:
-                print(f"⚠️ Obsidian保存エラー: {result.stderr}")
-                return None
+            obsidian_path = f"Research\\AI_Generated\\{filename}"
+            print(f"📝 Obsidianへの保存を予約: {obsidian_path} ({self.vault_writer.backend})")
+            return obsidian_path
                 
         except Exception as e:
             print(f"⚠️ Obsidian保存エラー: {e}")
             return None
     
-    def _save_to_history(self, query, research_type, result_summary, obsidian_path=None):
-        """履歴データベースに保存"""
+    def _save_to_history(self, query, research_type, result_summary, obsidian_path=None, full_content=None):
+        """履歴データベースに保存 (全文は圧縮して全文検索インデックスへ)
+        
+        行を特定するキー (timestamp, query, type) を返す (保存に失敗したら None)。
+        """
         try:
-            conn = sqlite3.connect(self.research_db)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
+            timestamp = datetime.now().isoformat()
+            history_insert = ("""
                 INSERT INTO research_history 
                 (timestamp, query, type, result_summary, obsidian_path, tags)
                 VALUES (?, ?, ?, ?, ?, ?)
             """, (
-                datetime.now().isoformat(),
+                timestamp,
                 query,
                 research_type,
                 result_summary[:500] + "..." if len(result_summary) > 500 else result_summary,
@@ -362,204 +666,189 @@ Write-Host "Saved: $filename"
                 f"#{research_type} #AI_research"
             ))
             
-            conn.commit()
-            conn.close()
+            # 応答経路を止めないよう履歴はバッチコミット
+            with self.tracer.span("history.write", detail=research_type):
+                self.storage.enqueue_many(
+                    [history_insert] + self.index.document_statements(query, full_content or result_summary)
+                )
+            return (timestamp, query, research_type)
             
         except Exception as e:
             print(f"⚠️ 履歴保存エラー: {e}")
+            return None
+    
+    def _record_obsidian_path(self, history_key, path):
+        """Obsidianへの書き込みが成功した後、実際の保存先を履歴に記録 (保存スレッドから呼ばれる)"""
+        # INSERT と同じキューに積むので、必ず履歴の行ができた後に適用される
+        self.storage.enqueue(
+            "UPDATE research_history SET obsidian_path = ? WHERE timestamp = ? AND query = ? AND type = ?",
+            (path,) + tuple(history_key)
+        )
+    
+    def _trace_vault_batch(self, backend, count, seconds, ok):
+        """バックグラウンドのObsidian書き込み (1バッチ) の所要時間を記録"""
+        self.tracer.record("obsidian.write", seconds, "ok" if ok else "error", f"{backend} x{count}")
     
     def _check_free_tier_limits(self):
-        """無料枠制限チェック"""
+        """無料枠制限チェック
+        
+        通過した場合は1リクエスト分を台帳に予約し、予約情報 (dict) を返す。
+        制限に達している場合は None。
+        """
         try:
-            today = datetime.now().strftime('%Y-%m-%d')
-            month = datetime.now().strftime('%Y-%m')
-            
-            conn = sqlite3.connect(self.research_db)
-            cursor = conn.cursor()
-            
-            # 今日の使用量取得
-            cursor.execute("""
-                SELECT daily_requests, total_tokens FROM usage_tracking 
-                WHERE date = ?
-            """, (today,))
-            
-            today_usage = cursor.fetchone()
-            daily_requests = today_usage[0] if today_usage else 0
-            daily_tokens = today_usage[1] if today_usage else 0
-            
-            # 今月の使用量取得
-            cursor.execute("""
-                SELECT SUM(monthly_requests), SUM(monthly_tokens) FROM usage_tracking 
-                WHERE date LIKE ?
-            """, (f"{month}%",))
-            
-            month_usage = cursor.fetchone()
-            monthly_requests = month_usage[0] if month_usage and month_usage[0] else 0
-            monthly_tokens = month_usage[1] if month_usage and month_usage[1] else 0
-            
-            conn.close()
-            
-            # Perplexity Pro制限 ($5/月クレジット)
-            DAILY_REQUEST_LIMIT = 100    # 1日100リクエスト (Pro想定)
-            MONTHLY_TOKEN_LIMIT = 200000  # 月間200,000トークン ($5相当)
-            MONTHLY_REQUEST_LIMIT = 2000  # 月間2000リクエスト
-            
-            # 制限チェック
-            if daily_requests >= DAILY_REQUEST_LIMIT:
-                print(f"❌ 1日のリクエスト制限に達しました ({daily_requests}/{DAILY_REQUEST_LIMIT})")
-                print("明日まで待つか、有料プランにアップグレードしてください")
-                return False
-            
-            if monthly_requests >= MONTHLY_REQUEST_LIMIT:
-                print(f"❌ 月間リクエスト制限に達しました ({monthly_requests}/{MONTHLY_REQUEST_LIMIT})")
-                print("来月まで待つか、有料プランにアップグレードしてください")
-                return False
-            
-            if monthly_tokens >= MONTHLY_TOKEN_LIMIT:
-                print(f"❌ 月間トークン制限に達しました ({monthly_tokens}/{MONTHLY_TOKEN_LIMIT})")
-                print("来月まで待つか、有料プランにアップグレードしてください")
-                return False
-            
-            # 警告表示
-            if daily_requests >= DAILY_REQUEST_LIMIT * 0.8:
-                print(f"⚠️ 1日制限の80%に達しました ({daily_requests}/{DAILY_REQUEST_LIMIT})")
-            
-            if monthly_requests >= MONTHLY_REQUEST_LIMIT * 0.8:
-                print(f"⚠️ 月間リクエスト制限の80%に達しました ({monthly_requests}/{MONTHLY_REQUEST_LIMIT})")
-            
-            if monthly_tokens >= MONTHLY_TOKEN_LIMIT * 0.8:
-                print(f"⚠️ 月間トークン制限の80%に達しました ({monthly_tokens}/{MONTHLY_TOKEN_LIMIT})")
-            
-            return True
-            
+            decision = self.ledger.reserve()
         except Exception as e:
             print(f"⚠️ 制限チェックエラー: {e}")
-            return True  # エラー時は実行を続行
+            return {"reserved": False}  # エラー時は実行を続行
+        
+        ledger = self.ledger
+        if decision["reason"] == "rate":
+            print(f"❌ リクエストが集中しています (最大{ledger.bucket.capacity}回/分)。少し待ってから再実行してください")
+            return None
+        
+        if decision["usage"] is None:
+            # 上限到達済み (日付/月が変わるまでDBを見ずに拒否)
+            print(f"❌ 無料枠の上限に達しています ({decision['reason']})")
+            print("期間が切り替わるまで待つか、有料プランにアップグレードしてください")
+            return None
+        
+        daily_requests, daily_tokens, monthly_requests, monthly_tokens = decision["usage"]
+        
+        # 制限チェック
+        if decision["reason"] == "daily_requests":
+            print(f"❌ 1日のリクエスト制限に達しました ({daily_requests}/{ledger.DAILY_REQUEST_LIMIT})")
+            print("明日まで待つか、有料プランにアップグレードしてください")
+            return None
+        
+        if decision["reason"] == "monthly_requests":
+            print(f"❌ 月間リクエスト制限に達しました ({monthly_requests}/{ledger.MONTHLY_REQUEST_LIMIT})")
+            print("来月まで待つか、有料プランにアップグレードしてください")
+            return None
+        
+        if decision["reason"] == "monthly_tokens":
+            print(f"❌ 月間トークン制限に達しました ({monthly_tokens}/{ledger.MONTHLY_TOKEN_LIMIT})")
+            print("来月まで待つか、有料プランにアップグレードしてください")
+            return None
+        
+        # 警告表示
+        if daily_requests >= ledger.DAILY_REQUEST_LIMIT * ledger.WARNING_RATIO:
+            print(f"⚠️ 1日制限の80%に達しました ({daily_requests}/{ledger.DAILY_REQUEST_LIMIT})")
+        
+        if monthly_requests >= ledger.MONTHLY_REQUEST_LIMIT * ledger.WARNING_RATIO:
+            print(f"⚠️ 月間リクエスト制限の80%に達しました ({monthly_requests}/{ledger.MONTHLY_REQUEST_LIMIT})")
+        
+        if monthly_tokens >= ledger.MONTHLY_TOKEN_LIMIT * ledger.WARNING_RATIO:
+            print(f"⚠️ 月間トークン制限の80%に達しました ({monthly_tokens}/{ledger.MONTHLY_TOKEN_LIMIT})")
+        
+        return {"reserved": True}
     
-    def _record_usage(self, usage):
-        """使用量記録"""
+    def _release_reservation(self):
+        """予約取消"""
         try:
-            today = datetime.now().strftime('%Y-%m-%d')
-            total_tokens = usage.get('total_tokens', 0)
-            
-            conn = sqlite3.connect(self.research_db)
-            cursor = conn.cursor()
-            
-            # 既存レコード確認
-            cursor.execute("""
-                SELECT daily_requests, total_tokens, monthly_requests, monthly_tokens 
-                FROM usage_tracking WHERE date = ?
-            """, (today,))
-            
-            existing = cursor.fetchone()
-            
-            if existing:
-                # 更新
-                cursor.execute("""
-                    UPDATE usage_tracking 
-                    SET daily_requests = daily_requests + 1,
-                        total_tokens = total_tokens + ?,
-                        monthly_requests = monthly_requests + 1,
-                        monthly_tokens = monthly_tokens + ?
-                    WHERE date = ?
-                """, (total_tokens, total_tokens, today))
-            else:
-                # 新規作成
-                cursor.execute("""
-                    INSERT INTO usage_tracking 
-                    (date, daily_requests, total_tokens, monthly_requests, monthly_tokens)
-                    VALUES (?, 1, ?, 1, ?)
-                """, (today, total_tokens, total_tokens))
-            
-            conn.commit()
-            conn.close()
-            
+            self.ledger.release()
+        except Exception as e:
+            print(f"⚠️ 予約取消エラー: {e}")
+    
+    def _record_usage(self, usage, saved_tokens=0):
+        """使用量記録 (リクエスト数は予約時に計上済み)"""
+        try:
+            self.ledger.record_tokens(usage.get('total_tokens', 0))
+            self.ledger.record_savings(saved_tokens)
         except Exception as e:
             print(f"⚠️ 使用量記録エラー: {e}")
     
     def show_usage_stats(self):
         """使用量統計表示"""
+        print(self.format_usage_stats())
+    
+    def format_usage_stats(self):
+        """使用量統計テキスト (MCPサーバーからはstdoutを介さずに取得する)"""
+        lines = []
         try:
             today = datetime.now().strftime('%Y-%m-%d')
             month = datetime.now().strftime('%Y-%m')
             
-            conn = sqlite3.connect(self.research_db)
-            cursor = conn.cursor()
-            
-            # 今日の使用量
-            cursor.execute("""
-                SELECT daily_requests, total_tokens FROM usage_tracking 
-                WHERE date = ?
-            """, (today,))
-            
-            today_usage = cursor.fetchone()
-            daily_requests = today_usage[0] if today_usage else 0
-            daily_tokens = today_usage[1] if today_usage else 0
-            
-            # 今月の使用量
-            cursor.execute("""
-                SELECT SUM(monthly_requests), SUM(monthly_tokens) FROM usage_tracking 
-                WHERE date LIKE ?
-            """, (f"{month}%",))
-            
-            month_usage = cursor.fetchone()
-            monthly_requests = month_usage[0] if month_usage and month_usage[0] else 0
-            monthly_tokens = month_usage[1] if month_usage and month_usage[1] else 0
-            
-            conn.close()
+            daily_requests, daily_tokens, monthly_requests, monthly_tokens = self.ledger.snapshot()
             
             # Perplexity Pro制限
-            DAILY_REQUEST_LIMIT = 100
-            MONTHLY_TOKEN_LIMIT = 200000
-            MONTHLY_REQUEST_LIMIT = 2000
-            
-            print("📊 Perplexity API 使用量統計 (Pro プラン - $5/月)")
-            print("=" * 50)
-            print(f"📅 今日 ({today}):")
-            print(f"   リクエスト: {daily_requests}/{DAILY_REQUEST_LIMIT} ({daily_requests/DAILY_REQUEST_LIMIT*100:.1f}%)")
-            print(f"   トークン: {daily_tokens}")
-            print()
-            print(f"📆 今月 ({month}):")
-            print(f"   リクエスト: {monthly_requests}/{MONTHLY_REQUEST_LIMIT} ({monthly_requests/MONTHLY_REQUEST_LIMIT*100:.1f}%)")
-            print(f"   トークン: {monthly_tokens}/{MONTHLY_TOKEN_LIMIT} ({monthly_tokens/MONTHLY_TOKEN_LIMIT*100:.1f}%)")
-            print()
+            DAILY_REQUEST_LIMIT = self.ledger.DAILY_REQUEST_LIMIT
+            MONTHLY_TOKEN_LIMIT = self.ledger.MONTHLY_TOKEN_LIMIT
+            MONTHLY_REQUEST_LIMIT = self.ledger.MONTHLY_REQUEST_LIMIT
+            
+            lines.append("📊 Perplexity API 使用量統計 (Pro プラン - $5/月)")
+            lines.append("=" * 50)
+            lines.append(f"📅 今日 ({today}):")
+            lines.append(f"   リクエスト: {daily_requests}/{DAILY_REQUEST_LIMIT} ({daily_requests/DAILY_REQUEST_LIMIT*100:.1f}%)")
+            lines.append(f"   トークン: {daily_tokens}")
+            lines.append("")
+            lines.append(f"📆 今月 ({month}):")
+            lines.append(f"   リクエスト: {monthly_requests}/{MONTHLY_REQUEST_LIMIT} ({monthly_requests/MONTHLY_REQUEST_LIMIT*100:.1f}%)")
+            lines.append(f"   トークン: {monthly_tokens}/{MONTHLY_TOKEN_LIMIT} ({monthly_tokens/MONTHLY_TOKEN_LIMIT*100:.1f}%)")
+            lines.append("")
+            
+            saved_today, saved_month = self.ledger.savings()
+            if saved_month:
+                lines.append(f"💾 プロンプト圧縮で節約: 今日 {saved_today} / 今月 {saved_month} トークン")
+                lines.append("")
             
             # 残り制限計算
             remaining_daily = DAILY_REQUEST_LIMIT - daily_requests
             remaining_monthly_req = MONTHLY_REQUEST_LIMIT - monthly_requests
             remaining_monthly_tok = MONTHLY_TOKEN_LIMIT - monthly_tokens
             
-            print("🎯 残り制限:")
-            print(f"   今日のリクエスト: {remaining_daily}回")
-            print(f"   今月のリクエスト: {remaining_monthly_req}回")
-            print(f"   今月のトークン: {remaining_monthly_tok}トークン")
+            lines.append("🎯 残り制限:")
+            lines.append(f"   今日のリクエスト: {remaining_daily}回")
+            lines.append(f"   今月のリクエスト: {remaining_monthly_req}回")
+            lines.append(f"   今月のトークン: {remaining_monthly_tok}トークン")
             
             if remaining_daily <= 5:
-                print("⚠️ 今日の制限に近づいています")
+                lines.append("⚠️ 今日の制限に近づいています")
             if remaining_monthly_req <= 50:
-                print("⚠️ 今月のリクエスト制限に近づいています")
+                lines.append("⚠️ 今月のリクエスト制限に近づいています")
             if remaining_monthly_tok <= 5000:
-                print("⚠️ 今月のトークン制限に近づいています")
+                lines.append("⚠️ 今月のトークン制限に近づいています")
                 
         except Exception as e:
-            print(f"⚠️ 統計取得エラー: {e}")
+            lines.append(f"⚠️ 統計取得エラー: {e}")
+        
+        return "\n".join(lines)
+    
+    def show_latency_stats(self, recent=500):
+        """ステージ別レイテンシ表示"""
+        print(self.format_latency_stats(recent))
+    
+    def format_latency_stats(self, recent=500):
+        """ステージ別レイテンシ (直近 recent 件) のパーセンタイル表"""
+        lines = []
+        try:
+            stats = self.tracer.latency_stats(recent)
+            lines.append(f"⏱️ ステージ別レイテンシ (各ステージ直近{recent}件, ms)")
+            lines.append("=" * 78)
+            if not stats:
+                lines.append("記録がありません (RESEARCH_TRACING=0 で無効化されていないか確認してください)")
+                return "\n".join(lines)
+            
+            lines.append(f"{'stage':<22}{'n':>8}{'errors':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+            for row in stats:
+                lines.append(
+                    f"{row['stage']:<22}{row['count']:>8}{row['errors']:>8}"
+                    f"{row['p50']:>10.1f}{row['p95']:>10.1f}{row['p99']:>10.1f}{row['max']:>10.1f}"
+                )
+        except Exception as e:
+            lines.append(f"⚠️ レイテンシ統計取得エラー: {e}")
+        
+        return "\n".join(lines)
     
     def show_history(self, limit=10):
         """履歴表示"""
         try:
-            conn = sqlite3.connect(self.research_db)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
+            results = self.storage.fetchall("""
                 SELECT timestamp, query, type, obsidian_path 
                 FROM research_history 
                 ORDER BY timestamp DESC 
                 LIMIT ?
             """, (limit,))
             
-            results = cursor.fetchall()
-            conn.close()
-            
             if results:
                 print(f"📚 最近のリサーチ履歴 (最新{len(results)}件)")
                 print("=" * 60)
@@ -576,6 +865,44 @@ Write-Host "Saved: $filename"
         except Exception as e:
             print(f"⚠️ 履歴取得エラー: {e}")
     
+    def search_history(self, terms, limit=10):
+        """履歴の全文検索 -> 結果 dict のリスト"""
+        try:
+            return self.index.search(terms, limit)
+        except Exception as e:
+            print(f"⚠️ 履歴検索エラー: {e}")
+            return []
+    
+    def show_history_search(self, terms, limit=10):
+        """履歴検索結果表示"""
+        results = self.search_history(terms, limit)
+        
+        if not results:
+            print(f"📚 「{' '.join(terms)}」に一致する履歴はありません")
+            return results
+        
+        print(f"🔎 履歴検索: {' '.join(terms)} ({len(results)}件)")
+        print("=" * 60)
+        
+        for item in results:
+            dt = datetime.fromisoformat(item["timestamp"])
+            print(f"🕒 {dt.strftime('%m/%d %H:%M')} [{item['type']}] {item['query']}")
+            print(f"   {item['snippet']}")
+            if item["obsidian_path"]:
+                print(f"   📝 {item['obsidian_path']}")
+            print()
+        
+        return results
+    
+    def show_cache_stats(self):
+        """キャッシュ統計表示"""
+        stats = self.cache.stats()
+        print("🗄️ 応答キャッシュ統計")
+        print("=" * 50)
+        print(f"   エントリ: {stats.get('entries', 0)}/{stats.get('max_entries', 0)} (有効: {stats.get('live_entries', 0)})")
+        print(f"   ヒット数: {stats.get('hits', 0)}")
+        print(f"   近似一致: {'有効' if self.cache.near_duplicate else '無効'}")
+    
     def test_connection(self):
         """API接続テスト"""
         print("🔧 Perplexity API 接続テスト")
@@ -586,7 +913,8 @@ Write-Host "Saved: $filename"
             print("export PERPLEXITY_API_KEY=your_actual_api_key")
             return False
         
-        test_result = self.perplexity_search("Hello, this is a connection test.", "llama-3.1-sonar-small-128k-online")
+        test_result = self.perplexity_search("Hello, this is a connection test.", "llama-3.1-sonar-small-128k-online",
+                                             use_cache=False)
         
         if test_result:
             print("✅ 接続テスト成功")
@@ -598,21 +926,36 @@ Write-Host "Saved: $filename"
 
 def main():
     """Simple First: 瞬間リサーチAI - 1コマンド実行"""
-    import sys
-    
-    ai = InstantResearchAI()
+    # 常駐デーモン (research_daemon.py start) が動いていれば処理を任せる
+    from research_daemon import forward
+    exit_code = forward(sys.argv[1:])
+    if exit_code is not None:
+        sys.exit(exit_code)
     
+    run_cli(InstantResearchAI(), sys.argv)
+
+def run_cli(ai, argv):
+    """CLI本体 (argv[0] はスクリプト名)。デーモンは起動済みの ai を使い回して呼ぶ"""
     print("⚡ Perplexity MCP × Claude 瞬間リサーチAI")
     print("=" * 50)
     
-    if len(sys.argv) < 2:
+    # CLIでは受信しながら表示する (--no-stream で一括表示)
+    stream = "--no-stream" not in argv
+    argv = [arg for arg in argv if arg != "--no-stream"]
+    
+    if len(argv) < 2:
         print("🔧 使用方法:")
         print("  python3 instant_research_ai.py instant \"検索クエリ\"")
         print("  python3 instant_research_ai.py deep \"深層リサーチテーマ\"")
         print("  python3 instant_research_ai.py session \"包括的リサーチテーマ\"")
         print("  python3 instant_research_ai.py history")
+        print("  python3 instant_research_ai.py history search \"キーワード\"")
         print("  python3 instant_research_ai.py usage")
+        print("  python3 instant_research_ai.py cache [clear]")
+        print("  python3 instant_research_ai.py stats [--latency]")
         print("  python3 instant_research_ai.py test")
+        print("  python3 research_daemon.py start|stop|status   (常駐モード)")
+        print("  (instant/deep は --no-stream で一括表示)")
         print()
         print("🔑 API設定:")
         print("  export PERPLEXITY_API_KEY=your_actual_api_key")
@@ -623,22 +966,38 @@ def main():
         print("  - 月間200,000トークン ($5相当)")
         return
     
-    command = sys.argv[1]
+    command = argv[1]
     
     if command == "test":
         ai.test_connection()
     elif command == "history":
-        ai.show_history()
+        if len(argv) > 3 and argv[2] == "search":
+            ai.show_history_search(argv[3:])
+        else:
+            ai.show_history()
     elif command == "usage":
         ai.show_usage_stats()
-    elif command == "instant" and len(sys.argv) > 2:
-        query = " ".join(sys.argv[2:])
-        ai.instant_search(query)
-    elif command == "deep" and len(sys.argv) > 2:
-        topic = " ".join(sys.argv[2:])
-        ai.deep_research(topic)
-    elif command == "session" and len(sys.argv) > 2:
-        theme = " ".join(sys.argv[2:])
+    elif command == "stats":
+        if "--latency" in argv:
+            ai.show_latency_stats()
+        else:
+            ai.show_usage_stats()
+            print()
+            ai.show_cache_stats()
+    elif command == "cache":
+        if len(argv) > 2 and argv[2] == "clear":
+            ai.cache.clear()
+            print("🗑️ 応答キャッシュを削除しました")
+        else:
+            ai.show_cache_stats()
+    elif command == "instant" and len(argv) > 2:
+        query = " ".join(argv[2:])
+        ai.instant_search(query, stream=stream)
+    elif command == "deep" and len(argv) > 2:
+        topic = " ".join(argv[2:])
+        ai.deep_research(topic, stream=stream)
+    elif command == "session" and len(argv) > 2:
+        theme = " ".join(argv[2:])
         ai.research_session(theme)
     else:
         print("❌ 無効なコマンドまたは引数不足")
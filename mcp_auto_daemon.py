@@ -24,6 +24,7 @@ class MCPAutoDaemon:
         self.default_config = {
             "check_interval_hours": 24,
             "auto_install": True,
+            "auto_research": True,
             "max_installs_per_day": 3,
             "efficiency_threshold": 7,
             "categories_priority": {
@@ -103,9 +104,15 @@ class MCPAutoDaemon:
         
         try:
             # MCPマネージャーを使用して最新ツール発見
+            from auto_research_system import AutoResearchSystem
+            from discovery_crawler import DiscoveryCrawler
             from mcp_auto_manager import MCPAutoManager
             
-            manager = MCPAutoManager()
+            # 両ツールで1サイクル分の検索結果を共有する (同じ検索は1回だけ)
+            crawler = DiscoveryCrawler.shared()
+            crawler.new_cycle()
+            
+            manager = MCPAutoManager(crawler=crawler)
             
             # エコシステム発見
             categorized = manager.discover_mcp_ecosystem()
@@ -134,6 +141,13 @@ class MCPAutoDaemon:
             # 統計更新
             self._update_statistics(categorized, analysis)
             
+            # 自動リサーチ (npm/GitHub検索はマネージャーと共有)
+            if self.config.get("auto_research", True):
+                AutoResearchSystem(crawler=crawler).full_auto_research()
+            
+            self.log(f"🌐 Crawler: {crawler.stats['requests']} requests, "
+                     f"{crawler.stats['shared']} shared, {crawler.stats['rate_limited']} rate-limited")
+            
         except Exception as e:
             self.log(f"❌ Scheduled check failed: {e}")
     
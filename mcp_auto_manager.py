@@ -7,15 +7,17 @@ TAL思考による開発効率化の革命的自動化
 
 import subprocess
 import json
-import requests
 import re
 import os
 from datetime import datetime
 from pathlib import Path
+from discovery_crawler import DiscoveryCrawler
 
 class MCPAutoManager:
-    def __init__(self):
+    def __init__(self, crawler=None):
         self.repo_path = "/mnt/c/Claude Code/tool"
+        # npm/GitHub検索は共通クローラ経由 (同一サイクル内の重複検索は1回にまとまる)
+        self.crawler = crawler or DiscoveryCrawler.shared()
         self.mcp_registry = {}
         self.efficiency_categories = {
             "code_analysis": ["code", "ast", "lint", "format", "analyze"],
@@ -44,6 +46,12 @@ class MCPAutoManager:
             "mcp-", "model-context"
         ]
         
+        # 全検索語を並列に先読み (ホスト別の同時接続数・レート制限はクローラが管理)
+        self.crawler.prefetch(
+            npm_terms=search_terms,
+            github_queries=[f"{term}+mcp" for term in search_terms]
+        )
+        
         for term in search_terms:
             try:
                 # npm search API (制限付きだが基本情報取得可能)
@@ -70,28 +78,22 @@ class MCPAutoManager:
     def _search_npm_packages(self, term):
         """npm パッケージ検索（公開API使用）"""
         try:
-            url = f"https://registry.npmjs.org/-/v1/search?text={term}&size=20"
-            response = requests.get(url, timeout=10)
+            packages = {}
             
-            if response.status_code == 200:
-                data = response.json()
-                packages = {}
-                
-                for obj in data.get("objects", []):
-                    package = obj.get("package", {})
-                    name = package.get("name", "")
-                    description = package.get("description", "")
-                    
-                    if self._is_mcp_relevant(name, description):
-                        packages[name] = {
-                            "source": "npm",
-                            "description": description,
-                            "version": package.get("version", ""),
-                            "install_cmd": f"npx -y {name}",
-                            "keywords": package.get("keywords", [])
-                        }
+            for package in self.crawler.npm_search(term):
+                name = package.get("name", "")
+                description = package.get("description", "")
                 
-                return packages
+                if self._is_mcp_relevant(name, description):
+                    packages[name] = {
+                        "source": "npm",
+                        "description": description,
+                        "version": package.get("version", ""),
+                        "install_cmd": f"npx -y {name}",
+                        "keywords": package.get("keywords", [])
+                    }
+            
+            return packages
                 
         except Exception as e:
             print(f"⚠️ npm search failed: {e}")
@@ -100,28 +102,23 @@ class MCPAutoManager:
     def _search_github_repos(self, term):
         """GitHub リポジトリ検索（制限付き）"""
         try:
-            # GitHub search APIは認証が必要だが、限定的に使用
-            url = f"https://api.github.com/search/repositories?q={term}+mcp&sort=updated&per_page=10"
-            response = requests.get(url, timeout=10)
+            # GitHub search APIは未認証だとレート制限が厳しい (クローラが X-RateLimit-* を見て調整)
+            repos = {}
             
-            if response.status_code == 200:
-                data = response.json()
-                repos = {}
+            for repo in self.crawler.github_search(f"{term}+mcp"):
+                name = repo.get("name", "")
+                description = repo.get("description", "")
                 
-                for repo in data.get("items", []):
-                    name = repo.get("name", "")
-                    description = repo.get("description", "")
-                    
-                    if self._is_mcp_relevant(name, description):
-                        repos[name] = {
-                            "source": "github",
-                            "description": description,
-                            "url": repo.get("html_url", ""),
-                            "stars": repo.get("stargazers_count", 0),
-                            "updated": repo.get("updated_at", "")
-                        }
-                
-                return repos
+                if self._is_mcp_relevant(name, description):
+                    repos[name] = {
+                        "source": "github",
+                        "description": description,
+                        "url": repo.get("html_url", ""),
+                        "stars": repo.get("stargazers_count", 0),
+                        "updated": repo.get("updated_at", "")
+                    }
+            
+            return repos
                 
         except Exception as e:
             print(f"⚠️ GitHub search limited: {e}")
@@ -3,47 +3,47 @@
 MCP CLI Wrapper - Claude Code CLI環境でMCPツールを簡単利用
 ========================================================
 JSON入力なしで MCP 機能を直接利用可能
+
+MCPサーバーは呼び出しのたびに起動せず、mcp_client_pool で起動済みのセッションを使い回す。
+`python3 mcp_cli_wrapper.py pool start` でプールを常駐させると、CLI を実行するたびの
+サーバー起動と initialize も省ける。
 """
 
-import json
-import subprocess
 import sys
-import os
+
+import mcp_client_pool
+from mcp_client_pool import MCPClientPool
 
 class MCPCLIWrapper:
     def __init__(self):
         self.repo_path = "/mnt/c/Claude Code/tool"
+        # サーバー名 -> 起動コマンド
         self.mcp_servers = {
-            "dev": "/mnt/c/Claude Code/tool/mcp_dev_efficiency.py"
+            "dev": ["python3", "/mnt/c/Claude Code/tool/mcp_dev_efficiency.py"],
+            "research": ["python3", "/mnt/c/Claude Code/tool/perplexity_mcp_server.py", "mcp-server"]
         }
+        self.pool = MCPClientPool.shared()
     
     def call_mcp_tool(self, server, tool_name, **args):
         """MCP ツールの呼び出し"""
-        request = {
-            "method": "tools/call",
-            "params": {
-                "name": tool_name,
-                "arguments": args
-            }
-        }
-        
         if server not in self.mcp_servers:
             return {"error": f"Unknown server: {server}"}
         
-        server_path = self.mcp_servers[server]
+        command = self.mcp_servers[server]
+        params = {"name": tool_name, "arguments": args}
         
         try:
-            # JSON 入力で MCP サーバーを呼び出し
-            result = subprocess.run([
-                "python3", server_path
-            ], input=json.dumps(request), text=True, 
-              capture_output=True, cwd=self.repo_path)
+            # 常駐プールがあればそちらのセッションを使う
+            response = mcp_client_pool.forward(command, "tools/call", params, cwd=self.repo_path)
+            if response is not None:
+                if "error" in response:
+                    return {"error": f"MCP call failed: {response['error']}"}
+                return response["result"]
             
-            if result.returncode == 0:
-                return json.loads(result.stdout)
-            else:
-                return {"error": f"MCP call failed: {result.stderr}"}
-                
+            return self.pool.call_tool(command, tool_name, args, cwd=self.repo_path)
+        
+        except mcp_client_pool.MCPError as e:
+            return {"error": f"MCP call failed: {e}"}
         except Exception as e:
             return {"error": f"Execution failed: {str(e)}"}
     
@@ -72,6 +72,11 @@ class MCPCLIWrapper:
         result = self.call_mcp_tool("dev", "dev_knowledge_sync", type=sync_type)
         return self._format_response(result)
     
+    def research_instant(self, query):
+        """Perplexity 瞬間検索"""
+        result = self.call_mcp_tool("research", "perplexity_instant_search", query=query)
+        return self._format_response(result)
+    
     def _format_response(self, result):
         """レスポンスの整形"""
         if "error" in result:
@@ -94,6 +99,8 @@ def main():
         print("  python3 mcp_cli_wrapper.py patterns [days]     # パターン検出")
         print("  python3 mcp_cli_wrapper.py optimize [focus]    # ワークフロー最適化")
         print("  python3 mcp_cli_wrapper.py sync [type]         # 知識同期")
+        print("  python3 mcp_cli_wrapper.py search <query>      # Perplexity 瞬間検索")
+        print("  python3 mcp_cli_wrapper.py pool [start|stop|status]  # MCPサーバーの常駐プール")
         return
     
     cmd = sys.argv[1]
@@ -126,6 +133,17 @@ def main():
         result = wrapper.dev_knowledge_sync(sync_type)
         print(result)
         
+    elif cmd == "search":
+        if len(sys.argv) < 3:
+            print("❌ 検索クエリが必要です")
+            return
+        result = wrapper.research_instant(" ".join(sys.argv[2:]))
+        print(result)
+        
+    elif cmd == "pool":
+        sys.argv = [mcp_client_pool.__file__] + sys.argv[2:]
+        mcp_client_pool.main()
+        
     else:
         print(f"❌ 不明なコマンド: {cmd}")
 
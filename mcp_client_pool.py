@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+"""
+MCP Client Pool - MCPサーバーの常駐セッション
+============================================
+ツール呼び出しのたびに python3 <server> を起動し直す代わりに、サーバーごとに
+1プロセスを起動して initialize ハンドシェイクを済ませ、stdio を開いたまま
+JSON-RPC の id で複数の呼び出しを多重化する。
+  - 一定時間使われていないサーバーは終了させる (MCP_POOL_IDLE 秒、既定300)
+  - 落ちたサーバーは次の呼び出し時に起動し直す
+
+CLI を何度も実行する場合はプロセスをまたいで使い回せるよう、プールを持つ
+ブローカーを Unix ソケットで常駐させられる。
+
+  python3 mcp_client_pool.py start|stop|status
+
+プロトコル (ブローカー): 1接続1リクエスト、改行区切りJSON。
+  → {"op": "call", "command": [...], "cwd": "...", "method": "tools/call", "params": {...}}
+  ← {"result": {...}} または {"error": "..."}
+"""
+
+import atexit
+import itertools
+import json
+import os
+import socket
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+PROTOCOL_VERSION = "2024-11-05"
+IDLE_TIMEOUT = float(os.getenv("MCP_POOL_IDLE", "300"))  # 秒。この間呼ばれなかったサーバーを終了
+BROKER_IDLE_TIMEOUT = int(os.getenv("MCP_POOL_BROKER_IDLE", "1800"))
+
+
+class MCPError(Exception):
+    """サーバーのエラー応答・通信断"""
+
+
+class MCPServerSession:
+    """起動済みの MCP サーバー1つ (stdio の JSON-RPC セッション)"""
+
+    def __init__(self, command, cwd=None, init_timeout=30.0):
+        self.command = list(command)
+        self.cwd = cwd
+        self.init_timeout = init_timeout
+        self.process = None
+        self.server_info = {}
+        self.last_used = time.time()
+
+        self._ids = itertools.count(1)
+        self._pending = {}  # id -> Future
+        self._eof = False  # stdout が閉じた (以降の応答は来ない)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def start(self):
+        """サーバーを起動して initialize ハンドシェイクまで済ませる"""
+        self._eof = False
+        self.process = subprocess.Popen(
+            self.command, cwd=self.cwd,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            # サーバーのログ (リサーチの進捗表示など) はこちらの stderr にそのまま流す
+            stderr=None,
+            start_new_session=True
+        )
+        threading.Thread(target=self._read_loop, args=(self.process,), daemon=True,
+                         name=f"mcp-reader-{self.process.pid}").start()
+
+        try:
+            result = self.request("initialize", {
+                "protocolVersion": PROTOCOL_VERSION,
+                "capabilities": {},
+                "clientInfo": {"name": "mcp-client-pool", "version": "1.0.0"}
+            }, timeout=self.init_timeout)
+            self.server_info = result.get("serverInfo", {}) if isinstance(result, dict) else {}
+            self.notify("notifications/initialized")
+        except Exception:
+            self.close()
+            raise
+        return self
+
+    @property
+    def alive(self):
+        return self.process is not None and not self._eof and self.process.poll() is None
+
+    @property
+    def busy(self):
+        with self._lock:
+            return bool(self._pending)
+
+    def request(self, method, params=None, timeout=None):
+        """リクエストを送って対応する id の応答を待つ -> result"""
+        future = Future()
+        with self._lock:
+            if not self.alive:
+                raise MCPError(f"MCPサーバーが停止しています: {' '.join(self.command)}")
+            request_id = next(self._ids)
+            self._pending[request_id] = future
+        self.last_used = time.time()
+
+        try:
+            self._send({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params or {}})
+            return future.result(timeout)
+        except FutureTimeout:
+            raise MCPError(f"{method} が {timeout}秒以内に応答しませんでした")
+        finally:
+            with self._lock:
+                self._pending.pop(request_id, None)
+            self.last_used = time.time()
+
+    def notify(self, method, params=None):
+        message = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            message["params"] = params
+        self._send(message)
+
+    def _send(self, message):
+        data = json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n"
+        try:
+            with self._write_lock:
+                self.process.stdin.write(data)
+                self.process.stdin.flush()
+        except (OSError, ValueError) as e:
+            raise MCPError(f"MCPサーバーへの送信に失敗: {e}")
+
+    def _read_loop(self, process):
+        """stdout の応答を id ごとに待っている呼び出しへ渡す"""
+        for line in process.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(message, dict) or "id" not in message:
+                # notifications/progress などの通知は使わない
+                continue
+
+            with self._lock:
+                future = self._pending.get(message["id"])
+            if future is None or future.done():
+                continue
+            if "error" in message:
+                error = message["error"]
+                future.set_exception(MCPError(error.get("message", str(error))
+                                              if isinstance(error, dict) else str(error)))
+            else:
+                future.set_result(message.get("result"))
+
+        # サーバーが終了した: 待っている呼び出しをすべて失敗させる
+        process.wait()
+        with self._lock:
+            self._eof = True
+            pending = list(self._pending.values())
+        for future in pending:
+            if not future.done():
+                future.set_exception(MCPError(f"MCPサーバーが終了しました (exit={process.returncode})"))
+
+    def close(self, timeout=2.0):
+        process = self.process
+        if process is None or process.poll() is not None:
+            return
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+        try:
+            process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+class MCPClientPool:
+    """コマンドごとに MCPServerSession を1つ保持し、使い回す"""
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        """プロセス内で共有するプール"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+                atexit.register(cls._shared.close)
+            return cls._shared
+
+    def __init__(self, idle_timeout=None):
+        self.idle_timeout = IDLE_TIMEOUT if idle_timeout is None else idle_timeout
+        self._sessions = {}  # (command, cwd) -> MCPServerSession
+        self._start_locks = {}  # (command, cwd) -> Lock (同じサーバーの起動を1回にまとめる)
+        self._lock = threading.Lock()
+        self._reaper = None
+        self.started = 0  # 起動したサーバー数 (再起動を含む)
+
+    def session(self, command, cwd=None):
+        """起動済みのセッション (なければ起動、落ちていれば起動し直す)"""
+        key = (tuple(command), cwd)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is not None and session.alive:
+                session.last_used = time.time()
+                return session
+            start_lock = self._start_locks.setdefault(key, threading.Lock())
+
+        # 起動と initialize はコマンドごとのロックで行う (遅いサーバーが他のコマンドを止めない)
+        with start_lock:
+            with self._lock:
+                session = self._sessions.get(key)
+                if session is not None and session.alive:
+                    session.last_used = time.time()
+                    return session
+            if session is not None:
+                print(f"🔄 MCPサーバーが終了していたため再起動します: {' '.join(command)}",
+                      file=sys.stderr)
+
+            session = MCPServerSession(command, cwd).start()
+            with self._lock:
+                self._sessions[key] = session
+                self.started += 1
+                self._start_reaper()
+            return session
+
+    def request(self, command, method, params=None, cwd=None, timeout=None):
+        return self.session(command, cwd).request(method, params, timeout)
+
+    def call_tool(self, command, name, arguments=None, cwd=None, timeout=None):
+        """tools/call -> result (content など)"""
+        return self.request(command, "tools/call", {"name": name, "arguments": arguments or {}},
+                            cwd=cwd, timeout=timeout)
+
+    def _start_reaper(self):
+        if self._reaper is None and self.idle_timeout:
+            self._reaper = threading.Thread(target=self._reap_loop, daemon=True, name="mcp-pool-reaper")
+            self._reaper.start()
+
+    def _reap_loop(self):
+        while True:
+            time.sleep(min(30, max(self.idle_timeout / 2, 0.1)))
+            self.reap_idle()
+
+    def reap_idle(self):
+        """idle_timeout 以上使われていないサーバーと終了済みのサーバーを片付ける"""
+        now = time.time()
+        with self._lock:
+            idle = [key for key, session in self._sessions.items()
+                    if not session.alive
+                    or (not session.busy and now - session.last_used > self.idle_timeout)]
+            sessions = [self._sessions.pop(key) for key in idle]
+        for session in sessions:
+            session.close()
+        return len(sessions)
+
+    def stats(self):
+        with self._lock:
+            return [{
+                "command": " ".join(session.command),
+                "pid": session.process.pid if session.process else None,
+                "alive": session.alive,
+                "idle": time.time() - session.last_used
+            } for session in self._sessions.values()]
+
+    def close(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+
+# ---------------------------------------------------------------------- ブローカー
+
+def socket_path():
+    return os.path.join(tempfile.gettempdir(), f"mcp_client_pool_{os.getuid()}.sock")
+
+
+def _request(message, timeout=5.0):
+    """ブローカーに1リクエスト送って応答を返す (未起動なら OSError)"""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(socket_path())
+        sock.settimeout(None)
+        sock.sendall(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+        with sock.makefile("r", encoding="utf-8") as reader:
+            line = reader.readline()
+        if not line:
+            raise OSError("broker closed the connection")
+        return json.loads(line)
+    finally:
+        sock.close()
+
+
+def forward(command, method, params=None, cwd=None):
+    """ブローカー経由で呼び出す -> ("result" or "error" を含む dict)
+
+    ブローカーに接続できなかった場合だけ None (呼び出し側は手元で実行してよい)。
+    接続後に通信が切れた場合はブローカー側で実行済みかもしれないので、手元で再実行させず
+    error を返す (dev_quick_commit の二重実行を防ぐ)。
+    """
+    if os.getenv("MCP_POOL_BROKER", "1") == "0" or not os.path.exists(socket_path()):
+        return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(5.0)
+    try:
+        try:
+            sock.connect(socket_path())
+        except OSError:
+            return None
+
+        sock.settimeout(None)
+        message = {"op": "call", "command": list(command), "cwd": cwd,
+                   "method": method, "params": params or {}}
+        try:
+            sock.sendall(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+            with sock.makefile("r", encoding="utf-8") as reader:
+                line = reader.readline()
+            if not line:
+                raise OSError("broker closed the connection")
+            return json.loads(line)
+        except (OSError, ValueError) as e:
+            return {"error": f"MCPプールとの通信が途中で切れました (実行済みの可能性があります): {e}"}
+    finally:
+        sock.close()
+
+
+class MCPPoolBroker(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """MCPClientPool を常駐させ、CLI からの呼び出しを受け付ける"""
+
+    daemon_threads = True
+
+    def __init__(self, path):
+        self.path = path
+        self.pool = MCPClientPool()
+        self.started = time.time()
+        self.last_request = time.time()
+        self.served = 0
+
+        if os.path.exists(path):
+            os.unlink(path)
+        super().__init__(path, _BrokerHandler)
+        os.chmod(path, 0o600)
+
+    def serve(self):
+        threading.Thread(target=self._idle_watch, daemon=True).start()
+        print(f"🟢 MCPプール起動: pid={os.getpid()} socket={self.path}", flush=True)
+        try:
+            self.serve_forever()
+        finally:
+            self.server_close()
+            self.pool.close()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            print("🔴 MCPプール終了", flush=True)
+
+    def _idle_watch(self):
+        while True:
+            time.sleep(min(60, max(BROKER_IDLE_TIMEOUT, 1)))
+            if BROKER_IDLE_TIMEOUT and time.time() - self.last_request > BROKER_IDLE_TIMEOUT:
+                print(f"💤 {BROKER_IDLE_TIMEOUT}秒間要求がないため終了します", flush=True)
+                self.shutdown()
+                return
+
+
+class _BrokerHandler(socketserver.StreamRequestHandler):
+    def _send(self, message):
+        self.wfile.write(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+    def handle(self):
+        server = self.server
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError:
+            return
+
+        op = request.get("op")
+        server.last_request = time.time()
+        if op == "ping":
+            self._send({"pid": os.getpid(), "uptime": time.time() - server.started,
+                        "served": server.served, "servers": server.pool.stats()})
+        elif op == "stop":
+            self._send({"ok": True})
+            threading.Thread(target=server.shutdown, daemon=True).start()
+        elif op == "call":
+            server.served += 1
+            try:
+                result = server.pool.request(request["command"], request["method"],
+                                             request.get("params"), cwd=request.get("cwd"))
+                message = {"result": result}
+            except Exception as e:
+                message = {"error": str(e)}
+            server.last_request = time.time()
+            try:
+                self._send(message)
+            except OSError:
+                pass
+        else:
+            self._send({"error": f"unknown op: {op}"})
+
+
+def status():
+    try:
+        return _request({"op": "ping"}, timeout=2.0)
+    except (OSError, ValueError):
+        return None
+
+
+def start():
+    """ブローカーをバックグラウンドで起動して、応答するまで待つ"""
+    info = status()
+    if info:
+        print(f"✅ 起動済み: pid={info['pid']}")
+        return True
+
+    log_path = socket_path()[:-len(".sock")] + ".log"
+    with open(log_path, "a", encoding="utf-8") as log:
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "serve"],
+            stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+            start_new_session=True
+        )
+
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        info = status()
+        if info:
+            print(f"🟢 MCPプール起動: pid={info['pid']} (ログ: {log_path})")
+            return True
+        time.sleep(0.1)
+
+    print(f"❌ MCPプールが起動しませんでした。ログを確認してください: {log_path}")
+    return False
+
+
+def stop():
+    try:
+        _request({"op": "stop"}, timeout=2.0)
+        print("🛑 MCPプールを停止しました")
+    except (OSError, ValueError):
+        print("ℹ️ MCPプールは起動していません")
+        if os.path.exists(socket_path()):
+            os.unlink(socket_path())
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+
+    if command == "serve":
+        MCPPoolBroker(socket_path()).serve()
+    elif command == "start":
+        sys.exit(0 if start() else 1)
+    elif command == "stop":
+        stop()
+    elif command == "status":
+        info = status()
+        if not info:
+            print("⚪ 停止中")
+            return
+        print(f"🟢 稼働中: pid={info['pid']} 稼働 {info['uptime']:.0f}秒 処理 {info['served']}件")
+        for server in info["servers"]:
+            state = "稼働" if server["alive"] else "停止"
+            print(f"   [{state}] pid={server['pid']} 待機 {server['idle']:.0f}秒: {server['command']}")
+    else:
+        print("使用方法: python3 mcp_client_pool.py start|stop|status")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,18 +3,48 @@
 MCP Development Efficiency Tool
 ==============================
 開発効率化特化のカスタムMCPサーバー
+
+Requests are dispatched concurrently: tools/call runs on a per-group thread
+pool and responses are written as they complete, tagged with their JSON-RPC id.
 """
 
 import json
 import subprocess
 import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from pathlib import Path
+
+from git_snapshot import GitSnapshot
+
+# Concurrency groups: tools in the same group share one pool of `limit` workers
+CONCURRENCY_GROUPS = {
+    "git_write": 1,       # git add/commit must not race on .git/index.lock
+    "obsidian_write": 1,  # session notes are named by timestamp
+    "read": int(os.getenv("MCP_DEV_MAX_WORKERS", "4"))
+}
+TOOL_GROUPS = {
+    "dev_quick_commit": "git_write",
+    "dev_knowledge_sync": "obsidian_write"
+}  # everything else is read-only
+
+def _file_analyzer():
+    """Shared FileAnalyzer, imported on first use (ast/hashlib are not needed to answer initialize)"""
+    from file_analyzer import FileAnalyzer
+    return FileAnalyzer.shared()
 
 class MCPDevEfficiencyServer:
     def __init__(self):
         self.repo_path = "/mnt/c/Claude Code/tool"
+        # Branch/status/log lookups are served from a cached snapshot (no git process per call)
+        self.git = GitSnapshot.for_repo(self.repo_path)
+        self.executors = {
+            group: ThreadPoolExecutor(max_workers=limit, thread_name_prefix=f"dev-{group}")
+            for group, limit in CONCURRENCY_GROUPS.items()
+        }
+        self.output = sys.stdout
+        self._write_lock = threading.Lock()
         self.tools = {
             "dev_quick_commit": {
                 "description": "Smart quick commit with context analysis",
@@ -53,7 +83,9 @@ class MCPDevEfficiencyServer:
         method = request.get("method")
         params = request.get("params", {})
         
-        if method == "tools/list":
+        if method == "initialize":
+            return self._initialize()
+        elif method == "tools/list":
             return self._list_tools()
         elif method == "tools/call":
             tool_name = params.get("name")
@@ -62,6 +94,73 @@ class MCPDevEfficiencyServer:
         else:
             return {"error": f"Unknown method: {method}"}
     
+    def _initialize(self):
+        """MCP initialize handshake"""
+        return {
+            "protocolVersion": "2024-11-05",
+            "capabilities": {"tools": {}},
+            "serverInfo": {"name": "dev-efficiency", "version": "1.0.0"}
+        }
+    
+    def handle_message(self, request):
+        """Handle one line: JSON-RPC 2.0 (id echoed back) or legacy raw request
+        
+        Returns None for notifications (no response is written).
+        """
+        if "jsonrpc" not in request:
+            # Legacy one-shot callers (mcp_revolutionary_bridge.sh) expect the bare result
+            return self.handle_request(request)
+        
+        request_id = request.get("id")
+        if request_id is None:
+            # notifications/initialized etc.
+            return None
+        
+        response = self.handle_request(request)
+        if request.get("method") not in ("initialize", "tools/list", "tools/call"):
+            return {
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "error": {"code": -32601, "message": response["error"]}
+            }
+        return {"jsonrpc": "2.0", "id": request_id, "result": response}
+    
+    def dispatch(self, request):
+        """Handle one request without blocking the reader
+        
+        tools/call runs on its group's pool; initialize, tools/list and
+        notifications are answered inline so they never wait behind slow tools.
+        """
+        if request.get("method") != "tools/call":
+            self._write(self.handle_message(request))
+            return None
+        
+        tool_name = request.get("params", {}).get("name")
+        executor = self.executors[TOOL_GROUPS.get(tool_name, "read")]
+        return executor.submit(self._run, request)
+    
+    def _run(self, request):
+        try:
+            response = self.handle_message(request)
+        except Exception as e:
+            response = {"error": f"Tool execution failed: {str(e)}"}
+            if "jsonrpc" in request:
+                response = {"jsonrpc": "2.0", "id": request.get("id"), "result": response}
+        self._write(response)
+    
+    def _write(self, response):
+        """Write one response line (called from worker threads)"""
+        if response is None:
+            return
+        with self._write_lock:
+            self.output.write(json.dumps(response) + "\n")
+            self.output.flush()
+    
+    def shutdown(self):
+        """Wait for in-flight tools so every request gets its response"""
+        for executor in self.executors.values():
+            executor.shutdown(wait=True)
+    
     def _list_tools(self):
         """Available tools list"""
         return {
@@ -164,14 +263,7 @@ class MCPDevEfficiencyServer:
         }
         
         # Git history
-        try:
-            git_log = subprocess.run([
-                "git", "log", "--oneline", "-5", "--", file_path
-            ], capture_output=True, text=True, cwd=self.repo_path)
-            
-            context["recent_changes"] = git_log.stdout.strip().split('\n') if git_log.stdout else []
-        except:
-            context["recent_changes"] = []
+        context["recent_changes"] = self.git.file_log(file_path, 5)
         
         # File analysis
         if file_path.endswith('.py'):
@@ -189,37 +281,17 @@ class MCPDevEfficiencyServer:
         }
     
     def _analyze_python_file(self, file_path):
-        """Python file analysis"""
+        """Python file analysis (ast: symbols, complexity, imports; memoized by content hash)"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            analysis = {
-                "lines": len(content.split('\n')),
-                "functions": len([line for line in content.split('\n') if line.strip().startswith('def ')]),
-                "classes": len([line for line in content.split('\n') if line.strip().startswith('class ')]),
-                "imports": len([line for line in content.split('\n') if line.strip().startswith('import ') or line.strip().startswith('from ')])
-            }
-            
-            return analysis
-        except:
+            return _file_analyzer().analyze(file_path)
+        except Exception:
             return {"error": "Analysis failed"}
     
     def _analyze_markdown_file(self, file_path):
-        """Markdown file analysis"""
+        """Markdown file analysis (headings, wikilinks, code blocks; memoized by content hash)"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            analysis = {
-                "lines": len(content.split('\n')),
-                "headings": len([line for line in content.split('\n') if line.strip().startswith('#')]),
-                "code_blocks": content.count('```'),
-                "links": content.count('[')
-            }
-            
-            return analysis
-        except:
+            return _file_analyzer().analyze(file_path)
+        except Exception:
             return {"error": "Analysis failed"}
     
     def _dev_pattern_detect(self, args):
@@ -228,11 +300,7 @@ class MCPDevEfficiencyServer:
         
         try:
             # Recent commits analysis
-            git_log = subprocess.run([
-                "git", "log", f"--since={days} days ago", "--pretty=format:%s", "--no-merges"
-            ], capture_output=True, text=True, cwd=self.repo_path)
-            
-            commits = git_log.stdout.strip().split('\n') if git_log.stdout else []
+            commits = self.git.subjects_since(days)
             
             patterns = {
                 "commit_count": len(commits),
@@ -348,36 +416,15 @@ class MCPDevEfficiencyServer:
     
     def _get_current_branch(self):
         """Get current git branch"""
-        try:
-            result = subprocess.run(
-                ["git", "branch", "--show-current"],
-                capture_output=True, text=True, cwd=self.repo_path
-            )
-            return result.stdout.strip()
-        except:
-            return "unknown"
+        return self.git.branch()
     
     def _get_uncommitted_count(self):
         """Get number of uncommitted files"""
-        try:
-            result = subprocess.run(
-                ["git", "status", "--porcelain"],
-                capture_output=True, text=True, cwd=self.repo_path
-            )
-            return len(result.stdout.strip().split('\n')) if result.stdout.strip() else 0
-        except:
-            return 0
+        return self.git.uncommitted_count()
     
     def _get_recent_commits(self, count):
         """Get recent commits"""
-        try:
-            result = subprocess.run(
-                ["git", "log", "--oneline", f"-{count}"],
-                capture_output=True, text=True, cwd=self.repo_path
-            )
-            return result.stdout.strip().split('\n') if result.stdout else []
-        except:
-            return []
+        return self.git.recent_commits(count)
     
     def _save_to_obsidian(self, folder, filename, content):
         """Save content to Obsidian"""
@@ -405,17 +452,21 @@ def main():
     """MCP Server main execution"""
     server = MCPDevEfficiencyServer()
     
-    # Stdin/Stdout communication for MCP protocol
-    for line in sys.stdin:
-        try:
-            request = json.loads(line.strip())
-            response = server.handle_request(request)
-            print(json.dumps(response))
-            sys.stdout.flush()
-        except json.JSONDecodeError:
-            print(json.dumps({"error": "Invalid JSON"}))
-        except KeyboardInterrupt:
-            break
+    # Stdin/Stdout communication for MCP protocol (responses may arrive out of order)
+    try:
+        for line in sys.stdin:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line.strip())
+            except json.JSONDecodeError:
+                server._write({"error": "Invalid JSON"})
+                continue
+            server.dispatch(request)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -3,20 +3,30 @@
 Perplexity MCP Server - True MCP Protocol Implementation
 ========================================================
 Claude Code でネイティブにMCPとして認識される形の実装
+
+initialize / tools/list は静的なメタデータだけで即座に返す。InstantResearchAI
+(requests などの import と DB 初期化) は最初の tools/call でワーカースレッド上に作る。
 """
 
 import asyncio
+import functools
 import json
 import sys
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, List
-from instant_research_ai import InstantResearchAI
 
 class PerplexityMCPServer:
     """Perplexity MCP Server - MCPプロトコル準拠"""
     
-    def __init__(self):
-        self.research_ai = InstantResearchAI()
+    def __init__(self, max_workers=8):
+        self._research_ai = None
+        self._research_ai_lock = threading.Lock()
+        # 同期的なリサーチ処理はこのプールで実行し、イベントループは常に空けておく
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mcp-tool")
+        # プロトコル出力先 (run_server で実際の stdout を確保する)
+        self.protocol_out = sys.stdout
         self.capabilities = {
             "tools": [
                 {
@@ -52,6 +62,18 @@ class PerplexityMCPServer:
                         "required": ["theme"]
                     }
                 },
+                {
+                    "name": "perplexity_history_search",
+                    "description": "過去のリサーチ履歴を全文検索 (API呼び出しなし)",
+                    "inputSchema": {
+                        "type": "object",
+                        "properties": {
+                            "query": {"type": "string", "description": "検索語 (空白区切りでAND検索)"},
+                            "limit": {"type": "number", "description": "最大件数", "default": 5}
+                        },
+                        "required": ["query"]
+                    }
+                },
                 {
                     "name": "perplexity_usage_stats",
                     "description": "使用量統計表示",
@@ -64,6 +86,16 @@ class PerplexityMCPServer:
             ]
         }
     
+    @property
+    def research_ai(self):
+        """InstantResearchAI (初回アクセス時に import と DB 初期化を行う)"""
+        if self._research_ai is None:
+            with self._research_ai_lock:
+                if self._research_ai is None:
+                    from instant_research_ai import InstantResearchAI
+                    self._research_ai = InstantResearchAI()
+        return self._research_ai
+    
     async def handle_initialize(self) -> Dict[str, Any]:
         """MCP初期化"""
         return {
@@ -75,11 +107,62 @@ class PerplexityMCPServer:
             }
         }
     
-    async def handle_call_tool(self, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
-        """MCPツール呼び出し処理"""
+    def _write_message(self, message: Dict[str, Any]):
+        """JSON-RPCメッセージを1行で送信 (イベントループ上からのみ呼ぶ)"""
+        self.protocol_out.write(json.dumps(message) + "\n")
+        self.protocol_out.flush()
+    
+    def _progress_callback(self, progress_token):
+        """受信チャンクを notifications/progress として送るコールバックを作る
+        
+        コールバックは検索スレッドから呼ばれるため、送信はイベントループに委ねる。
+        """
+        if progress_token is None:
+            return None
+        
+        loop = asyncio.get_running_loop()
+        received = [0]
+        
+        def send_progress(text):
+            received[0] += len(text)
+            notification = {
+                "jsonrpc": "2.0",
+                "method": "notifications/progress",
+                "params": {
+                    "progressToken": progress_token,
+                    "progress": received[0],
+                    "message": text
+                }
+            }
+            loop.call_soon_threadsafe(self._write_message, notification)
+        
+        return send_progress
+    
+    async def _run_blocking(self, func, *args, **kwargs):
+        """同期的なリサーチ処理をスレッドで実行 (その間も通知を送れるように)"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+    
+    async def _run_research(self, method, *args, **kwargs):
+        """research_ai のメソッドをスレッドで実行 (初回の初期化もイベントループを止めずにスレッドで行う)"""
+        def call():
+            return getattr(self.research_ai, method)(*args, **kwargs)
+        return await self._run_blocking(call)
+    
+    async def handle_call_tool(self, name: str, arguments: Dict[str, Any],
+                               progress_token: Any = None) -> Dict[str, Any]:
+        """MCPツール呼び出し処理
+        
+        progress_token (params._meta.progressToken) が指定された場合、
+        検索結果をストリーミングで受信し notifications/progress で逐次送る。
+        """
         try:
+            on_chunk = self._progress_callback(progress_token)
+            
             if name == "perplexity_instant_search":
-                result = self.research_ai.instant_search(arguments["query"])
+                result = await self._run_research(
+                    "instant_search", arguments["query"], on_chunk=on_chunk, priority="mcp"
+                )
                 return {
                     "content": [
                         {
@@ -90,7 +173,9 @@ class PerplexityMCPServer:
                 }
             
             elif name == "perplexity_deep_research":
-                result = self.research_ai.deep_research(arguments["topic"])
+                result = await self._run_research(
+                    "deep_research", arguments["topic"], on_chunk=on_chunk, priority="mcp"
+                )
                 return {
                     "content": [
                         {
@@ -101,7 +186,9 @@ class PerplexityMCPServer:
                 }
             
             elif name == "perplexity_research_session":
-                results = self.research_ai.research_session(arguments["theme"])
+                results = await self._run_research(
+                    "research_session", arguments["theme"], priority="mcp"
+                )
                 summary = f"📊 包括的リサーチ完了: {len(results) if results else 0}個の観点で調査"
                 return {
                     "content": [
@@ -112,15 +199,29 @@ class PerplexityMCPServer:
                     ]
                 }
             
+            elif name == "perplexity_history_search":
+                results = await self._run_research(
+                    "search_history", arguments["query"].split(), int(arguments.get("limit", 5))
+                )
+                if results:
+                    text = f"📚 履歴検索結果: {len(results)}件\n\n" + "\n\n---\n\n".join(
+                        f"## {item['query']} [{item['type']}] ({item['timestamp']})\n\n{item['content']}"
+                        for item in results
+                    )
+                else:
+                    text = f"📚 「{arguments['query']}」に一致する履歴はありません"
+                return {
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": text
+                        }
+                    ]
+                }
+            
             elif name == "perplexity_usage_stats":
-                # 使用量統計を文字列として取得
-                import io
-                import contextlib
-                
-                f = io.StringIO()
-                with contextlib.redirect_stdout(f):
-                    self.research_ai.show_usage_stats()
-                stats_output = f.getvalue()
+                # 使用量統計を文字列として取得 (並列実行中に stdout を差し替えない)
+                stats_output = await self._run_research("format_usage_stats")
                 
                 return {
                     "content": [
@@ -157,49 +258,117 @@ class PerplexityMCPServer:
         """利用可能ツール一覧"""
         return {"tools": self.capabilities["tools"]}
     
+    async def _open_stdin(self):
+        """stdin を asyncio の StreamReader として開く"""
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=16 * 1024 * 1024)
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+        return reader
+    
+    async def _readline(self, reader):
+        if reader is None:
+            # パイプとして開けない環境 (Windowsコンソール等) ではスレッドで読む
+            return await asyncio.get_running_loop().run_in_executor(None, sys.stdin.readline)
+        return (await reader.readline()).decode("utf-8")
+    
+    async def handle_request(self, request: Dict[str, Any]):
+        """1リクエスト処理 (完了した順に対応する id でレスポンスを書き出す)"""
+        request_id = request.get("id")
+        method = request.get("method")
+        
+        try:
+            if method == "initialize":
+                response = await self.handle_initialize()
+            elif method == "tools/list":
+                response = await self.handle_list_tools()
+            elif method == "tools/call":
+                params = request.get("params", {})
+                response = await self.handle_call_tool(
+                    params["name"],
+                    params.get("arguments", {}),
+                    params.get("_meta", {}).get("progressToken")
+                )
+            elif request_id is None:
+                # notifications/initialized などの通知には応答しない
+                return
+            else:
+                self._write_message({
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "error": {
+                        "code": -32601,
+                        "message": f"Unknown method: {method}"
+                    }
+                })
+                return
+            
+            # MCPプロトコル準拠のレスポンス
+            mcp_response = {
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "result": response
+            }
+            
+            self._write_message(mcp_response)
+            
+        except Exception as e:
+            error_response = {
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "error": {
+                    "code": -32603,
+                    "message": str(e)
+                }
+            }
+            self._write_message(error_response)
+    
     async def run_server(self):
-        """MCPサーバー実行"""
-        while True:
-            try:
-                line = await asyncio.get_event_loop().run_in_executor(None, sys.stdin.readline)
+        """MCPサーバー実行
+        
+        各リクエストを個別のタスクとして処理するため、時間のかかる
+        perplexity_research_session の実行中でも perplexity_usage_stats などは即座に返る。
+        """
+        # リサーチ処理の print がプロトコル出力に混ざらないよう stderr へ逃がす
+        self.protocol_out = sys.stdout
+        sys.stdout = sys.stderr
+        
+        try:
+            reader = await self._open_stdin()
+        except (OSError, ValueError, NotImplementedError):
+            reader = None
+        
+        pending = set()
+        try:
+            while True:
+                line = await self._readline(reader)
                 if not line:
                     break
+                if not line.strip():
+                    continue
                 
-                request = json.loads(line.strip())
-                
-                if request["method"] == "initialize":
-                    response = await self.handle_initialize()
-                elif request["method"] == "tools/list":
-                    response = await self.handle_list_tools()
-                elif request["method"] == "tools/call":
-                    response = await self.handle_call_tool(
-                        request["params"]["name"],
-                        request["params"].get("arguments", {})
-                    )
-                else:
-                    response = {"error": f"Unknown method: {request['method']}"}
-                
-                # MCPプロトコル準拠のレスポンス
-                mcp_response = {
-                    "jsonrpc": "2.0",
-                    "id": request.get("id"),
-                    "result": response
-                }
-                
-                print(json.dumps(mcp_response))
-                sys.stdout.flush()
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError as e:
+                    self._write_message({
+                        "jsonrpc": "2.0",
+                        "id": None,
+                        "error": {
+                            "code": -32700,
+                            "message": f"Parse error: {e}"
+                        }
+                    })
+                    continue
                 
-            except Exception as e:
-                error_response = {
-                    "jsonrpc": "2.0",
-                    "id": request.get("id") if 'request' in locals() else None,
-                    "error": {
-                        "code": -32603,
-                        "message": str(e)
-                    }
-                }
-                print(json.dumps(error_response))
-                sys.stdout.flush()
+                task = asyncio.create_task(self.handle_request(request))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            
+            # 入力終了後も実行中のリクエストには応答してから終了する
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        finally:
+            sys.stdout = self.protocol_out
+            self.executor.shutdown(wait=False)
 
 async def main():
     """MCPサーバー起動"""
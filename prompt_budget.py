@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Prompt Budget - プロンプトのトークン予算管理
+==========================================
+送信前にトークン数をローカルで見積もり、上流の検索結果などを予算内に収める。
+tiktoken があればそれで数え、なければ文字種ごとの近似
+(CJK 1文字 ≈ 1トークン、それ以外 4文字 ≈ 1トークン) を使う。
+予算を超える本文は、見出しと各段落の冒頭の文から順に残す抽出要約で縮める。
+"""
+
+import math
+import re
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+_CJK = re.compile(r"[\u3000-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]")
+# 文末 (。！？ / 英文のピリオド+空白) と改行の直後で区切る
+_SENTENCE_END = re.compile(r"(?<=[。！？!?\n])|(?<=\. )")
+
+_encoding = None
+
+
+def _tiktoken_encoding():
+    """tiktoken のエンコーディング (初回のみ読み込み。使えなければ False)"""
+    global _encoding
+    if _encoding is None:
+        try:
+            _encoding = tiktoken.get_encoding("cl100k_base") if tiktoken else False
+        except Exception:
+            # 語彙ファイルを取得できない環境では近似に切り替える
+            _encoding = False
+    return _encoding
+
+
+def estimate_tokens(text):
+    """トークン数の見積もり (課金トークン数と完全には一致しない目安)"""
+    if not text:
+        return 0
+    encoding = _tiktoken_encoding()
+    if encoding:
+        return len(encoding.encode(text))
+    cjk = len(_CJK.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def compact_text(text):
+    """意味を変えずに空白を詰める (行頭インデント・行末空白・連続空行)"""
+    lines = [line.strip() for line in text.strip().splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines))
+
+
+def _cut(text, budget):
+    """1文が予算を超える場合の最終手段: 先頭から予算に収まる長さで切る"""
+    while text and estimate_tokens(text) > budget:
+        text = text[:int(len(text) * budget / estimate_tokens(text) * 0.95)]
+    return text
+
+
+def trim_to_budget(text, budget, marker="…"):
+    """text を budget トークン以内に縮める
+
+    まず空白を詰め、それでも超える場合は段落 (空行区切り) ごとに文へ分け、
+    全段落の1文目 → 2文目 … の順に予算が尽きるまで採用する。
+    見出しや各節の要点は冒頭にあることが多いので、全体を満遍なく要約した形で残る。
+    途中で切った段落の末尾には marker を付ける。
+    """
+    text = compact_text(text)
+    if estimate_tokens(text) <= budget:
+        return text
+
+    blocks = [[s for s in _SENTENCE_END.split(block) if s.strip()] for block in text.split("\n\n")]
+    blocks = [sentences for sentences in blocks if sentences]
+    # 段落の区切りと省略記号の分を先に確保しておく
+    available = budget - estimate_tokens(("\n\n" + marker) * len(blocks))
+
+    kept = [0] * len(blocks)
+    used = 0
+    depth = 0
+    while True:
+        progress = False
+        for i, sentences in enumerate(blocks):
+            # 前の周回で予算に収まらなかった段落はそこで打ち切り
+            if kept[i] != depth or depth >= len(sentences):
+                continue
+            cost = estimate_tokens(sentences[depth])
+            if used + cost <= available:
+                kept[i] += 1
+                used += cost
+                progress = True
+        if not progress:
+            break
+        depth += 1
+
+    if not any(kept):
+        return _cut(blocks[0][0], budget - estimate_tokens(marker)).rstrip() + marker
+
+    parts = []
+    for sentences, count in zip(blocks, kept):
+        if not count:
+            continue
+        part = "".join(sentences[:count]).rstrip()
+        if count < len(sentences):
+            part += marker
+        parts.append(part)
+    return "\n\n".join(parts)
+
+
+def fit_to_budget(text, budget):
+    """予算に収めた本文と節約トークン数 -> (text, saved_tokens)"""
+    original = estimate_tokens(text)
+    fitted = trim_to_budget(text, budget) if budget else text
+    return fitted, max(original - estimate_tokens(fitted), 0)
+
+
+class PromptTemplate:
+    """何度も送る固定プロンプト (空白を詰めた版を1度だけ作って使い回す)
+
+    ソース上は読みやすいインデント付きで書き、送信時は compact した text を使う。
+    以前は別の形で送っていた定型文を置き換える場合は、その文面を previous に、
+    置き換え後もユーザーメッセージに残る定型文を query に渡す。
+    saved_tokens は以前の送信内容と比べた1回あたりの節約分 (previous がなければ 0)。
+    ソースのインデントは一度も送っていないので節約には数えない。
+    """
+
+    def __init__(self, source, previous=None, query=""):
+        self.text = compact_text(source)
+        self.tokens = estimate_tokens(self.text)
+        self.saved_tokens = 0
+        if previous:
+            sent = self.tokens + estimate_tokens(query)
+            self.saved_tokens = max(estimate_tokens(previous) - sent, 0)
+
+    def __str__(self):
+        return self.text
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Request Coalescer - 同一リクエストの単一実行化 (single-flight)
+============================================================
+同じキーの呼び出しが同時に来た場合、最初の1件 (リーダー) だけが実行し、
+残りはその結果を待って受け取る。プロセスをまたぐ重複は ResearchCache のリースで防ぐ。
+"""
+
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """プロセス内の同時呼び出しを1回の実行にまとめる"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func):
+        """func() を実行して (結果, 共有されたか) を返す
+
+        同じ key で実行中の呼び出しがあれば、新たに実行せずその結果を待つ。
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+        return call.result, False
+
+    def inflight(self):
+        """実行中のキー数"""
+        with self._lock:
+            return len(self._calls)
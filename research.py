@@ -8,6 +8,7 @@ import sys
 import json
 import requests
 from datetime import datetime
+from http_client import HTTPClient
 
 def research_with_perplexity(query):
     """Perplexity APIを使用してリサーチを実行"""
@@ -16,7 +17,7 @@ def research_with_perplexity(query):
         raise ValueError("PERPLEXITY_API_KEY environment variable not set")
     
     # Perplexity API エンドポイント
-    url = "https://api.perplexity.ai/chat/completions"
+    url = os.environ.get('PERPLEXITY_BASE_URL', 'https://api.perplexity.ai').rstrip('/') + "/chat/completions"
     
     headers = {
         "Authorization": f"Bearer {api_key}",
@@ -40,7 +41,8 @@ def research_with_perplexity(query):
     }
     
     try:
-        response = requests.post(url, json=payload, headers=headers)
+        # 共有クライアント経由 (接続プール・429/5xx の再試行・サーキットブレーカー)
+        response = HTTPClient.shared().post(url, json=payload, headers=headers, timeout=60, max_retries=3)
         response.raise_for_status()
         
         result = response.json()
@@ -59,8 +61,12 @@ def research_with_perplexity(query):
         with open('output/research_results.json', 'w', encoding='utf-8') as f:
             json.dump(research_data, f, ensure_ascii=False, indent=2)
         
+        # レポート生成用のフィード (1クエリ1行で追記、generate_report.py が順に読む)
+        with open('output/research_results.jsonl', 'a', encoding='utf-8') as f:
+            f.write(json.dumps(research_data, ensure_ascii=False) + "\n")
+        
         print(f"✅ Research completed for: {query}")
-        print(f"📄 Results saved to output/research_results.json")
+        print(f"📄 Results saved to output/research_results.json (+ research_results.jsonl)")
         
         return content
         
@@ -11,15 +11,23 @@ case "$1" in
         echo "  ./research.sh deep \"テーマ\"          # 深層リサーチ"
         echo "  ./research.sh session \"テーマ\"       # 包括的セッション"
         echo "  ./research.sh history                 # 履歴表示"
+        echo "  ./research.sh history search \"語句\"   # 履歴の全文検索"
         echo "  ./research.sh usage                   # 使用量統計"
+        echo "  ./research.sh cache [clear]           # 応答キャッシュ統計/削除"
         echo "  ./research.sh test                    # 接続テスト"
+        echo "  ./research.sh daemon start|stop|status # 常駐モード (起動中は自動で転送)"
         echo ""
         echo "💡 Perplexity Pro制限:"
         echo "  - 1日100リクエスト"
         echo "  - 月間2,000リクエスト" 
         echo "  - 月間200,000トークン ($5相当)"
         ;;
+    "daemon")
+        shift
+        python3 "$SCRIPT_DIR/research_daemon.py" "${@:-status}"
+        ;;
     *)
-        python3 "$SCRIPT_DIR/instant_research_ai.py" "$@"
+        # デーモンが起動していれば転送、なければこのプロセスで実行
+        python3 "$SCRIPT_DIR/research_daemon.py" run "$@"
         ;;
 esac
\ No newline at end of file
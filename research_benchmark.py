@@ -0,0 +1,613 @@
+#!/usr/bin/env python3
+"""
+Research Benchmark - リサーチ系の性能計測
+========================================
+Perplexity / Anthropic 互換のモックサーバーをローカルに立て、
+instant_search・deep_research・research_session・Claude分析・MCPサーバーを実行して
+ステージごとの p50/p95 レイテンシ・スループット・DB時間を出す。
+APIキーもネットワークも不要なので、性能改善の前後比較をオフライン / CI で行える。
+
+使い方:
+  python research_benchmark.py
+  python research_benchmark.py --iterations 50 --concurrency 4 --latency 0.2 --error-rate 0.05
+  python research_benchmark.py --responses recorded.jsonl --json result.json
+  python research_benchmark.py --baseline result.json --tolerance 0.2   (p95 が悪化したら終了コード1)
+  python research_benchmark.py --stages startup   (MCPサーバーの import 時間と起動〜tools/list 応答時間)
+
+startup ステージは initialize 前に重いモジュール (STARTUP_SERVERS) が読み込まれていたら
+ベースラインの有無にかかわらず終了コード1にする。
+
+--responses には1行1件で Perplexity の応答 (choices 付き) か {"content": "..."} を書く。
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from research_tracing import percentile
+
+SAMPLE_CONTENT = (
+    "## 概要\n"
+    "これはベンチマーク用のモック応答です。実際のAPIは呼び出していません。\n\n"
+    "## 詳細\n"
+    "- ポイント1: レイテンシとエラー率はコマンドライン引数で調整できます。\n"
+    "- ポイント2: stream=true のリクエストには SSE で分割して返します。\n"
+)
+
+STAGES = ["instant", "cached", "stream", "deep", "session", "analysis", "mcp", "startup"]
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# startup ステージで測る MCP サーバー: 名前 -> (モジュール, 起動引数, initialize までに読み込んではいけないモジュール)
+STARTUP_SERVERS = {
+    "mcp": ("perplexity_mcp_server", ["mcp-server"], ("instant_research_ai", "requests", "httpx", "sqlite3")),
+    "dev": ("mcp_dev_efficiency", [], ("file_analyzer", "ast"))
+}
+STARTUP_MAX_ITERATIONS = 10  # プロセスを起動するので回数を抑える
+
+
+class MockAPIServer:
+    """Perplexity (/chat/completions) と Anthropic (/v1/messages) の応答を返すHTTPサーバー
+
+    latency + 0〜jitter 秒待ってから、error_rate の確率で 503 (Retry-After: 0) を返す。
+    responses を渡すとその本文を順番に繰り返し返す (録画した応答の再生)。
+    """
+
+    def __init__(self, latency=0.05, jitter=0.0, error_rate=0.0, responses=None, chunk_size=40, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.responses = responses or [SAMPLE_CONTENT]
+        self.chunk_size = chunk_size
+        self.random = random.Random(seed)
+        self.stats = {"requests": 0, "errors": 0, "streams": 0}
+        self._lock = threading.Lock()
+        self._next = 0
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @staticmethod
+    def load_responses(path):
+        """録画した応答 (JSONL) から本文だけを取り出す"""
+        contents = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if "choices" in record:
+                    contents.append(record["choices"][0]["message"]["content"])
+                else:
+                    contents.append(record["content"])
+        return contents
+
+    def _plan(self):
+        """1リクエスト分の (待ち時間, エラーにするか, 本文)"""
+        with self._lock:
+            self.stats["requests"] += 1
+            delay = self.latency + self.random.uniform(0, self.jitter)
+            failed = self.random.random() < self.error_rate
+            if failed:
+                self.stats["errors"] += 1
+            content = self.responses[self._next % len(self.responses)]
+            self._next += 1
+        return delay, failed, content
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-Alive (実APIと同じく接続を使い回す)
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                delay, failed, content = server._plan()
+                time.sleep(delay)
+
+                if failed:
+                    self._send_json(503, {"error": "mock failure"}, {"Retry-After": "0"})
+                elif self.path.endswith("/chat/completions"):
+                    if body.get("stream"):
+                        self._send_stream(body, content)
+                    else:
+                        self._send_json(200, server._perplexity_body(body, content))
+                elif self.path.endswith("/v1/messages"):
+                    self._send_json(200, server._anthropic_body(body, content))
+                else:
+                    self._send_json(404, {"error": f"unknown path {self.path}"})
+
+            def _send_json(self, status, payload, headers=None):
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_stream(self, body, content):
+                with server._lock:
+                    server.stats["streams"] += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                pieces = [content[i:i + server.chunk_size] for i in range(0, len(content), server.chunk_size)]
+                for i, piece in enumerate(pieces):
+                    chunk = {"choices": [{"delta": {"content": piece}}]}
+                    if i == len(pieces) - 1:
+                        chunk["usage"] = server._perplexity_body(body, content)["usage"]
+                    self._write_chunk(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n")
+                self._write_chunk("data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _write_chunk(self, text):
+                data = text.encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+    @staticmethod
+    def _prompt_tokens(body):
+        text = "".join(str(m.get("content", "")) for m in body.get("messages", []))
+        return len(text) // 2 + len(str(body.get("system", ""))) // 2
+
+    def _perplexity_body(self, body, content):
+        prompt_tokens = self._prompt_tokens(body)
+        completion_tokens = len(content) // 2
+        return {
+            "model": body.get("model"),
+            "choices": [{"message": {"role": "assistant", "content": content}}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+
+    def _anthropic_body(self, body, content):
+        return {
+            "model": body.get("model"),
+            "content": [{"type": "text", "text": content}],
+            "usage": {"input_tokens": self._prompt_tokens(body), "output_tokens": len(content) // 2}
+        }
+
+
+class StageProfiler:
+    """ステージごとの所要時間と、その内訳となる DB / HTTP 時間を集計する
+
+    ResearchStorage と HTTPClient のメソッドを計測中だけ計時版に差し替える。
+    並列実行中の呼び出しも、現在実行中のステージに計上する。
+    """
+
+    def __init__(self):
+        self.stage = None
+        self.samples = {}   # stage -> [秒]
+        self.db_time = {}   # stage -> 秒
+        self.db_calls = {}  # stage -> 回
+        self.http_time = {}
+        self.failures = {}
+        self.walls = {}     # stage -> 全体の秒数 (スループット計算用)
+        self._lock = threading.Lock()
+        self._restore = []
+
+    def _add(self, table, amount):
+        with self._lock:
+            table[self.stage] = table.get(self.stage, 0) + amount
+
+    def _timed(self, owner, name, kind):
+        original = getattr(owner, name)
+        profiler = self
+
+        if name == "transaction":
+            @contextlib.contextmanager
+            def wrapper(self, *args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    with original(self, *args, **kwargs) as cursor:
+                        yield cursor
+                finally:
+                    profiler._record(kind, time.perf_counter() - started)
+        else:
+            def wrapper(self, *args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return original(self, *args, **kwargs)
+                finally:
+                    profiler._record(kind, time.perf_counter() - started)
+
+        setattr(owner, name, wrapper)
+        self._restore.append((owner, name, original))
+
+    def _record(self, kind, elapsed):
+        if kind == "db":
+            self._add(self.db_time, elapsed)
+            self._add(self.db_calls, 1)
+        else:
+            self._add(self.http_time, elapsed)
+
+    def __enter__(self):
+        from http_client import HTTPClient
+        from research_storage import ResearchStorage
+
+        # execute() は transaction() を使うので二重に数えないよう対象から外す
+        for name in ("transaction", "fetchone", "fetchall", "flush"):
+            self._timed(ResearchStorage, name, "db")
+        self._timed(HTTPClient, "_send", "http")
+        return self
+
+    def __exit__(self, *exc):
+        for owner, name, original in reversed(self._restore):
+            setattr(owner, name, original)
+        self._restore = []
+
+    def begin(self, stage):
+        """以降の DB / HTTP 時間を stage に計上する"""
+        self.stage = stage
+        self.samples.setdefault(stage, [])
+
+    def record(self, stage, elapsed, ok=True):
+        with self._lock:
+            self.samples[stage].append(elapsed)
+            if not ok:
+                self.failures[stage] = self.failures.get(stage, 0) + 1
+
+    def run(self, stage, operations, concurrency=1):
+        """operations (引数なし関数のリスト) を実行して1件ごとの所要時間を記録 -> 全体の秒数"""
+        self.begin(stage)
+
+        def timed(operation):
+            started = time.perf_counter()
+            try:
+                ok = operation()
+            except Exception:
+                ok = False
+            self.record(stage, time.perf_counter() - started, bool(ok))
+
+        started = time.perf_counter()
+        if concurrency > 1:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                list(executor.map(timed, operations))
+        else:
+            for operation in operations:
+                timed(operation)
+        self.walls[stage] = time.perf_counter() - started
+        return self.walls[stage]
+
+    def report(self):
+        """ステージごとの集計 -> {stage: {...}}"""
+        results = {}
+        for stage, samples in self.samples.items():
+            if not samples:
+                continue
+            wall = self.walls.get(stage, 0)
+            count = len(samples)
+            results[stage] = {
+                "count": count,
+                "failures": self.failures.get(stage, 0),
+                "p50_ms": percentile(sorted(samples), 50) * 1000,
+                "p95_ms": percentile(sorted(samples), 95) * 1000,
+                "mean_ms": statistics.mean(samples) * 1000,
+                "rps": count / wall if wall else 0.0,
+                "db_ms_per_op": self.db_time.get(stage, 0) * 1000 / count,
+                "db_calls_per_op": self.db_calls.get(stage, 0) / count,
+                "http_ms_per_op": self.http_time.get(stage, 0) * 1000 / count
+            }
+        return results
+
+
+def _unthrottle(research_ai):
+    """ベンチマーク用の一時DBでは無料枠の上限とレート制限を外す"""
+    from usage_ledger import TokenBucket
+
+    ledger = research_ai.ledger
+    ledger.DAILY_REQUEST_LIMIT = ledger.MONTHLY_REQUEST_LIMIT = 10 ** 9
+    ledger.MONTHLY_TOKEN_LIMIT = 10 ** 12
+    ledger.bucket = TokenBucket(10 ** 9, 10 ** 9)
+
+
+def run_benchmark(stages=STAGES, iterations=20, concurrency=1, latency=0.05, jitter=0.0,
+                  error_rate=0.0, responses=None, seed=0):
+    """モックサーバーに向けて各ステージを実行し、集計結果を返す"""
+    with MockAPIServer(latency, jitter, error_rate, responses, seed=seed) as server, \
+            tempfile.TemporaryDirectory(prefix="research_bench_") as workdir:
+        previous_cwd = os.getcwd()
+        previous_env = dict(os.environ)
+        os.environ.update({
+            "PERPLEXITY_API_KEY": "benchmark",
+            "ANTHROPIC_API_KEY": "benchmark",
+            "PERPLEXITY_BASE_URL": server.base_url,
+            "ANTHROPIC_BASE_URL": server.base_url,
+            "OBSIDIAN_VAULT_PATH": os.path.join(workdir, "vault"),
+            "NO_PROXY": "127.0.0.1,localhost"
+        })
+        os.makedirs(os.path.join(workdir, "vault"), exist_ok=True)
+        # DB・キャッシュ・同期ファイルはすべて一時ディレクトリに作る
+        os.chdir(workdir)
+        startup_imports = None
+
+        try:
+            with contextlib.redirect_stdout(io.StringIO()), StageProfiler() as profiler:
+                from claude_api_direct import ClaudeAPIGitHubActions
+
+                claude = ClaudeAPIGitHubActions()
+                research_ai = claude.research_ai
+                _unthrottle(research_ai)
+
+                def ops(fn, label):
+                    return [lambda i=i: fn(f"benchmark {label} {i}") for i in range(iterations)]
+
+                for stage in stages:
+                    if stage == "instant":
+                        profiler.run(stage, ops(research_ai.instant_search, "instant"), concurrency)
+                    elif stage == "cached":
+                        # instant で取得済みのクエリを再度引く (キャッシュヒットの経路)
+                        profiler.run(stage, ops(research_ai.instant_search, "instant"), concurrency)
+                    elif stage == "stream":
+                        # 受信した本文がモックの応答と一致しなければ失敗 (復号の誤りを見逃さない)
+                        profiler.run(stage, ops(
+                            lambda q: (research_ai.instant_search(q, stream=True) or {}).get("content")
+                            in server.responses,
+                            "stream"
+                        ), concurrency)
+                    elif stage == "deep":
+                        profiler.run(stage, ops(research_ai.deep_research, "deep"), concurrency)
+                    elif stage == "session":
+                        profiler.run(stage, ops(research_ai.research_session, "session"), concurrency)
+                    elif stage == "analysis":
+                        profiler.run(stage, ops(
+                            lambda q: "error" not in claude.claude_research_analysis(SAMPLE_CONTENT * 20, q),
+                            "analysis"
+                        ), concurrency)
+                    elif stage == "mcp":
+                        _run_mcp(profiler, iterations, concurrency)
+                    elif stage == "startup":
+                        startup_imports = _run_startup(profiler, min(iterations, STARTUP_MAX_ITERATIONS), workdir)
+                    else:
+                        raise ValueError(f"unknown stage: {stage}")
+
+                research_ai.storage.flush()
+                research_ai.vault_writer.flush()
+        finally:
+            os.chdir(previous_cwd)
+            os.environ.clear()
+            os.environ.update(previous_env)
+
+        results = profiler.report()
+        results["_server"] = dict(server.stats)
+        if startup_imports is not None:
+            results["_startup_imports"] = startup_imports
+        return results
+
+
+def _run_mcp(profiler, iterations, concurrency):
+    """PerplexityMCPServer に tools/call を concurrency 件ずつ並行して送り、応答時間を記録する"""
+    from perplexity_mcp_server import PerplexityMCPServer
+
+    server = PerplexityMCPServer(max_workers=max(concurrency, 1))
+    _unthrottle(server.research_ai)
+    server.protocol_out = io.StringIO()
+
+    async def call(i, semaphore):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await server.handle_request({
+                    "jsonrpc": "2.0",
+                    "id": i,
+                    "method": "tools/call",
+                    "params": {"name": "perplexity_instant_search", "arguments": {"query": f"benchmark mcp {i}"}}
+                })
+                ok = True
+            except Exception:
+                ok = False
+            profiler.record("mcp", time.perf_counter() - started, ok)
+
+    async def run_all():
+        semaphore = asyncio.Semaphore(max(concurrency, 1))
+        await asyncio.gather(*(call(i, semaphore) for i in range(iterations)))
+
+    profiler.begin("mcp")
+    started = time.perf_counter()
+    asyncio.run(run_all())
+    profiler.walls["mcp"] = time.perf_counter() - started
+    server.executor.shutdown(wait=True)
+
+
+def _import_profile(module, env):
+    """新しいインタプリタで module を import -> (累積 import 秒数, 読み込まれたモジュール名の集合)
+
+    module=None なら何も import しない (site / .pth フックが読み込む分だけを調べる)。
+    """
+    code = f"import {module}" if module else "pass"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            capture_output=True, text=True, env=env, cwd=HERE)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed")
+
+    elapsed = None
+    modules = set()
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        name = fields[2].strip()
+        modules.add(name)
+        if name == module:
+            elapsed = int(fields[1]) / 1e6
+    return elapsed, modules
+
+
+def _run_startup(profiler, iterations, workdir):
+    """各 MCP サーバーの import 時間 (import_*) と、起動から initialize + tools/list 応答まで (init_*) を測る
+
+    戻り値は initialize 前に読み込まれていた重いモジュール {サーバー名: [...]} (空なら問題なし)。
+    """
+    from mcp_client_pool import MCPServerSession
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [HERE, env.get("PYTHONPATH")]))
+    leaked = {}
+    # site / .pth フック (conda の certifi など) がサーバーのコードより前に読み込むモジュールは除く
+    _, preloaded = _import_profile(None, env)
+
+    for name, (module, args, heavy) in STARTUP_SERVERS.items():
+        stage = f"import_{name}"
+        profiler.begin(stage)
+        started = time.perf_counter()
+        for _ in range(iterations):
+            try:
+                elapsed, modules = _import_profile(module, env)
+            except RuntimeError:
+                profiler.record(stage, 0.0, ok=False)
+                continue
+            found = sorted(set(heavy) & (modules - preloaded))
+            if found:
+                leaked[name] = found
+            profiler.record(stage, elapsed or 0.0, ok=not found)
+        profiler.walls[stage] = time.perf_counter() - started
+
+        stage = f"init_{name}"
+        command = [sys.executable, os.path.join(HERE, module + ".py")] + args
+        profiler.begin(stage)
+        started = time.perf_counter()
+        for _ in range(iterations):
+            began = time.perf_counter()
+            session = None
+            try:
+                session = MCPServerSession(command, cwd=workdir).start()
+                session.request("tools/list", timeout=30)
+                ok = True
+            except Exception:
+                ok = False
+            finally:
+                elapsed = time.perf_counter() - began
+                if session is not None:
+                    session.close()
+            profiler.record(stage, elapsed, ok)
+        profiler.walls[stage] = time.perf_counter() - started
+
+    return leaked
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """p95 が baseline から tolerance (割合) を超えて悪化したステージの一覧"""
+    regressions = []
+    for stage, current in results.items():
+        if stage.startswith("_") or stage not in baseline:
+            continue
+        before = baseline[stage]["p95_ms"]
+        if before and current["p95_ms"] > before * (1 + tolerance):
+            regressions.append((stage, before, current["p95_ms"]))
+    return regressions
+
+
+def format_results(results):
+    lines = [
+        f"{'stage':<10}{'n':>5}{'fail':>6}{'p50 ms':>10}{'p95 ms':>10}{'req/s':>9}"
+        f"{'DB ms/op':>10}{'DB calls':>10}{'HTTP ms/op':>12}",
+        "-" * 82
+    ]
+    for stage, r in results.items():
+        if stage.startswith("_"):
+            continue
+        lines.append(
+            f"{stage:<10}{r['count']:>5}{r['failures']:>6}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['rps']:>9.1f}"
+            f"{r['db_ms_per_op']:>10.2f}{r['db_calls_per_op']:>10.1f}{r['http_ms_per_op']:>12.1f}"
+        )
+    server = results.get("_server", {})
+    lines.append("")
+    lines.append(f"🖥️ モックサーバー: {server.get('requests', 0)} リクエスト "
+                 f"(エラー注入 {server.get('errors', 0)}, ストリーム {server.get('streams', 0)})")
+    for name, modules in results.get("_startup_imports", {}).items():
+        lines.append(f"⚠️ {name}: initialize 前に重いモジュールを import しています: {', '.join(modules)}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="リサーチ系の性能ベンチマーク (モックAPIサーバー使用)")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"実行するステージ ({','.join(STAGES)})")
+    parser.add_argument("--iterations", type=int, default=20, help="ステージごとの実行回数")
+    parser.add_argument("--concurrency", type=int, default=1, help="同時実行数")
+    parser.add_argument("--latency", type=float, default=0.05, help="モックAPIの応答遅延 [秒]")
+    parser.add_argument("--jitter", type=float, default=0.0, help="応答遅延に加える揺らぎの上限 [秒]")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="503 を返す確率 (0〜1)")
+    parser.add_argument("--responses", help="再生する録画済み応答 (JSONL)")
+    parser.add_argument("--seed", type=int, default=0, help="遅延・エラー注入の乱数シード")
+    parser.add_argument("--json", help="結果をJSONで保存するパス")
+    parser.add_argument("--baseline", help="比較するベースライン結果 (JSON)")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="p95 の許容悪化率")
+    args = parser.parse_args()
+
+    responses = MockAPIServer.load_responses(args.responses) if args.responses else None
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+
+    print(f"⏱️ ベンチマーク実行中: {', '.join(stages)} × {args.iterations} "
+          f"(遅延 {args.latency * 1000:.0f}ms, エラー率 {args.error_rate:.0%}, 同時 {args.concurrency})")
+    results = run_benchmark(stages, args.iterations, args.concurrency, args.latency, args.jitter,
+                            args.error_rate, responses, args.seed)
+    print(format_results(results))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"💾 結果を保存: {args.json}")
+
+    if results.get("_startup_imports"):
+        print("❌ MCPサーバーの起動時 import が増えています (遅延 import に戻してください)")
+        sys.exit(1)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        for stage, before, after in regressions:
+            print(f"❌ {stage}: p95 {before:.1f}ms → {after:.1f}ms")
+        if regressions:
+            sys.exit(1)
+        print("✅ ベースラインからの悪化なし")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Research Cache - Perplexity応答キャッシュ
+=========================================
+正規化クエリ + モデル + search_recency_filter をキーに応答を永続化する。
+MCPサーバーとCLIで同じDBファイルを共有するため、どちらから呼んでも再利用される。
+"""
+
+import hashlib
+import json
+import os
+import re
+import time
+import unicodedata
+
+
+class ResearchCache:
+    """Perplexity応答キャッシュ (SQLite永続化 / TTL / LRU / 近似一致)"""
+
+    # search_recency_filter ごとのTTL (秒) - 鮮度要求が高いほど短くする
+    TTL_BY_RECENCY = {
+        "hour": 15 * 60,
+        "day": 3 * 60 * 60,
+        "week": 24 * 60 * 60,
+        "month": 3 * 24 * 60 * 60,
+        "year": 7 * 24 * 60 * 60,
+    }
+    DEFAULT_TTL = 24 * 60 * 60
+
+    def __init__(self, storage, max_entries=500, near_duplicate=False, similarity_threshold=0.85):
+        self.storage = storage  # research_storage.ResearchStorage
+        self.max_entries = max_entries
+        self.near_duplicate = near_duplicate
+        self.similarity_threshold = similarity_threshold
+
+        self._init_table()
+
+    def _init_table(self):
+        """キャッシュテーブル初期化"""
+        try:
+            with self.storage.transaction() as cursor:
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS response_cache (
+                        cache_key TEXT PRIMARY KEY,
+                        normalized_query TEXT NOT NULL,
+                        model TEXT NOT NULL,
+                        recency_filter TEXT,
+                        prompt_hash TEXT NOT NULL DEFAULT '',
+                        response TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        expires_at REAL NOT NULL,
+                        last_access REAL NOT NULL,
+                        hit_count INTEGER DEFAULT 0
+                    )
+                """)
+                cursor.execute("PRAGMA table_info(response_cache)")
+                if "prompt_hash" not in [row[1] for row in cursor.fetchall()]:
+                    cursor.execute("ALTER TABLE response_cache ADD COLUMN prompt_hash TEXT NOT NULL DEFAULT ''")
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_response_cache_lookup
+                    ON response_cache (model, recency_filter, expires_at)
+                """)
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_response_cache_lru
+                    ON response_cache (last_access)
+                """)
+                # 実行中リクエストのリース (別プロセスの同一リクエストを重複させない)
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS inflight_leases (
+                        cache_key TEXT PRIMARY KEY,
+                        owner TEXT NOT NULL,
+                        expires_at REAL NOT NULL
+                    )
+                """)
+
+        except Exception as e:
+            print(f"⚠️ キャッシュ初期化エラー: {e}")
+
+    @staticmethod
+    def normalize_query(query):
+        """クエリ正規化 (全角/半角・大小文字・空白・末尾の句読点を吸収)"""
+        text = unicodedata.normalize("NFKC", query).lower()
+        text = re.sub(r"\s+", " ", text).strip()
+        return text.rstrip("?？!！。.、, ")
+
+    @staticmethod
+    def prompt_hash(system_prompt):
+        """システムプロンプトの識別子 (同じクエリでも指示が違えば別の応答として扱う)"""
+        if not system_prompt:
+            return ""
+        return hashlib.sha256(str(system_prompt).encode("utf-8")).hexdigest()[:16]
+
+    def make_key(self, query, model, recency_filter, system_prompt=None):
+        """キャッシュキー生成"""
+        raw = "\x1f".join([self.normalize_query(query), model, recency_filter or "",
+                           self.prompt_hash(system_prompt)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def ttl_for(self, recency_filter):
+        """recency_filter に対応するTTL"""
+        return self.TTL_BY_RECENCY.get(recency_filter, self.DEFAULT_TTL)
+
+    def get(self, query, model, recency_filter="month", system_prompt=None):
+        """キャッシュ取得 (完全一致 → 近似一致の順)。見つからなければ None"""
+        try:
+            now = time.time()
+            cache_key = self.make_key(query, model, recency_filter, system_prompt)
+            row = self.storage.fetchone("""
+                SELECT response FROM response_cache
+                WHERE cache_key = ? AND expires_at > ?
+            """, (cache_key, now))
+
+            if not row and self.near_duplicate:
+                cache_key, row = self._find_near_duplicate(query, model, recency_filter, system_prompt, now)
+
+            if not row:
+                return None
+
+            # LRU情報の更新は応答を待たせないようバッチで書く
+            self.storage.enqueue("""
+                UPDATE response_cache
+                SET last_access = ?, hit_count = hit_count + 1
+                WHERE cache_key = ?
+            """, (now, cache_key))
+
+            result = json.loads(row[0])
+            result["cached"] = True
+            return result
+
+        except Exception as e:
+            print(f"⚠️ キャッシュ取得エラー: {e}")
+            return None
+
+    def put(self, query, model, recency_filter, result, system_prompt=None):
+        """キャッシュ保存 (上限超過分はLRUで削除)"""
+        try:
+            now = time.time()
+            payload = {k: v for k, v in result.items() if k != "cached"}
+
+            with self.storage.transaction() as cursor:
+                cursor.execute("""
+                    INSERT OR REPLACE INTO response_cache
+                    (cache_key, normalized_query, model, recency_filter, prompt_hash, response,
+                     created_at, expires_at, last_access, hit_count)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
+                """, (
+                    self.make_key(query, model, recency_filter, system_prompt),
+                    self.normalize_query(query),
+                    model,
+                    recency_filter or "",
+                    self.prompt_hash(system_prompt),
+                    json.dumps(payload, ensure_ascii=False),
+                    now,
+                    now + self.ttl_for(recency_filter),
+                    now
+                ))
+                self._evict(cursor, now)
+
+        except Exception as e:
+            print(f"⚠️ キャッシュ保存エラー: {e}")
+
+    def acquire_lease(self, cache_key, ttl):
+        """リース取得。既に他プロセスが有効なリースを持っていれば False"""
+        try:
+            now = time.time()
+            with self.storage.transaction() as cursor:
+                cursor.execute("""
+                    DELETE FROM inflight_leases WHERE cache_key = ? AND expires_at <= ?
+                """, (cache_key, now))
+                cursor.execute("""
+                    INSERT OR IGNORE INTO inflight_leases (cache_key, owner, expires_at)
+                    VALUES (?, ?, ?)
+                """, (cache_key, self._owner(), now + ttl))
+                return cursor.rowcount == 1
+        except Exception as e:
+            # リースが使えなくても検索自体は続行する
+            print(f"⚠️ リース取得エラー: {e}")
+            return True
+
+    def release_lease(self, cache_key):
+        """自プロセスが持つリースを解放"""
+        try:
+            self.storage.execute("""
+                DELETE FROM inflight_leases WHERE cache_key = ? AND owner = ?
+            """, (cache_key, self._owner()))
+        except Exception as e:
+            print(f"⚠️ リース解放エラー: {e}")
+
+    def lease_active(self, cache_key):
+        """他の誰かが実行中か"""
+        try:
+            row = self.storage.fetchone("""
+                SELECT 1 FROM inflight_leases WHERE cache_key = ? AND expires_at > ?
+            """, (cache_key, time.time()))
+            return row is not None
+        except Exception as e:
+            print(f"⚠️ リース確認エラー: {e}")
+            return False
+
+    @staticmethod
+    def _owner():
+        return f"{os.uname().nodename if hasattr(os, 'uname') else ''}:{os.getpid()}"
+
+    def _evict(self, cursor, now):
+        """期限切れ削除 + LRUで max_entries 件に制限"""
+        cursor.execute("DELETE FROM response_cache WHERE expires_at <= ?", (now,))
+        cursor.execute("""
+            DELETE FROM response_cache WHERE cache_key IN (
+                SELECT cache_key FROM response_cache
+                ORDER BY last_access DESC
+                LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entries,))
+
+    def _find_near_duplicate(self, query, model, recency_filter, system_prompt, now, candidates=200):
+        """同一モデル・同一recency・同一システムプロンプトの直近エントリから近似クエリを探す"""
+        target = self._shingles(self.normalize_query(query))
+        if not target:
+            return None, None
+
+        rows = self.storage.fetchall("""
+            SELECT cache_key, normalized_query, response FROM response_cache
+            WHERE model = ? AND recency_filter = ? AND prompt_hash = ? AND expires_at > ?
+            ORDER BY last_access DESC
+            LIMIT ?
+        """, (model, recency_filter or "", self.prompt_hash(system_prompt), now, candidates))
+
+        best_key, best_row, best_score = None, None, 0.0
+        for cache_key, normalized_query, response in rows:
+            score = self._jaccard(target, self._shingles(normalized_query))
+            if score > best_score:
+                best_key, best_row, best_score = cache_key, (response,), score
+
+        if best_score >= self.similarity_threshold:
+            return best_key, best_row
+        return None, None
+
+    @staticmethod
+    def _shingles(text):
+        """文字バイグラム集合 (日本語のように空白で区切らない文にも対応)"""
+        compact = text.replace(" ", "")
+        if len(compact) < 2:
+            return {compact} if compact else set()
+        return {compact[i:i + 2] for i in range(len(compact) - 1)}
+
+    @staticmethod
+    def _jaccard(a, b):
+        if not a or not b:
+            return 0.0
+        return len(a & b) / len(a | b)
+
+    def stats(self):
+        """キャッシュ統計"""
+        try:
+            entries, hits, live = self.storage.fetchone("""
+                SELECT COUNT(*), COALESCE(SUM(hit_count), 0),
+                       COALESCE(SUM(expires_at > ?), 0)
+                FROM response_cache
+            """, (time.time(),))
+            return {"entries": entries, "live_entries": live, "hits": hits, "max_entries": self.max_entries}
+        except Exception as e:
+            print(f"⚠️ キャッシュ統計エラー: {e}")
+            return {}
+
+    def clear(self):
+        """キャッシュ全削除"""
+        try:
+            self.storage.execute("DELETE FROM response_cache")
+        except Exception as e:
+            print(f"⚠️ キャッシュ削除エラー: {e}")
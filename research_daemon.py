@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Research Daemon - 瞬間リサーチAIの常駐ワーカー
+============================================
+InstantResearchAI を1つ起動したまま Unix ソケットで CLI コマンドを受け付ける。
+HTTP接続プール・SQLite接続・キャッシュが温まった状態で実行されるため、
+import / DB初期化 / 接続確立のぶん短いクエリが速くなる。
+
+  python3 research_daemon.py start      # バックグラウンドで起動
+  python3 research_daemon.py status
+  python3 research_daemon.py stop
+  python3 research_daemon.py run instant "クエリ"   # デーモンへ転送 (未起動なら同じプロセスで実行)
+
+DBなどはカレントディレクトリ基準の相対パスなので、ソケットはディレクトリごとに分ける。
+このモジュールは標準ライブラリだけで転送できるよう、重い import は実行時まで遅らせる。
+
+プロトコル: 1接続1リクエスト、改行区切りJSON。
+  → {"op": "run", "argv": [...], "cwd": "..."}
+  ← {"out": "..."} (出力のたびに) ... {"exit": 0}
+"""
+
+import contextvars
+import hashlib
+import json
+import os
+import socket
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+IDLE_TIMEOUT = int(os.getenv("RESEARCH_DAEMON_IDLE", "1800"))  # 秒。最後の要求からこれだけ経つと終了
+
+_client_output = contextvars.ContextVar("research_daemon_output", default=None)
+
+
+def socket_path(cwd=None):
+    """カレントディレクトリごとのソケットパス (Unix ソケットのパス長制限のため一時ディレクトリに置く)"""
+    digest = hashlib.sha1(os.path.abspath(cwd or os.getcwd()).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f"research_daemon_{os.getuid()}_{digest}.sock")
+
+
+def _request(message, timeout=5.0):
+    """デーモンに1リクエスト送り、応答メッセージを順に返すジェネレータ (未起動なら OSError)"""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(socket_path())
+        sock.settimeout(None)
+        sock.sendall(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+        with sock.makefile("r", encoding="utf-8") as reader:
+            for line in reader:
+                yield json.loads(line)
+    finally:
+        sock.close()
+
+
+def forward(argv):
+    """CLI引数をデーモンへ転送して終了コードを返す。デーモンが使えなければ None"""
+    if os.getenv("RESEARCH_DAEMON", "1") == "0" or not os.path.exists(socket_path()):
+        return None
+
+    started_output = False
+    try:
+        for message in _request({"op": "run", "argv": argv, "cwd": os.getcwd()}):
+            if "out" in message:
+                started_output = True
+                sys.stdout.write(message["out"])
+                sys.stdout.flush()
+            elif "exit" in message:
+                return message["exit"]
+            elif "error" in message:
+                # 別ディレクトリ用のデーモンなど: 手元で実行する
+                return None
+    except (OSError, ValueError):
+        if not started_output:
+            return None
+        print("\n⚠️ デーモンとの接続が切れました")
+        return 1
+
+    return 1 if started_output else None
+
+
+class _OutputRouter:
+    """sys.stdout の代わり。要求を処理中のコンテキストからの出力はクライアントへ送る"""
+
+    def __init__(self, original):
+        self.original = original
+
+    def write(self, text):
+        send = _client_output.get()
+        if send is None:
+            return self.original.write(text)
+        send(text)
+        return len(text)
+
+    def flush(self):
+        if _client_output.get() is None:
+            self.original.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.original, name)
+
+
+class ResearchDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """起動済みの InstantResearchAI で CLI コマンドを実行するサーバー"""
+
+    daemon_threads = True
+
+    def __init__(self, path):
+        from instant_research_ai import InstantResearchAI
+
+        self.path = path
+        self.cwd = os.getcwd()
+        self.started = time.time()
+        self.last_request = time.time()
+        self.served = 0
+        self.ai = InstantResearchAI()
+
+        if os.path.exists(path):
+            os.unlink(path)
+        super().__init__(path, _Handler)
+        os.chmod(path, 0o600)
+
+    def serve(self):
+        sys.stdout = _OutputRouter(sys.stdout)
+        threading.Thread(target=self._idle_watch, daemon=True).start()
+        print(f"🟢 リサーチデーモン起動: pid={os.getpid()} socket={self.path}", flush=True)
+        try:
+            self.serve_forever()
+        finally:
+            self.server_close()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            print("🔴 リサーチデーモン終了", flush=True)
+
+    def _idle_watch(self):
+        while True:
+            time.sleep(min(60, max(IDLE_TIMEOUT, 1)))
+            if IDLE_TIMEOUT and time.time() - self.last_request > IDLE_TIMEOUT:
+                print(f"💤 {IDLE_TIMEOUT}秒間要求がないため終了します", flush=True)
+                self.shutdown()
+                return
+
+    def run_command(self, argv, send):
+        """CLIコマンドを実行し、出力を send(text) で返す -> 終了コード"""
+        from instant_research_ai import run_cli
+
+        self.served += 1
+        self.last_request = time.time()
+        token = _client_output.set(send)
+        try:
+            run_cli(self.ai, ["instant_research_ai.py"] + list(argv))
+            return 0
+        except SystemExit as e:
+            return e.code if isinstance(e.code, int) else 1
+        except Exception as e:
+            send(f"❌ デーモン内でエラー: {e}\n")
+            return 1
+        finally:
+            # 非同期のObsidian保存・履歴のバッチ書き込みも CLI 実行時と同じく終えてから返す
+            self.ai.vault_writer.flush()
+            self.ai.storage.flush()
+            _client_output.reset(token)
+            self.last_request = time.time()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def _send(self, message):
+        self.wfile.write(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+    def handle(self):
+        server = self.server
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError:
+            return
+
+        op = request.get("op")
+        if op == "ping":
+            self._send({"pid": os.getpid(), "cwd": server.cwd, "uptime": time.time() - server.started,
+                        "served": server.served})
+        elif op == "stop":
+            self._send({"exit": 0})
+            threading.Thread(target=server.shutdown, daemon=True).start()
+        elif op == "run":
+            if os.path.abspath(request.get("cwd", "")) != server.cwd:
+                self._send({"error": "cwd mismatch"})
+                return
+
+            def send(text):
+                # クライアントが切断しても処理は最後まで続ける (結果はキャッシュ・履歴に残る)
+                try:
+                    self._send({"out": text})
+                except OSError:
+                    pass
+
+            code = server.run_command(request.get("argv", []), send)
+            try:
+                self._send({"exit": code})
+            except OSError:
+                pass
+        else:
+            self._send({"error": f"unknown op: {op}"})
+
+
+def status():
+    """稼働中なら ping の応答、なければ None"""
+    try:
+        for message in _request({"op": "ping"}, timeout=2.0):
+            return message
+    except (OSError, ValueError):
+        return None
+
+
+def start():
+    """バックグラウンドで起動して、応答するまで待つ"""
+    info = status()
+    if info:
+        print(f"✅ 起動済み: pid={info['pid']}")
+        return True
+
+    log_path = socket_path()[:-len(".sock")] + ".log"
+    with open(log_path, "a", encoding="utf-8") as log:
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "serve"],
+            stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+            start_new_session=True
+        )
+
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        info = status()
+        if info:
+            print(f"🟢 リサーチデーモン起動: pid={info['pid']} (ログ: {log_path})")
+            return True
+        time.sleep(0.1)
+
+    print(f"❌ デーモンが起動しませんでした。ログを確認してください: {log_path}")
+    return False
+
+
+def stop():
+    try:
+        for _ in _request({"op": "stop"}, timeout=2.0):
+            break
+        print("🛑 リサーチデーモンを停止しました")
+    except (OSError, ValueError):
+        print("ℹ️ デーモンは起動していません")
+        path = socket_path()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+
+    if command == "serve":
+        ResearchDaemon(socket_path()).serve()
+    elif command == "start":
+        sys.exit(0 if start() else 1)
+    elif command == "stop":
+        stop()
+    elif command == "status":
+        info = status()
+        if info:
+            print(f"🟢 稼働中: pid={info['pid']} 稼働 {info['uptime']:.0f}秒 処理 {info['served']}件")
+            print(f"   ディレクトリ: {info['cwd']}")
+        else:
+            print("⚪ 停止中")
+    elif command == "run":
+        exit_code = forward(sys.argv[2:])
+        if exit_code is None:
+            # デーモンなし: 同じプロセスで実行
+            from instant_research_ai import InstantResearchAI, run_cli
+            run_cli(InstantResearchAI(), ["instant_research_ai.py"] + sys.argv[2:])
+            exit_code = 0
+        sys.exit(exit_code)
+    else:
+        print("使用方法: python3 research_daemon.py start|stop|status|run <instant_research_ai のコマンド>")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Research Index - リサーチ履歴の全文検索インデックス
+==================================================
+全文は zlib 圧縮して research_documents に保存し、FTS5 (contentless) で索引だけを持つ。
+過去の調査をローカルで引き直せるようにして、同じ内容への有料API呼び出しを減らす。
+"""
+
+import sqlite3
+import zlib
+
+
+class ResearchIndex:
+    """FTS5 全文検索 (日本語対応のため trigram トークナイザを優先)"""
+
+    MIN_TRIGRAM_TERM = 3
+
+    def __init__(self, storage):
+        self.storage = storage  # research_storage.ResearchStorage
+        self.tokenizer = None
+
+        self._init_tables()
+
+    def _init_tables(self):
+        """文書テーブル + FTS5索引の作成、既存履歴の初回取り込み"""
+        with self.storage.transaction() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS research_documents (
+                    history_id INTEGER PRIMARY KEY,
+                    content BLOB NOT NULL
+                )
+            """)
+
+            cursor.execute("SELECT sql FROM sqlite_master WHERE name = 'research_fts'")
+            existing = cursor.fetchone()
+            if existing:
+                self.tokenizer = "trigram" if "trigram" in existing[0] else "unicode61"
+            else:
+                self.tokenizer = self._create_fts(cursor)
+
+        self._backfill()
+
+    @staticmethod
+    def _create_fts(cursor):
+        # trigram は SQLite 3.34+。使えない環境では unicode61 で代替する
+        for tokenizer in ("trigram", "unicode61"):
+            try:
+                cursor.execute(f"""
+                    CREATE VIRTUAL TABLE research_fts USING fts5(
+                        query, content, content='', tokenize='{tokenizer}'
+                    )
+                """)
+                return tokenizer
+            except sqlite3.OperationalError:
+                continue
+        raise sqlite3.OperationalError("FTS5 is not available")
+
+    def _backfill(self):
+        """文書未登録の履歴 (要約のみ) を索引に取り込む"""
+        rows = self.storage.fetchall("""
+            SELECT h.id, h.query, COALESCE(h.result_summary, '')
+            FROM research_history h
+            LEFT JOIN research_documents d ON d.history_id = h.id
+            WHERE d.history_id IS NULL
+        """)
+        if not rows:
+            return
+
+        with self.storage.transaction() as cursor:
+            for history_id, query, summary in rows:
+                cursor.execute("""
+                    INSERT INTO research_documents (history_id, content) VALUES (?, ?)
+                """, (history_id, self.compress(summary)))
+                cursor.execute("""
+                    INSERT INTO research_fts (rowid, query, content) VALUES (?, ?, ?)
+                """, (history_id, query, summary))
+
+    @staticmethod
+    def compress(text):
+        return zlib.compress(text.encode("utf-8"), 6)
+
+    @staticmethod
+    def decompress(blob):
+        return zlib.decompress(blob).decode("utf-8") if blob else ""
+
+    def document_statements(self, query, content):
+        """直前の research_history INSERT に続けて実行する文書登録SQL
+
+        last_insert_rowid() で履歴IDを受け渡すため、履歴INSERTと同じバッチで
+        順番どおりに実行すること (ResearchStorage.enqueue_many)。
+        """
+        return [
+            ("""
+                INSERT INTO research_documents (history_id, content)
+                VALUES (last_insert_rowid(), ?)
+            """, (self.compress(content),)),
+            ("""
+                INSERT INTO research_fts (rowid, query, content)
+                VALUES (last_insert_rowid(), ?, ?)
+            """, (query, content)),
+        ]
+
+    def search(self, terms, limit=10):
+        """履歴検索 (BM25順)。戻り値: dict のリスト (全文と抜粋を含む)"""
+        terms = [term for term in terms if term.strip()]
+        if not terms:
+            return []
+
+        # trigram は3文字未満の語を索引できないため、短い語は取得後に絞り込む
+        if self.tokenizer == "trigram":
+            indexed = [t for t in terms if len(t) >= self.MIN_TRIGRAM_TERM]
+        else:
+            indexed = terms
+        short = [t for t in terms if t not in indexed]
+
+        if indexed:
+            match = " AND ".join('"{}"'.format(t.replace('"', '""')) for t in indexed)
+            rows = self.storage.fetchall("""
+                SELECT h.id, h.timestamp, h.query, h.type, h.obsidian_path, d.content,
+                       bm25(research_fts) AS score
+                FROM research_fts
+                JOIN research_history h ON h.id = research_fts.rowid
+                LEFT JOIN research_documents d ON d.history_id = h.id
+                WHERE research_fts MATCH ?
+                ORDER BY score
+                LIMIT ?
+            """, (match, limit * 5 if short else limit))
+        else:
+            rows = self.storage.fetchall("""
+                SELECT h.id, h.timestamp, h.query, h.type, h.obsidian_path, d.content, 0.0
+                FROM research_history h
+                LEFT JOIN research_documents d ON d.history_id = h.id
+                ORDER BY h.id DESC
+                LIMIT 500
+            """)
+
+        results = []
+        for history_id, timestamp, query, research_type, obsidian_path, blob, score in rows:
+            content = self.decompress(blob)
+            haystack = f"{query}\n{content}".lower()
+            if any(t.lower() not in haystack for t in short):
+                continue
+
+            results.append({
+                "id": history_id,
+                "timestamp": timestamp,
+                "query": query,
+                "type": research_type,
+                "obsidian_path": obsidian_path,
+                "score": score,
+                "snippet": self._snippet(content, terms),
+                "content": content
+            })
+            if len(results) >= limit:
+                break
+
+        return results
+
+    @staticmethod
+    def _snippet(content, terms, width=80):
+        """最初に一致した語の前後を抜粋"""
+        lowered = content.lower()
+        positions = [lowered.find(t.lower()) for t in terms]
+        positions = [p for p in positions if p >= 0]
+        start = max(min(positions) - width // 2, 0) if positions else 0
+        snippet = content[start:start + width].replace("\n", " ")
+        return ("…" if start > 0 else "") + snippet + ("…" if start + width < len(content) else "")
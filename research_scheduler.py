@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Research Scheduler - 優先度つきリサーチ実行キュー
+===============================================
+Perplexity への実リクエスト (キャッシュミス) を優先度順に実行枠へ通す。
+  interactive (CLI) > mcp (MCPツール) > batch (バッチ・バックグラウンド)
+
+- 実行枠: 同時実行数の上限のうち1枠は interactive 専用に空けておく
+- 無料枠の取り分: 優先度ごとに使ってよい割合を決め、残りを interactive 用に確保する
+- ペース配分: batch は1日の残り取り分を残り時間で割った1時間あたりの件数に抑える
+取り分やペースを超えた場合、待ち時間が max_defer 以内なら待ってから実行し、
+それより長ければ Deferred を送出する (失敗ではなく「後で再実行」の扱い)。
+"""
+
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from calendar import monthrange
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+PRIORITIES = {"interactive": 0, "mcp": 1, "batch": 2}
+
+
+class Deferred(Exception):
+    """取り分・ペースの都合で今は実行しない (retry_at 以降に再実行する)"""
+
+    def __init__(self, priority, retry_at, reason):
+        self.priority = priority
+        self.retry_at = retry_at
+        self.reason = reason
+        super().__init__(
+            f"{priority} リクエストを後回しにしました ({reason}、"
+            f"{datetime.fromtimestamp(retry_at).strftime('%m-%d %H:%M')} 以降に再実行してください)"
+        )
+
+
+class ResearchScheduler:
+    """優先度キュー + 無料枠の取り分 + ペース配分"""
+
+    def __init__(self, ledger, max_concurrent=None, interactive_reserved=1,
+                 quota_share=None, max_defer=None, batch_burst=10):
+        self.ledger = ledger  # usage_ledger.UsageLedger
+        self.max_concurrent = max_concurrent or int(os.getenv("RESEARCH_MAX_CONCURRENT", "8"))
+        self.interactive_reserved = min(interactive_reserved, self.max_concurrent - 1)
+        # 無料枠 (日次/月次リクエスト・月次トークン) のうち各優先度が使ってよい割合
+        self.quota_share = quota_share or {
+            "interactive": 1.0,
+            "mcp": float(os.getenv("RESEARCH_MCP_QUOTA_SHARE", "0.9")),
+            "batch": float(os.getenv("RESEARCH_BATCH_QUOTA_SHARE", "0.7"))
+        }
+        # この秒数以内に実行できるなら待つ (超えるなら Deferred)
+        self.max_defer = max_defer or {
+            "interactive": 0,
+            "mcp": 0,
+            "batch": float(os.getenv("RESEARCH_BATCH_MAX_DEFER", "300"))
+        }
+        self.batch_burst = batch_burst  # ペース配分中でも1時間にこれだけは通す
+
+        self._cond = threading.Condition()
+        self._waiting = []  # (優先度, 到着順)
+        self._sequence = itertools.count()
+        self._running = 0
+        self._paced_hour = None
+        self._paced_count = 0
+
+    @contextmanager
+    def slot(self, priority="interactive"):
+        """with scheduler.slot("batch"): ... で実行枠を確保"""
+        self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def acquire(self, priority="interactive"):
+        """取り分・ペースを確認してから、優先度順に実行枠を確保する
+
+        戻り値はペース配分の枠を使った時間帯 (batch 以外は None)。
+        無料枠を使わずに終わった場合は release(refund=戻り値) で枠を返す。
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"unknown priority: {priority}")
+
+        deadline = time.time() + self.max_defer[priority]
+        while True:
+            wait, reason, paced = self._quota_wait(priority)
+            if not wait:
+                break
+            retry_at = time.time() + wait
+            if retry_at > deadline:
+                raise Deferred(priority, retry_at, reason)
+            print(f"⏸️ {priority} リクエストを {wait:.0f}秒 待機 ({reason})")
+            time.sleep(wait)
+
+        self._admit(priority)
+        return paced
+
+    def release(self, refund=None):
+        """実行枠を返す
+
+        refund に acquire() の戻り値を渡すと、その時間帯のペース配分の枠も返す
+        (台帳に拒否された・API 呼び出しが失敗して予約を取り消した等、無料枠を使わなかった場合)。
+        """
+        with self._cond:
+            self._running -= 1
+            if refund is not None and refund == self._paced_hour and self._paced_count > 0:
+                self._paced_count -= 1
+            self._cond.notify_all()
+
+    # ------------------------------------------------------------------ 実行枠
+
+    def _can_run(self, priority):
+        if priority == "interactive":
+            return self._running < self.max_concurrent
+        return self._running < self.max_concurrent - self.interactive_reserved
+
+    def _admit(self, priority):
+        with self._cond:
+            entry = (PRIORITIES[priority], next(self._sequence))
+            heapq.heappush(self._waiting, entry)
+            # 先頭 (最も優先度が高く、先に来たもの) から順に通す
+            while not (self._waiting[0] == entry and self._can_run(priority)):
+                self._cond.wait()
+            heapq.heappop(self._waiting)
+            self._running += 1
+            self._cond.notify_all()
+
+    # ------------------------------------------------------------------ 無料枠
+
+    def _quota_wait(self, priority):
+        """今実行してよければ (0, None, ペース配分の枠を使った時間帯)、だめなら (待つ秒数, 理由, None)"""
+        share = self.quota_share[priority]
+        if share >= 1:
+            # interactive は台帳の上限判定 (reserve) だけに任せる
+            return 0, None, None
+
+        ledger = self.ledger
+        daily_requests, _, monthly_requests, monthly_tokens = ledger.snapshot()
+        now = datetime.now()
+        next_day = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        next_hour = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        days_in_month = monthrange(now.year, now.month)[1]
+        next_month = next_day + timedelta(days=days_in_month - now.day)
+
+        if (monthly_requests >= ledger.MONTHLY_REQUEST_LIMIT * share
+                or monthly_tokens >= ledger.MONTHLY_TOKEN_LIMIT * share):
+            return (next_month - now).total_seconds(), "monthly_share", None
+        if daily_requests >= ledger.DAILY_REQUEST_LIMIT * share:
+            return (next_day - now).total_seconds(), "daily_share", None
+
+        if priority != "batch":
+            return 0, None, None
+
+        # 今日使える残り (月の残りを残り日数で均した分も超えない) を残り時間で均等に配る
+        days_left = days_in_month - now.day + 1
+        remaining_today = min(
+            ledger.DAILY_REQUEST_LIMIT * share - daily_requests,
+            (ledger.MONTHLY_REQUEST_LIMIT * share - monthly_requests) / days_left
+        )
+        if remaining_today < 1:
+            return (next_day - now).total_seconds(), "monthly_pace", None
+        hours_left = max((next_day - now).total_seconds() / 3600, 1)
+        hourly_budget = max(self.batch_burst, math.ceil(remaining_today / hours_left))
+
+        with self._cond:
+            hour = now.strftime("%Y-%m-%d %H")
+            if self._paced_hour != hour:
+                self._paced_hour, self._paced_count = hour, 0
+            if self._paced_count >= hourly_budget:
+                return (next_hour - now).total_seconds(), "pacing", None
+            self._paced_count += 1
+        return 0, None, hour
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Research Storage - research_history.db 共有ストレージ層
+=====================================================
+プロセスごとに長寿命の接続を1本だけ持ち、WALモードで運用する。
+常駐する perplexity_mcp_server.py とCLIが同じDBファイルに同時アクセスしても
+読み込みは書き込みを待たず、書き込みは busy_timeout で順番待ちになる。
+"""
+
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+
+class ResearchStorage:
+    """共有SQLite接続 (WAL / ステートメントキャッシュ / バッチコミット)
+
+    SQL文は固定文字列で渡し、値はプレースホルダで渡すこと。sqlite3 は同一文字列の
+    コンパイル済みステートメントを cached_statements 件までキャッシュするため、
+    呼び出しごとのパースが省ける。
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    MAX_ATTEMPTS = 3  # 遅延書き込みが失敗した場合に次回のフラッシュで再試行する回数
+
+    @classmethod
+    def shared(cls, db_path):
+        """DBパスごとにプロセス内で1つのインスタンスを返す"""
+        key = os.path.abspath(db_path)
+        with cls._instances_lock:
+            storage = cls._instances.get(key)
+            if storage is None or storage.conn is None:
+                storage = cls(db_path)
+                cls._instances[key] = storage
+            return storage
+
+    def __init__(self, db_path, batch_size=20, flush_interval=2.0, busy_timeout_ms=10000):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._lock = threading.RLock()
+        self._pending = []  # [[(sql, params), ...], 試行回数] (enqueue_many 1回分ごと)
+        self._pending_count = 0
+        self._flush_timer = None
+        self._close_hooks = []
+
+        # isolation_level=None: 自動コミット。書き込みは BEGIN IMMEDIATE で明示的に囲む
+        self.conn = sqlite3.connect(
+            db_path,
+            timeout=busy_timeout_ms / 1000,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=256
+        )
+        self.conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        # WALでは NORMAL でもコミット単位の整合性は保たれ、fsync回数が減る
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+
+        atexit.register(self.close)
+
+    @contextmanager
+    def transaction(self):
+        """書き込みトランザクション (他プロセスとの読み書き競合を避けるため IMMEDIATE)"""
+        with self._lock:
+            self._flush_locked()
+            cursor = self.conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                yield cursor
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+            else:
+                cursor.execute("COMMIT")
+
+    def fetchone(self, sql, params=()):
+        with self._lock:
+            self._flush_locked()
+            return self.conn.execute(sql, params).fetchone()
+
+    def fetchall(self, sql, params=()):
+        with self._lock:
+            self._flush_locked()
+            return self.conn.execute(sql, params).fetchall()
+
+    def execute(self, sql, params=()):
+        """単発の書き込みを即時コミット"""
+        with self.transaction() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount
+
+    def enqueue(self, sql, params=()):
+        """遅延書き込み: batch_size 件または flush_interval 秒ごとにまとめてコミット"""
+        self.enqueue_many([(sql, params)])
+
+    def enqueue_many(self, statements):
+        """連続して実行すべき複数の遅延書き込み (間に他の書き込みが挟まらない)"""
+        statements = list(statements)
+        if not statements:
+            return
+        with self._lock:
+            self._pending.append([statements, 0])
+            self._pending_count += len(statements)
+
+            if self._pending_count >= self.batch_size:
+                self._flush_locked()
+            elif self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.flush_interval, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def flush(self):
+        """保留中の書き込みをコミット"""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+        if not self._pending or self.conn is None:
+            return
+
+        pending, self._pending, self._pending_count = self._pending, [], 0
+        started = time.time()
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+        except sqlite3.Error as e:
+            # ロックが取れないなど: すべて次回に回す (呼び出し元のトランザクションは止めない)
+            print(f"⚠️ バッチ書き込みを延期: {sum(len(g[0]) for g in pending)}件 ({e})")
+            self._requeue(pending)
+            return
+
+        # enqueue_many 1回分ずつ SAVEPOINT で囲み、失敗した分だけ取り消す
+        retry = []
+        for group in pending:
+            statements = group[0]
+            try:
+                cursor.execute("SAVEPOINT queued_write")
+                for sql, params in statements:
+                    cursor.execute(sql, params)
+                cursor.execute("RELEASE queued_write")
+            except sqlite3.Error as e:
+                cursor.execute("ROLLBACK TO queued_write")
+                cursor.execute("RELEASE queued_write")
+                group[1] += 1
+                if group[1] < self.MAX_ATTEMPTS:
+                    retry.append(group)
+                    print(f"⚠️ 遅延書き込み失敗 (再試行 {group[1]}/{self.MAX_ATTEMPTS - 1}): {e}")
+                else:
+                    print(f"⚠️ 遅延書き込みを破棄: {e} / {statements[0][0].split()[:3]} {statements[0][1]!r:.200}")
+
+        try:
+            cursor.execute("COMMIT")
+        except sqlite3.Error as e:
+            cursor.execute("ROLLBACK")
+            print(f"⚠️ バッチ書き込み失敗: {len(pending)}件 ({time.time() - started:.2f}s): {e}")
+            self._requeue(pending)
+            return
+        self._requeue(retry)
+
+    def _requeue(self, groups):
+        """書けなかった分を (後から入った分より前に) 戻す。タイマーで再フラッシュする"""
+        if not groups:
+            return
+        self._pending[:0] = groups
+        self._pending_count += sum(len(group[0]) for group in groups)
+        if self._flush_timer is None and self.conn is not None:
+            self._flush_timer = threading.Timer(self.flush_interval, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def add_close_hook(self, hook):
+        """close() の最初に呼ぶ関数を登録 (このDBへ書き込むバックグラウンド処理を先に終わらせる)"""
+        if hook not in self._close_hooks:
+            self._close_hooks.append(hook)
+
+    def close(self):
+        """保留分をコミットして接続を閉じる"""
+        # フックは別スレッドから enqueue することがあるのでロックの外で呼ぶ
+        for hook in list(self._close_hooks):
+            try:
+                hook()
+            except Exception as e:
+                print(f"⚠️ 終了前処理エラー: {e}")
+
+        with self._lock:
+            if self.conn is None:
+                return
+            try:
+                self._flush_locked()
+            except Exception as e:
+                print(f"⚠️ 終了時の書き込みエラー: {e}")
+            if self._pending_count:
+                print(f"⚠️ 書き込めなかった遅延書き込み {self._pending_count}件を破棄します")
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            self.conn.close()
+            self.conn = None
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Research Tracing - リサーチ処理のステージ別レイテンシ計測
+======================================================
+検索・履歴保存・Obsidian保存の各ステージを span で囲み、所要時間を
+SQLite の stage_latency テーブルに記録する (書き込みは ResearchStorage のバッチコミット)。
+同じ検索の中の span は trace_id でまとまる。RESEARCH_TRACING=0 で無効化。
+"""
+
+import contextvars
+import functools
+import math
+import os
+import time
+import uuid
+from contextlib import contextmanager
+
+_current_trace = contextvars.ContextVar("research_trace_id", default=None)
+
+# latency_stats で errors に数える status (例外・API失敗・上限超過・後回し・キー未設定)
+ERROR_STATUSES = ("error", "failed", "rejected", "deferred", "no_api_key")
+
+
+class Span:
+    """計測中の1ステージ (呼び出し側が status / detail を書き換えられる)"""
+
+    def __init__(self, stage, trace_id, detail=None):
+        self.stage = stage
+        self.trace_id = trace_id
+        self.detail = detail
+        self.status = "ok"
+
+
+class Tracer:
+    """span の記録と集計"""
+
+    RETENTION_DAYS = 30
+
+    def __init__(self, storage, enabled=None):
+        self.storage = storage  # research_storage.ResearchStorage
+        self.enabled = os.getenv("RESEARCH_TRACING", "1") != "0" if enabled is None else enabled
+        self._init_table()
+
+    def _init_table(self):
+        try:
+            with self.storage.transaction() as cursor:
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS stage_latency (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        trace_id TEXT,
+                        stage TEXT NOT NULL,
+                        started_at REAL NOT NULL,
+                        duration_ms REAL NOT NULL,
+                        status TEXT NOT NULL DEFAULT 'ok',
+                        detail TEXT
+                    )
+                """)
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_stage_latency_stage ON stage_latency (stage, id)
+                """)
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_stage_latency_started ON stage_latency (started_at)
+                """)
+                cursor.execute("DELETE FROM stage_latency WHERE started_at < ?",
+                               (time.time() - self.RETENTION_DAYS * 86400,))
+        except Exception as e:
+            print(f"⚠️ レイテンシ記録テーブル初期化エラー: {e}")
+            self.enabled = False
+
+    @contextmanager
+    def span(self, stage, detail=None):
+        """with tracer.span("search.http") as span: ... で所要時間を記録
+
+        例外で抜けた場合は (status を書き換えていなければ) status="error" として記録し、
+        例外はそのまま送出する。
+        """
+        trace_id = _current_trace.get()
+        token = None
+        if trace_id is None:
+            trace_id = uuid.uuid4().hex[:12]
+            token = _current_trace.set(trace_id)
+
+        span = Span(stage, trace_id, detail)
+        started_at = time.time()
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException:
+            if span.status == "ok":
+                span.status = "error"
+            raise
+        finally:
+            self.record(stage, time.perf_counter() - started, span.status, span.detail,
+                        started_at=started_at, trace_id=trace_id)
+            if token is not None:
+                _current_trace.reset(token)
+
+    def record(self, stage, seconds, status="ok", detail=None, started_at=None, trace_id=None):
+        """計測済みの所要時間を記録 (別スレッドで計った処理など)"""
+        if not self.enabled:
+            return
+        try:
+            self.storage.enqueue("""
+                INSERT INTO stage_latency (trace_id, stage, started_at, duration_ms, status, detail)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (
+                trace_id or _current_trace.get(),
+                stage,
+                started_at if started_at is not None else time.time() - seconds,
+                seconds * 1000,
+                status,
+                None if detail is None else str(detail)[:200]
+            ))
+        except Exception as e:
+            print(f"⚠️ レイテンシ記録エラー: {e}")
+
+    def latency_stats(self, recent=500):
+        """ステージごとの直近 recent 件の統計 -> [{stage, count, errors, p50, p95, p99, max}] (ms)
+
+        errors は status が ERROR_STATUSES のいずれかだった件数。
+        """
+        self.storage.flush()
+        rows = self.storage.fetchall("""
+            SELECT stage, duration_ms, status FROM (
+                SELECT stage, duration_ms, status,
+                       ROW_NUMBER() OVER (PARTITION BY stage ORDER BY id DESC) AS n
+                FROM stage_latency
+            ) WHERE n <= ?
+        """, (recent,))
+
+        by_stage = {}
+        for stage, duration_ms, status in rows:
+            durations, errors = by_stage.setdefault(stage, ([], [0]))
+            durations.append(duration_ms)
+            if status in ERROR_STATUSES:
+                errors[0] += 1
+
+        stats = []
+        for stage in sorted(by_stage):
+            durations, errors = by_stage[stage]
+            durations.sort()
+            stats.append({
+                "stage": stage,
+                "count": len(durations),
+                "errors": errors[0],
+                "p50": percentile(durations, 50),
+                "p95": percentile(durations, 95),
+                "p99": percentile(durations, 99),
+                "max": durations[-1]
+            })
+        return stats
+
+
+def traced(stage):
+    """メソッド全体を self.tracer の span で囲むデコレータ (中の span は同じ trace_id になる)"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.tracer.span(stage):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def percentile(ordered, pct):
+    """昇順リストの最近傍順位法 (nearest-rank) パーセンタイル: ceil(pct/100 * n) 番目の値"""
+    if not ordered:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[min(rank, len(ordered)) - 1]
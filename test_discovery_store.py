@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+discovery_store の変化検出のテスト
+"""
+
+import os
+import tempfile
+
+from discovery_store import DiscoveryStore
+
+
+def _repo(source, stars, discovered_at):
+    return {
+        "type": "awesome_github_repo",
+        "name": "mcp-servers",
+        "url": "https://github.com/example/mcp-servers",
+        "description": "MCP servers",
+        "stars": stars,
+        "source": source,
+        "discovered_at": discovered_at
+    }
+
+
+def test_same_input_twice_is_not_reported_as_updated():
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "discoveries.jsonl")
+
+        # 2つの awesome リストの検索に同じリポジトリが出る
+        def run(discovered_at):
+            store = DiscoveryStore(path)
+            result = store.add_many([
+                _repo("GitHub search: awesome-mcp-servers", 120, discovered_at),
+                _repo("GitHub search: awesome-claude", 121, discovered_at)
+            ])
+            report = store.since_last_report()
+            store.mark_reported()
+            return result, report, store
+
+        (new, updated), report, _ = run("2026-10-01T00:00:00")
+        assert (len(new), len(updated), len(report)) == (1, 0, 1)
+
+        for day in ("2026-10-02T00:00:00", "2026-10-03T00:00:00"):
+            (new, updated), report, store = run(day)
+            assert (len(new), len(updated), len(report)) == (0, 0, 0)
+
+        with open(path, encoding="utf-8") as f:
+            assert len(f.readlines()) == 1
+        assert len(store) == 1
+
+
+def test_changed_content_is_reported_as_updated():
+    with tempfile.TemporaryDirectory() as workdir:
+        store = DiscoveryStore(os.path.join(workdir, "discoveries.jsonl"))
+        store.add_many([_repo("GitHub search: awesome-mcp-servers", 120, "2026-10-01T00:00:00")])
+
+        changed = _repo("GitHub search: awesome-mcp-servers", 120, "2026-10-02T00:00:00")
+        changed["description"] = "MCP servers and clients"
+        new, updated = store.add_many([changed])
+        assert (len(new), len(updated)) == (0, 1)
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+research_scheduler のペース配分のテスト
+"""
+
+import pytest
+
+from research_scheduler import Deferred, ResearchScheduler
+
+
+class _Ledger:
+    """使用量ゼロの台帳 (batch の取り分 0.5 で今日の残りが1件 -> 1時間あたりの枠も1件)"""
+
+    DAILY_REQUEST_LIMIT = 2
+    MONTHLY_REQUEST_LIMIT = 10 ** 4
+    MONTHLY_TOKEN_LIMIT = 10 ** 6
+
+    def snapshot(self):
+        return 0, 0, 0, 0
+
+
+def _scheduler():
+    return ResearchScheduler(_Ledger(), max_concurrent=4,
+                             quota_share={"interactive": 1.0, "mcp": 1.0, "batch": 0.5},
+                             max_defer={"interactive": 0, "mcp": 0, "batch": 0}, batch_burst=1)
+
+
+def test_refunded_batch_request_does_not_use_pacing_budget():
+    scheduler = _scheduler()
+
+    # 台帳に拒否された・失敗した batch は枠を返すので、次の batch もすぐ通る
+    for _ in range(3):
+        paced = scheduler.acquire("batch")
+        assert paced is not None
+        scheduler.release(refund=paced)
+
+    # 無料枠を使った batch は枠を消費し、この時間の残りは後回しになる
+    scheduler.acquire("batch")
+    scheduler.release()
+    with pytest.raises(Deferred) as deferred:
+        scheduler.acquire("batch")
+    assert deferred.value.reason == "pacing"
+
+
+def test_interactive_requests_are_not_paced():
+    scheduler = _scheduler()
+    assert scheduler.acquire("interactive") is None
+    scheduler.release(refund=None)
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+research_tracing のパーセンタイルとエラー集計のテスト
+"""
+
+import os
+import tempfile
+
+from research_storage import ResearchStorage
+from research_tracing import Tracer, percentile
+
+
+def test_percentile_nearest_rank():
+    # 偶数個: p50 は下側の中央値 (ceil(0.5 * n) 番目)
+    assert percentile([1, 2], 50) == 1
+    assert percentile([1, 2, 3, 4, 5, 6], 50) == 3
+    assert percentile([1, 2, 3, 4], 25) == 1
+    assert percentile([1, 2, 3, 4], 75) == 3
+    assert percentile(list(range(1, 11)), 95) == 10
+    assert percentile(list(range(1, 101)), 99) == 99
+    # 奇数個・端の値
+    assert percentile([1, 2, 3], 50) == 2
+    assert percentile([5], 99) == 5
+    assert percentile([1, 2, 3], 0) == 1
+    assert percentile([1, 2, 3], 100) == 3
+    assert percentile([], 50) == 0.0
+
+
+def test_latency_stats_counts_failed_spans_as_errors():
+    with tempfile.TemporaryDirectory() as workdir:
+        storage = ResearchStorage(os.path.join(workdir, "trace.db"))
+        try:
+            tracer = Tracer(storage, enabled=True)
+            for status in ("ok", "cache_hit", "error", "failed", "rejected", "deferred"):
+                tracer.record("search", 0.01, status)
+            stats = {row["stage"]: row for row in tracer.latency_stats()}
+            assert stats["search"]["count"] == 6
+            assert stats["search"]["errors"] == 4
+        finally:
+            storage.close()
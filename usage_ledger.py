@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Usage Ledger - Perplexity無料枠の使用量台帳
+===========================================
+日次行 (usage_tracking) と月次ロールアップ (usage_monthly) をどちらも主キーで更新する。
+プロンプト圧縮で節約したトークン数も日次行 (tokens_saved) に積み上げる。
+制限判定はDBアクセス前にメモリ上のトークンバケットで捌き、DBでは主キー検索と
+UPSERTだけを1トランザクションで行うため、複数プロセスから同時に呼ばれても正しく数えられる。
+"""
+
+import threading
+import time
+from datetime import datetime
+
+
+class TokenBucket:
+    """プロセス内のリクエストレート制限 (DBに触れる前の一次ゲート)"""
+
+    def __init__(self, capacity, refill_per_sec):
+        self.capacity = capacity
+        self.refill_per_sec = refill_per_sec
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_sec)
+        self.updated = now
+
+    def try_acquire(self, n=1):
+        with self._lock:
+            self._refill()
+            if self.tokens >= n:
+                self.tokens -= n
+                return True
+            return False
+
+    def refund(self, n=1):
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + n)
+
+
+class UsageLedger:
+    """使用量台帳 (予約 → トークン記録 / 失敗時は予約取消)"""
+
+    # Perplexity Pro制限 ($5/月クレジット)
+    DAILY_REQUEST_LIMIT = 100     # 1日100リクエスト (Pro想定)
+    MONTHLY_TOKEN_LIMIT = 200000  # 月間200,000トークン ($5相当)
+    MONTHLY_REQUEST_LIMIT = 2000  # 月間2000リクエスト
+    WARNING_RATIO = 0.8
+
+    def __init__(self, storage, requests_per_minute=50):
+        self.storage = storage  # research_storage.ResearchStorage
+        self.bucket = TokenBucket(requests_per_minute, requests_per_minute / 60)
+
+        # 上限到達を覚えておき、日付/月が変わるまでDBを見ずに拒否する
+        self._exhausted = {}
+
+        self._init_tables()
+
+    def _init_tables(self):
+        """月次ロールアップテーブル作成 + 既存の日次データから初回集計"""
+        with self.storage.transaction() as cursor:
+            cursor.execute("PRAGMA table_info(usage_tracking)")
+            if "tokens_saved" not in [row[1] for row in cursor.fetchall()]:
+                cursor.execute("ALTER TABLE usage_tracking ADD COLUMN tokens_saved INTEGER DEFAULT 0")
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS usage_monthly (
+                    month TEXT PRIMARY KEY,
+                    requests INTEGER NOT NULL DEFAULT 0,
+                    tokens INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            cursor.execute("""
+                INSERT OR IGNORE INTO usage_monthly (month, requests, tokens)
+                SELECT substr(date, 1, 7), SUM(monthly_requests), SUM(monthly_tokens)
+                FROM usage_tracking
+                GROUP BY substr(date, 1, 7)
+            """)
+
+    @staticmethod
+    def _periods():
+        now = datetime.now()
+        return now.strftime('%Y-%m-%d'), now.strftime('%Y-%m')
+
+    def reserve(self):
+        """1リクエスト分を予約する
+
+        戻り値の dict:
+          allowed  - 実行してよいか
+          reason   - 拒否理由 (rate / daily_requests / monthly_requests / monthly_tokens)
+          usage    - 予約後の (日次リクエスト, 日次トークン, 月次リクエスト, 月次トークン)
+        """
+        today, month = self._periods()
+
+        # 1. メモリ上のゲート (DBアクセスなし)
+        for reason, period in self._exhausted.items():
+            if period in (today, month):
+                return {"allowed": False, "reason": reason, "usage": None}
+        if not self.bucket.try_acquire():
+            return {"allowed": False, "reason": "rate", "usage": None}
+
+        # 2. 主キー検索 + UPSERT を1トランザクションで (他プロセスとは BEGIN IMMEDIATE で直列化)
+        with self.storage.transaction() as cursor:
+            daily_requests, daily_tokens, monthly_requests, monthly_tokens = self._read(cursor, today, month)
+
+            reason = None
+            if daily_requests >= self.DAILY_REQUEST_LIMIT:
+                reason, period = "daily_requests", today
+            elif monthly_requests >= self.MONTHLY_REQUEST_LIMIT:
+                reason, period = "monthly_requests", month
+            elif monthly_tokens >= self.MONTHLY_TOKEN_LIMIT:
+                reason, period = "monthly_tokens", month
+
+            if reason:
+                self._exhausted = {reason: period}
+                usage = (daily_requests, daily_tokens, monthly_requests, monthly_tokens)
+            else:
+                self._add(cursor, today, month, requests=1, tokens=0)
+                usage = (daily_requests + 1, daily_tokens, monthly_requests + 1, monthly_tokens)
+
+        if reason:
+            self.bucket.refund()
+            return {"allowed": False, "reason": reason, "usage": usage}
+
+        return {"allowed": True, "reason": None, "usage": usage}
+
+    def release(self):
+        """予約取消 (API呼び出しが失敗した場合)"""
+        today, month = self._periods()
+        with self.storage.transaction() as cursor:
+            self._add(cursor, today, month, requests=-1, tokens=0)
+
+    def record_tokens(self, total_tokens):
+        """予約済みリクエストの消費トークンを記録"""
+        if not total_tokens:
+            return
+        today, month = self._periods()
+        with self.storage.transaction() as cursor:
+            self._add(cursor, today, month, requests=0, tokens=total_tokens)
+
+    def record_savings(self, saved_tokens):
+        """プロンプト圧縮で送らずに済んだトークン数を記録"""
+        if not saved_tokens:
+            return
+        today, _ = self._periods()
+        with self.storage.transaction() as cursor:
+            cursor.execute("""
+                INSERT INTO usage_tracking (date, tokens_saved) VALUES (?, ?)
+                ON CONFLICT(date) DO UPDATE SET tokens_saved = COALESCE(tokens_saved, 0) + ?
+            """, (today, saved_tokens, saved_tokens))
+
+    def savings(self):
+        """節約トークン数 -> (今日, 今月)"""
+        today, month = self._periods()
+        row = self.storage.fetchone("""
+            SELECT COALESCE(SUM(tokens_saved), 0),
+                   COALESCE(SUM(CASE WHEN date = ? THEN tokens_saved END), 0)
+            FROM usage_tracking WHERE date BETWEEN ? AND ?
+        """, (today, f"{month}-01", f"{month}-31"))
+        return (row[1], row[0]) if row else (0, 0)
+
+    def snapshot(self):
+        """現在の使用量 -> (日次リクエスト, 日次トークン, 月次リクエスト, 月次トークン)"""
+        today, month = self._periods()
+        daily = self.storage.fetchone("""
+            SELECT daily_requests, total_tokens FROM usage_tracking WHERE date = ?
+        """, (today,))
+        monthly = self.storage.fetchone("""
+            SELECT requests, tokens FROM usage_monthly WHERE month = ?
+        """, (month,))
+        return (
+            daily[0] if daily else 0,
+            daily[1] if daily else 0,
+            monthly[0] if monthly else 0,
+            monthly[1] if monthly else 0
+        )
+
+    @staticmethod
+    def _read(cursor, today, month):
+        cursor.execute("""
+            SELECT daily_requests, total_tokens FROM usage_tracking WHERE date = ?
+        """, (today,))
+        daily = cursor.fetchone()
+        cursor.execute("""
+            SELECT requests, tokens FROM usage_monthly WHERE month = ?
+        """, (month,))
+        monthly = cursor.fetchone()
+        return (
+            daily[0] if daily else 0,
+            daily[1] if daily else 0,
+            monthly[0] if monthly else 0,
+            monthly[1] if monthly else 0
+        )
+
+    @staticmethod
+    def _add(cursor, today, month, requests, tokens):
+        """日次行と月次ロールアップを原子的に加算 (負数で取消)"""
+        cursor.execute("""
+            INSERT INTO usage_tracking
+            (date, daily_requests, total_tokens, monthly_requests, monthly_tokens)
+            VALUES (?, MAX(?, 0), MAX(?, 0), MAX(?, 0), MAX(?, 0))
+            ON CONFLICT(date) DO UPDATE SET
+                daily_requests = MAX(daily_requests + ?, 0),
+                total_tokens = total_tokens + ?,
+                monthly_requests = MAX(monthly_requests + ?, 0),
+                monthly_tokens = monthly_tokens + ?
+        """, (today, requests, tokens, requests, tokens, requests, tokens, requests, tokens))
+        cursor.execute("""
+            INSERT INTO usage_monthly (month, requests, tokens)
+            VALUES (?, MAX(?, 0), MAX(?, 0))
+            ON CONFLICT(month) DO UPDATE SET
+                requests = MAX(requests + ?, 0),
+                tokens = tokens + ?
+        """, (month, requests, tokens, requests, tokens))
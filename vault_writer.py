@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Vault Writer - Obsidian Vault 保存バックエンド
+=============================================
+Vault がマウントされていればファイルシステムへ直接 (一時ファイル + rename で原子的に) 書き込み、
+使えない場合だけ PowerShell 経由で保存する。保存はバックグラウンドでまとめて行い、
+リサーチの応答経路を待たせない。
+"""
+
+import atexit
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+
+def windows_to_wsl_path(windows_path):
+    """G:\\foo\\bar -> /mnt/g/foo/bar"""
+    if len(windows_path) >= 2 and windows_path[1] == ":":
+        drive = windows_path[0].lower()
+        rest = windows_path[2:].replace("\\", "/").lstrip("/")
+        return f"/mnt/{drive}/{rest}"
+    return windows_path
+
+
+class FilesystemVaultWriter:
+    """Vault ディレクトリへの直接書き込み"""
+
+    name = "filesystem"
+
+    def __init__(self, vault_root):
+        self.vault_root = vault_root
+
+    def location(self, relative_path):
+        """ノートを書き込む実際のパス"""
+        return os.path.join(os.path.abspath(self.vault_root), *relative_path.replace("\\", "/").split("/"))
+
+    def write_many(self, notes):
+        for relative_path, content in notes:
+            self._write_atomic(relative_path, content)
+
+    def _write_atomic(self, relative_path, content):
+        target = self.location(relative_path)
+        directory = os.path.dirname(target)
+        os.makedirs(directory, exist_ok=True)
+
+        # 同じディレクトリに一時ファイルを書いてから置き換える (Obsidian が書きかけを読まない)
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", suffix=".md", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8", newline="\n") as f:
+                f.write(content)
+            os.replace(tmp_path, target)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+class PowerShellVaultWriter:
+    """powershell.exe 経由の保存 (Vault が直接見えない環境向けのフォールバック)"""
+
+    name = "powershell"
+
+    def __init__(self, windows_vault, timeout=30):
+        self.windows_vault = windows_vault
+        self.timeout = timeout
+
+    @staticmethod
+    def available():
+        return shutil.which("powershell.exe") is not None
+
+    def location(self, relative_path):
+        """ノートを書き込む実際のパス (Windows 側のパス)"""
+        return self.windows_vault + "\\" + relative_path.replace("/", "\\")
+
+    def write_many(self, notes):
+        # 複数ノートを1回の powershell.exe 起動でまとめて保存する
+        script = []
+        for relative_path, content in notes:
+            windows_relative = relative_path.replace("/", "\\")
+            directory, _, filename = windows_relative.rpartition("\\")
+            # 特殊文字を安全にエスケープ
+            safe_content = content.replace("'", "''").replace("`", "``")
+            script.append(f"""
+$obsidianPath = "{self.windows_vault}\\{directory}"
+New-Item -ItemType Directory -Force -Path $obsidianPath | Out-Null
+$content = @'
+{safe_content}
+'@
+[System.IO.File]::WriteAllText("$obsidianPath\\{filename}", $content, [System.Text.Encoding]::UTF8)
+Write-Host "Saved: {filename}"
+""")
+
+        result = subprocess.run([
+            "powershell.exe", "-Command", "\n".join(script)
+        ], capture_output=True, text=True, timeout=self.timeout)
+
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or f"powershell.exe exited with {result.returncode}")
+
+
+class AsyncVaultWriter:
+    """保存要求をキューに積み、バックグラウンドスレッドでまとめて書き込む"""
+
+    def __init__(self, writers, batch_window=0.2):
+        self.writers = writers
+        self.batch_window = batch_window
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        # 1バッチ書き込むごとに on_batch(backend名, 件数, 秒, 成功したか) を呼ぶ (計測用)
+        self.on_batch = None
+
+        atexit.register(self.flush)
+
+    @property
+    def backend(self):
+        return self.writers[0].name if self.writers else "none"
+
+    def submit(self, relative_path, content, on_saved=None):
+        """保存を予約 (すぐに戻る)
+
+        on_saved を渡すと、書き込みに成功した後に実際の保存先パスで on_saved(path) を呼ぶ
+        (どのバックエンドでも保存できなかった場合は呼ばない)。
+        """
+        self._ensure_worker()
+        self._queue.put((relative_path, content, on_saved))
+
+    def flush(self):
+        """予約済みの保存が終わるまで待つ"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="vault-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            notes = [self._queue.get()]
+            # 少し待って同時期の保存要求を1バッチにまとめる
+            try:
+                while True:
+                    notes.append(self._queue.get(timeout=self.batch_window))
+            except queue.Empty:
+                pass
+
+            try:
+                self._write(notes)
+            finally:
+                for _ in notes:
+                    self._queue.task_done()
+
+    def _write(self, notes):
+        errors = []
+        started = time.perf_counter()
+        for writer in self.writers:
+            try:
+                writer.write_many([(relative_path, content) for relative_path, content, _ in notes])
+            except Exception as e:
+                errors.append(f"{writer.name}: {e}")
+                continue
+            self._notify(writer.name, len(notes), time.perf_counter() - started, True)
+            for relative_path, _, on_saved in notes:
+                if on_saved is not None:
+                    self._report_saved(on_saved, writer.location(relative_path))
+            return
+        print(f"⚠️ Obsidian保存エラー ({len(notes)}件): {'; '.join(errors)}")
+        self._notify("none", len(notes), time.perf_counter() - started, False)
+
+    @staticmethod
+    def _report_saved(on_saved, path):
+        try:
+            on_saved(path)
+        except Exception as e:
+            print(f"⚠️ Obsidian保存先の記録エラー: {e}")
+
+    def _notify(self, backend, count, seconds, ok):
+        if self.on_batch is None:
+            return
+        try:
+            self.on_batch(backend, count, seconds, ok)
+        except Exception as e:
+            print(f"⚠️ Obsidian保存の計測エラー: {e}")
+
+
+def create_vault_writer(windows_vault, fallback_dir="obsidian_sync"):
+    """利用可能なバックエンドを優先順に並べた AsyncVaultWriter を作る
+
+    1. OBSIDIAN_VAULT_PATH またはマウント済みの Vault (WSL: /mnt/<drive>/...) へ直接書き込み
+    2. powershell.exe 経由
+    3. ローカルの fallback_dir (Vault が見えない Linux ランナー等)
+    """
+    writers = []
+
+    for candidate in (os.getenv("OBSIDIAN_VAULT_PATH"), windows_vault, windows_to_wsl_path(windows_vault)):
+        if candidate and os.path.isdir(candidate):
+            writers.append(FilesystemVaultWriter(candidate))
+            break
+
+    if PowerShellVaultWriter.available():
+        writers.append(PowerShellVaultWriter(windows_vault))
+
+    writers.append(FilesystemVaultWriter(fallback_dir))
+
+    return AsyncVaultWriter(writers)